@@ -0,0 +1 @@
+"""Benchmarks for the Student-Teacher Matching system."""
@@ -0,0 +1,83 @@
+"""
+Candidate generation benchmark: original all-pairs loop vs. CandidateIndex.
+
+Usage:
+    python -m benchmarks.bench_candidates [--scales 10 100 1000] [--legacy-max-scale 100]
+"""
+
+import argparse
+import contextlib
+import io
+import time
+
+from benchmarks.synthetic import SAMPLE_STUDENTS, SAMPLE_TEACHERS, generate_data
+from student_teacher_matcher import StudentTeacherMatcher
+
+
+def legacy_frames(matcher: StudentTeacherMatcher):
+    """Processed frames with the list-valued `subject_list`/`time_slots` columns of the original loop."""
+    frames = []
+    for encoded in (matcher.encoded_students, matcher.encoded_teachers):
+        frame = encoded.frame.copy()
+        frame['subject_list'] = [matcher.subject_vocab.decode(mask) for mask in encoded.subjects]
+        frame['time_slots'] = [matcher.slot_vocab.decode(mask) for mask in encoded.slots]
+        frames.append(frame)
+    return frames
+
+
+def legacy_candidates(matcher: StudentTeacherMatcher, students, teachers) -> int:
+    """The original iterrows x iterrows scan; returns the number of candidates."""
+    count = 0
+    for _, student in students.iterrows():
+        for _, teacher in teachers.iterrows():
+            subject_score = matcher.calculate_subject_compatibility(student['subject_list'], teacher['subject_list'])
+            common_slots = matcher.find_common_time_slots(student['time_slots'], teacher['time_slots'])
+            if subject_score > 0 and common_slots:
+                count += len(common_slots)
+    return count
+
+
+def indexed_candidates(matcher: StudentTeacherMatcher) -> int:
+    """Candidate generation through the CandidateIndex; returns the number of candidates."""
+    return len(matcher._build_engine().candidate_pairs()[0])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--scales', type=int, nargs='+', default=[10, 100, 1000],
+                        help='Multiples of the sample CSV sizes')
+    parser.add_argument('--legacy-max-scale', type=int, default=100,
+                        help='Largest scale at which the original loop is timed')
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    print(f"{'scale':>6} {'students':>9} {'teachers':>9} {'pairs':>12} {'candidates':>11} "
+          f"{'loop (s)':>10} {'index (s)':>10} {'speedup':>8}")
+
+    for scale in args.scales:
+        n_students, n_teachers = SAMPLE_STUDENTS * scale, SAMPLE_TEACHERS * scale
+        matcher = StudentTeacherMatcher()
+        matcher.students_df, matcher.teachers_df = generate_data(n_students, n_teachers, args.seed)
+        with contextlib.redirect_stdout(io.StringIO()):
+            matcher.preprocess_data()
+
+        start = time.perf_counter()
+        candidates = indexed_candidates(matcher)
+        indexed_time = time.perf_counter() - start
+
+        if scale <= args.legacy_max_scale:
+            students, teachers = legacy_frames(matcher)
+            start = time.perf_counter()
+            legacy_count = legacy_candidates(matcher, students, teachers)
+            legacy_time = time.perf_counter() - start
+            assert legacy_count == candidates, (legacy_count, candidates)
+            loop_column, speedup_column = f'{legacy_time:10.3f}', f'{legacy_time / indexed_time:7.1f}x'
+        else:
+            loop_column, speedup_column = f"{'skipped':>10}", f"{'-':>8}"
+
+        print(f'{scale:>6} {n_students:>9} {n_teachers:>9} {n_students * n_teachers:>12} {candidates:>11} '
+              f'{loop_column} {indexed_time:10.3f} {speedup_column}')
+
+
+if __name__ == '__main__':
+    main()
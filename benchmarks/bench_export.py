@@ -0,0 +1,66 @@
+"""
+Schedule export benchmark: write time and file size of every export format.
+
+The schedule is matched once and then written as CSV, JSON, NDJSON (plain
+and gzip), Parquet and an Arrow IPC stream into a temporary directory.
+Parquet and Arrow are skipped when pyarrow is not installed.
+
+Usage:
+    python -m benchmarks.bench_export [--students 10000 100000] [--students-per-teacher 20] [--batch-size 100000]
+"""
+
+import argparse
+import contextlib
+import io
+import os
+import tempfile
+import time
+
+from benchmarks.synthetic import generate_data
+from matching_export import DEFAULT_BATCH_SIZE
+from student_teacher_matcher import StudentTeacherMatcher
+
+# (format_type, file name) pairs to write
+EXPORTS = [('csv', 'schedule.csv'), ('json', 'schedule.json'), ('ndjson', 'schedule.ndjson'),
+           ('ndjson', 'schedule.ndjson.gz'), ('parquet', 'schedule.parquet'), ('arrow', 'schedule.arrow')]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--students', type=int, nargs='+', default=[10000, 100000])
+    parser.add_argument('--students-per-teacher', type=int, default=20)
+    parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE)
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    try:
+        import pyarrow  # noqa: F401
+        exports = EXPORTS
+    except ImportError:
+        print("pyarrow is not installed; skipping Parquet and Arrow")
+        exports = [(format_type, name) for format_type, name in EXPORTS if format_type not in ('parquet', 'arrow')]
+
+    print(f"{'students':>9} {'matches':>8} {'file':>19} {'time (s)':>9} {'size (MiB)':>11} {'bytes/match':>12}")
+    for n_students in args.students:
+        n_teachers = max(1, n_students // args.students_per_teacher)
+        matcher = StudentTeacherMatcher()
+        matcher.students_df, matcher.teachers_df = generate_data(n_students, n_teachers, args.seed)
+        with contextlib.redirect_stdout(io.StringIO()):
+            matcher.preprocess_data()
+            matcher.create_matches()
+        n_matches = len(matcher.schedule)
+
+        with tempfile.TemporaryDirectory() as workdir:
+            for format_type, name in exports:
+                path = os.path.join(workdir, name)
+                start = time.perf_counter()
+                with contextlib.redirect_stdout(io.StringIO()):
+                    matcher.export_schedule(format_type, path, batch_size=args.batch_size)
+                seconds = time.perf_counter() - start
+                size = os.path.getsize(path)
+                print(f'{n_students:>9} {n_matches:>8} {name:>19} {seconds:9.3f} {size / 2 ** 20:11.2f} '
+                      f'{size / max(n_matches, 1):12.1f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,78 @@
+"""
+Feedback history benchmark: appending to the columnar log and trend queries.
+
+Synthetic ratings are appended to a fresh `FeedbackLog` in batches, as
+terms of feedback would arrive. Per-teacher and per-slot trends are then
+read off its running aggregates and, for comparison, recomputed the old
+way, by building a DataFrame of every rating ever given and grouping it.
+Both must agree.
+
+Usage:
+    python -m benchmarks.bench_feedback [--ratings 1000000 5000000] [--teachers 5000] [--batch 500000]
+"""
+
+import argparse
+import os
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+from benchmarks.synthetic import TIME_SLOTS
+from matching_feedback_log import FeedbackLog
+from matching_metrics import group_means
+
+
+def ratings_batch(rng: np.random.Generator, n: int, n_teachers: int) -> pd.DataFrame:
+    """Feedback records in the layout of `simulate_feedback`."""
+    satisfaction = rng.random(n).round(3)
+    rating = np.clip((satisfaction * 5).astype(np.int64), 1, 5)
+    return pd.DataFrame({'student_id': rng.integers(1, 10 * n_teachers, n),
+                         'teacher_id': rng.integers(1, n_teachers + 1, n),
+                         'time_slot': rng.choice(TIME_SLOTS, n), 'rating': rating,
+                         'satisfaction_score': satisfaction, 'feedback_positive': rating >= 4})
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--ratings', type=int, nargs='+', default=[1000000, 5000000])
+    parser.add_argument('--teachers', type=int, default=5000)
+    parser.add_argument('--batch', type=int, default=500000)
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    print(f"{'ratings':>9} {'append (s)':>11} {'MB on disk':>11} {'log trends (ms)':>16} {'rebuild (s)':>12}")
+    for n_ratings in args.ratings:
+        rng = np.random.default_rng(args.seed)
+        with tempfile.TemporaryDirectory() as workdir:
+            log = FeedbackLog(os.path.join(workdir, 'log'))
+            batches, append = [], 0.0
+            for term, start in enumerate(range(0, n_ratings, args.batch)):
+                batch = ratings_batch(rng, min(args.batch, n_ratings - start), args.teachers)
+                batches.append(batch)
+                begin = time.perf_counter()
+                log.append(batch, term=f'term {term}')
+                append += time.perf_counter() - begin
+            size = sum(entry.stat().st_size for entry in os.scandir(log.directory)) / 1e6
+
+            begin = time.perf_counter()
+            teachers, slots = log.teacher_trends(), log.slot_trends()
+            trends = time.perf_counter() - begin
+
+            # What analyze_feedback_trends did over a list of every rating
+            records = [record for batch in batches for record in batch.to_dict('records')]
+            begin = time.perf_counter()
+            frame = pd.DataFrame(records)
+            rebuilt_teachers = group_means(frame['teacher_id'], frame['rating'])
+            rebuilt_slots = group_means(frame['time_slot'], frame['rating'])
+            rebuild = time.perf_counter() - begin
+
+            assert np.array_equal(teachers[0], rebuilt_teachers[0])
+            assert np.allclose(teachers[2], rebuilt_teachers[2][0])
+            assert np.allclose(slots[2], rebuilt_slots[2][0])
+            print(f'{n_ratings:>9} {append:11.2f} {size:11.1f} {trends * 1000:16.2f} {rebuild:12.2f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,70 @@
+"""
+Reproducibility benchmark: canonical preprocessing and content fingerprints.
+
+A synthetic population is matched twice: once as generated and once with
+its rows, columns and the tokens within every cell shuffled. Both runs must
+give the same input fingerprint, schedule and schedule fingerprint. The
+table reports preprocessing time (including the canonical row and subject
+order) and the time to fingerprint the input and the schedule.
+
+Usage:
+    python -m benchmarks.bench_fingerprint [--students 20000 200000] [--teachers-ratio 20]
+"""
+
+import argparse
+import contextlib
+import io
+import time
+
+import numpy as np
+import pandas as pd
+
+from benchmarks.synthetic import generate_data
+from student_teacher_matcher import StudentTeacherMatcher
+
+
+def shuffled(frame: pd.DataFrame, rng: np.random.Generator) -> pd.DataFrame:
+    """An equivalent frame: rows, columns and comma-separated tokens in random order."""
+    frame = frame.iloc[rng.permutation(len(frame))].reset_index(drop=True)
+    frame = frame[list(rng.permutation(frame.columns))]
+    for column in ('subjects', 'preferred_time_slots', 'available_time_slots'):
+        if column in frame:
+            frame[column] = [','.join(rng.permutation(cell.split(','))) for cell in frame[column]]
+    return frame
+
+
+def run(students: pd.DataFrame, teachers: pd.DataFrame) -> tuple:
+    matcher = StudentTeacherMatcher(seed=0)
+    matcher.students_df, matcher.teachers_df = students, teachers
+    with contextlib.redirect_stdout(io.StringIO()):
+        start = time.perf_counter()
+        matcher.preprocess_data()
+        preprocess = time.perf_counter() - start
+        matcher.create_matches()
+    start = time.perf_counter()
+    fingerprints = matcher.fingerprints()
+    return fingerprints, pd.DataFrame(matcher.schedule), preprocess, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--students', type=int, nargs='+', default=[20000, 200000])
+    parser.add_argument('--teachers-ratio', type=int, default=20, help='Students per teacher')
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    print(f"{'students':>9} {'lessons':>8} {'preprocess (s)':>15} {'shuffled (s)':>13} {'fingerprints (s)':>17}")
+    for n_students in args.students:
+        students, teachers = generate_data(n_students, max(1, n_students // args.teachers_ratio), args.seed)
+        fingerprints, schedule, preprocess, fingerprint_time = run(students, teachers)
+        shuffled_fingerprints, shuffled_schedule, shuffled_preprocess, _ = run(shuffled(students, rng),
+                                                                                shuffled(teachers, rng))
+        assert fingerprints == shuffled_fingerprints
+        assert schedule.equals(shuffled_schedule)
+        print(f'{n_students:>9} {len(schedule):>8} {preprocess:15.2f} {shuffled_preprocess:13.2f} '
+              f'{fingerprint_time:17.2f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,74 @@
+"""
+Group packing benchmark: group quality and packing time with and without `group_packing`.
+
+Both runs match the same students to the same teachers; packing only moves
+students between a teacher's time slots, so the benchmark also checks that
+capacity holds and every student keeps its teacher.
+
+Usage:
+    python -m benchmarks.bench_groups [--students 10000 100000] [--students-per-teacher 20] [--time-grid]
+"""
+
+import argparse
+import contextlib
+import io
+import time
+
+import numpy as np
+
+from benchmarks.synthetic import generate_data
+from matching_groups import group_quality
+from student_teacher_matcher import StudentTeacherMatcher
+
+QUALITY_COLUMNS = ['lessons', 'mean_lesson_size', 'grouped_students_rate', 'mean_grade_spread', 'shared_focus_rate']
+
+
+def run(matcher: StudentTeacherMatcher, group_packing: bool):
+    """Match once; returns (seconds, packing seconds, quality, live schedule)."""
+    matcher.stats.reset()
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        matcher.create_matches(group_packing=group_packing)
+    seconds = time.perf_counter() - start
+    packing = matcher.stats.stages.get('create_matches.pack_groups', {}).get('wall_seconds', 0.0)
+
+    live = matcher.live_schedule
+    students = np.flatnonzero(live.teacher >= 0)
+    quality = group_quality(live.engine, matcher._student_grades(), students, live.teacher[students],
+                            live.slot[students])
+    return seconds, packing, quality, live
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--students', type=int, nargs='+', default=[10000, 100000])
+    parser.add_argument('--students-per-teacher', type=int, default=20)
+    parser.add_argument('--time-grid', action='store_true', help='Weekly 30-minute block availability')
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    header = ' '.join(f'{column:>21}' for column in QUALITY_COLUMNS)
+    print(f"{'students':>9} {'teachers':>9} {'packing':>8} {'matches':>8} {'total (s)':>10} {'pack (s)':>9} {header}")
+    for n_students in args.students:
+        n_teachers = max(1, n_students // args.students_per_teacher)
+        matcher = StudentTeacherMatcher(instrument=True, time_grid=args.time_grid)
+        matcher.students_df, matcher.teachers_df = generate_data(n_students, n_teachers, args.seed,
+                                                                 time_grid=args.time_grid)
+        with contextlib.redirect_stdout(io.StringIO()):
+            matcher.preprocess_data()
+
+        baseline_teachers = None
+        for group_packing in (False, True):
+            seconds, packing, quality, live = run(matcher, group_packing)
+            if baseline_teachers is None:
+                baseline_teachers = live.teacher.copy()
+            else:
+                assert np.array_equal(live.teacher, baseline_teachers)
+                assert (live.capacity.remaining >= 0).all()
+            values = ' '.join(f'{quality[column]:>21}' for column in QUALITY_COLUMNS)
+            print(f"{n_students:>9} {n_teachers:>9} {'on' if group_packing else 'off':>8} "
+                  f"{int((live.teacher >= 0).sum()):>8} {seconds:10.3f} {packing:9.3f} {values}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,67 @@
+"""
+Import-time benchmark: `import student_teacher_matcher` against its pandas/numpy floor.
+
+Each measurement runs `python -X importtime` in a fresh interpreter. The run
+fails if a module that is only loaded on demand is imported: the plotting
+libraries (matplotlib, seaborn), the cache, store, shard, scenario and
+feedback log modules, the service, and the profilers (cProfile,
+tracemalloc).
+
+Usage:
+    python -m benchmarks.bench_import [--repeat 5]
+"""
+
+import argparse
+import os
+import re
+import subprocess
+import sys
+
+import numpy as np
+
+# Modules that must not be imported by `import student_teacher_matcher`
+FORBIDDEN = ('matplotlib', 'seaborn', 'matching_cache', 'matching_store', 'matching_shards', 'matching_scenarios',
+             'matching_feedback_log', 'matching_service', 'sqlite3', 'cProfile', 'pstats', 'tracemalloc')
+
+_LINE = re.compile(r'import time:\s+\d+ \|\s+(\d+) \| *(\S+)')
+
+
+def import_times(statement: str) -> dict:
+    """
+    Cumulative import time (microseconds) of every module imported by `statement`.
+
+    Args:
+        statement: Python source run with `-X importtime` in a fresh interpreter
+
+    Returns:
+        dict: {module name: cumulative microseconds}
+    """
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', statement], cwd=root,
+                            capture_output=True, text=True, check=True)
+    return {match.group(2): int(match.group(1)) for match in _LINE.finditer(result.stderr)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    floor, matcher, leaked = [], [], set()
+    for _ in range(args.repeat):
+        floor.append(sum(import_times('import numpy, pandas').get(name, 0) for name in ('numpy', 'pandas')))
+        times = import_times('import student_teacher_matcher')
+        # Cumulative, so it includes the numpy/pandas imports it triggers
+        matcher.append(times['student_teacher_matcher'])
+        leaked |= {name.split('.')[0] for name in times} & set(FORBIDDEN)
+
+    print(f"numpy + pandas:          {np.median(floor) / 1000:8.1f} ms median")
+    print(f"student_teacher_matcher: {np.median(matcher) / 1000:8.1f} ms median")
+    if leaked:
+        print(f"❌ On-demand modules imported eagerly: {', '.join(sorted(leaked))}")
+        sys.exit(1)
+    print("✅ No on-demand modules imported")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,63 @@
+"""
+Incremental re-matching benchmark: apply_changes against a full create_matches.
+
+Each round enrolls one student, drops one student and one teacher, and
+replaces one teacher's availability, then repairs the schedule in place.
+
+Usage:
+    python -m benchmarks.bench_incremental [--students 50000] [--rounds 50]
+"""
+
+import argparse
+import contextlib
+import io
+import time
+
+import numpy as np
+
+from benchmarks.synthetic import generate_data
+from student_teacher_matcher import StudentTeacherMatcher
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--students', type=int, default=50000)
+    parser.add_argument('--students-per-teacher', type=int, default=20)
+    parser.add_argument('--rounds', type=int, default=50)
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    students, teachers = generate_data(args.students, max(1, args.students // args.students_per_teacher), args.seed)
+    extra_students, extra_teachers = generate_data(args.rounds, args.rounds, args.seed + 1)
+    extra_students['student_id'] += len(students)
+
+    matcher = StudentTeacherMatcher()
+    matcher.students_df, matcher.teachers_df = students, teachers
+    with contextlib.redirect_stdout(io.StringIO()):
+        matcher.preprocess_data()
+        start = time.perf_counter()
+        matcher.create_matches()
+        full = time.perf_counter() - start
+
+    rng = np.random.default_rng(args.seed)
+    timings, touched = [], 0
+    for round_ in range(args.rounds):
+        student_ids = matcher.processed_students['student_id'].to_numpy()
+        teacher_ids = matcher.processed_teachers['teacher_id'].to_numpy()
+        updated = extra_teachers.iloc[[round_]].assign(teacher_id=rng.choice(teacher_ids))
+        with contextlib.redirect_stdout(io.StringIO()):
+            start = time.perf_counter()
+            diff = matcher.apply_changes(added={'students': extra_students.iloc[[round_]]},
+                                         removed={'students': [rng.choice(student_ids)],
+                                                  'teachers': [rng.choice(teacher_ids)]},
+                                         updated={'teachers': updated})
+            timings.append(time.perf_counter() - start)
+        touched += sum(len(entries) for entries in diff.values())
+
+    print(f"full create_matches: {full * 1000:9.1f} ms")
+    print(f"apply_changes:       {np.median(timings) * 1000:9.1f} ms median, "
+          f"{max(timings) * 1000:.1f} ms max, {touched / args.rounds:.1f} entries changed per round")
+
+
+if __name__ == '__main__':
+    main()
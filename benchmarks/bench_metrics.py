@@ -0,0 +1,77 @@
+"""
+Schedule metrics benchmark: recounting a schedule vs. reading running counts.
+
+A synthetic schedule of match dictionaries is counted once from scratch (what
+`calculate_metrics` does for a schedule it did not build), then metrics are
+read off the running counts, and 1% of the lessons are replaced
+incrementally. Both ways must give the same metrics.
+
+Usage:
+    python -m benchmarks.bench_metrics [--lessons 100000 1000000] [--students-per-teacher 20]
+"""
+
+import argparse
+import time
+
+import numpy as np
+
+from benchmarks.synthetic import TIME_SLOTS
+from matching_metrics import ScheduleMetrics
+
+N_SUBJECTS = 20
+
+
+def synthetic_schedule(n_lessons: int, n_teachers: int, seed: int):
+    """Match dictionaries and packed subject masks of `n_lessons` random lessons."""
+    rng = np.random.default_rng(seed)
+    masks = rng.integers(1, 2 ** N_SUBJECTS, size=(n_lessons, 1)).astype(np.uint64)
+    matches = [
+        {'student_id': student, 'teacher_id': teacher, 'time_slot': TIME_SLOTS[slot],
+         'lesson_type': '1:1' if group else 'Group', 'subjects': '', 'compatibility_score': round(score, 3)}
+        for student, teacher, slot, group, score in zip(
+            rng.permutation(n_lessons).tolist(), rng.integers(0, n_teachers, n_lessons).tolist(),
+            rng.integers(0, len(TIME_SLOTS), n_lessons).tolist(), (rng.random(n_lessons) < 0.3).tolist(),
+            rng.random(n_lessons).tolist())
+    ]
+    return matches, masks
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--lessons', type=int, nargs='+', default=[100000, 1000000])
+    parser.add_argument('--students-per-teacher', type=int, default=20)
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    print(f"{'lessons':>9} {'recount (s)':>12} {'summary (ms)':>13} {'update 1% (ms)':>15}")
+    for n_lessons in args.lessons:
+        matches, masks = synthetic_schedule(n_lessons, max(1, n_lessons // args.students_per_teacher), args.seed)
+        totals = (n_lessons, max(1, n_lessons // args.students_per_teacher), N_SUBJECTS)
+
+        start = time.perf_counter()
+        metrics = ScheduleMetrics()
+        metrics.update_matches(matches, masks)
+        recount = time.perf_counter() - start
+
+        start = time.perf_counter()
+        metrics.summary(*totals)
+        summary = time.perf_counter() - start
+
+        # Replace 1% of the lessons: every changed lesson moves to the next time slot
+        changed = slice(0, max(1, n_lessons // 100))
+        after = [dict(match, time_slot=TIME_SLOTS[(TIME_SLOTS.index(match['time_slot']) + 1) % len(TIME_SLOTS)])
+                 for match in matches[changed]]
+        start = time.perf_counter()
+        metrics.update_matches(matches[changed], masks[changed], sign=-1)
+        metrics.update_matches(after, masks[changed])
+        update = time.perf_counter() - start
+
+        matches[changed] = after
+        reference = ScheduleMetrics()
+        reference.update_matches(matches, masks)
+        assert metrics.summary(*totals) == reference.summary(*totals)
+        print(f'{n_lessons:>9} {recount:12.3f} {summary * 1000:13.2f} {update * 1000:15.2f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,166 @@
+"""
+End-to-end pipeline benchmark: per-stage wall time, CPU time and peak memory.
+
+Synthetic CSVs are written at each scale and run through load_data,
+preprocess_data, create_matches, generate_schedule_dataframe, export_schedule
+and calculate_metrics. Stages are timed in one pass and their peak traced
+memory (tracemalloc) is measured in a second pass, so tracing does not skew
+the timings. Results are written as JSON; pass an earlier results file as
+--baseline to print per-stage ratios against it.
+
+Usage:
+    python -m benchmarks.bench_pipeline [--students 1000 10000] [--students-per-teacher 20]
+                                        [--subjects 20] [--slot-skew 0] [--chunksize N] [--max-sessions 1]
+                                        [--time-grid]
+                                        [--output results.json] [--baseline old.json]
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import subprocess
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+from typing import Dict
+
+from benchmarks.synthetic import SUBJECTS, write_csvs
+from student_teacher_matcher import StudentTeacherMatcher
+
+STAGES = ['load_data', 'preprocess_data', 'create_matches', 'generate_schedule_dataframe',
+          'export_schedule', 'calculate_metrics']
+
+
+def _git_revision() -> str:
+    """Commit of the working tree, if it is a git checkout."""
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              check=True, cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_pipeline(students_file: str, teachers_file: str, workdir: str, chunksize: int = None,
+                 trace_memory: bool = False, max_sessions: int = 1,
+                 time_grid: bool = False) -> Dict[str, Dict[str, float]]:
+    """
+    Run every stage once on a fresh matcher.
+
+    Args:
+        students_file, teachers_file: Input CSVs
+        workdir: Directory the schedule is exported to
+        chunksize: Passed to load_data
+        trace_memory: Record each stage's peak traced memory instead of its times
+        max_sessions: Passed to create_matches
+        time_grid: Passed to StudentTeacherMatcher
+
+    Returns:
+        dict: {stage: {'seconds', 'cpu_seconds'} or {'peak_bytes'}}, plus a
+        'matches' count
+    """
+    matcher = StudentTeacherMatcher(time_grid=time_grid)
+    calls = {
+        'load_data': lambda: matcher.load_data(students_file, teachers_file, chunksize=chunksize),
+        'preprocess_data': matcher.preprocess_data,
+        'create_matches': lambda: matcher.create_matches(max_sessions=max_sessions),
+        'generate_schedule_dataframe': matcher.generate_schedule_dataframe,
+        'export_schedule': lambda: matcher.export_schedule('csv', os.path.join(workdir, 'schedule.csv')),
+        'calculate_metrics': matcher.calculate_metrics,
+    }
+
+    results = {}
+    for stage in STAGES:
+        with contextlib.redirect_stdout(io.StringIO()):
+            if trace_memory:
+                tracemalloc.start()
+                calls[stage]()
+                results[stage] = {'peak_bytes': tracemalloc.get_traced_memory()[1]}
+                tracemalloc.stop()
+            else:
+                wall, cpu = time.perf_counter(), time.process_time()
+                calls[stage]()
+                results[stage] = {'seconds': time.perf_counter() - wall, 'cpu_seconds': time.process_time() - cpu}
+    results['matches'] = len(matcher.schedule)
+    return results
+
+
+def _compare(result: dict, baseline: dict):
+    """Print per-stage time ratios of `result` against the baseline run of the same scale."""
+    previous = next((run for run in baseline['runs']
+                     if (run['students'], run['teachers']) == (result['students'], result['teachers'])), None)
+    if previous is None:
+        return
+    print(f"  vs baseline {baseline.get('revision') or '?'}:")
+    for stage in STAGES:
+        before, after = previous['stages'][stage]['seconds'], result['stages'][stage]['seconds']
+        print(f"    {stage:<28} {before:9.3f}s -> {after:9.3f}s ({after / max(before, 1e-9):5.2f}x)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--students', type=int, nargs='+', default=[1000, 10000])
+    parser.add_argument('--students-per-teacher', type=int, default=20)
+    parser.add_argument('--subjects', type=int, default=len(SUBJECTS), help='Subject vocabulary size')
+    parser.add_argument('--slot-skew', type=float, default=0.0,
+                        help='Zipf exponent of student time slot preferences (0 = uniform)')
+    parser.add_argument('--chunksize', type=int, default=None)
+    parser.add_argument('--max-sessions', type=int, default=1, help='Lessons per student')
+    parser.add_argument('--time-grid', action='store_true', help='Weekly 30-minute block availability')
+    parser.add_argument('--no-memory', action='store_true', help='Skip the tracemalloc pass')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--output', default=None, help='JSON results file (default: pipeline_<timestamp>.json)')
+    parser.add_argument('--baseline', default=None, help='Earlier JSON results to compare against')
+    args = parser.parse_args()
+
+    baseline = None
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+
+    report = {
+        'revision': _git_revision(),
+        'timestamp': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'parameters': {key: value for key, value in vars(args).items() if key not in ('output', 'baseline')},
+        'runs': [],
+    }
+
+    for n_students in args.students:
+        n_teachers = max(1, n_students // args.students_per_teacher)
+        with tempfile.TemporaryDirectory() as workdir:
+            paths = write_csvs(workdir, n_students, n_teachers, args.seed, args.subjects, args.slot_skew,
+                               args.time_grid)
+            stages = run_pipeline(*paths, workdir, args.chunksize, max_sessions=args.max_sessions,
+                                  time_grid=args.time_grid)
+            matches = stages.pop('matches')
+            if not args.no_memory:
+                memory = run_pipeline(*paths, workdir, args.chunksize, trace_memory=True,
+                                      max_sessions=args.max_sessions, time_grid=args.time_grid)
+                for stage in STAGES:
+                    stages[stage].update(memory[stage])
+
+        result = {'students': n_students, 'teachers': n_teachers, 'matches': matches, 'stages': stages}
+        report['runs'].append(result)
+
+        print(f"{n_students} students / {n_teachers} teachers, {matches} matches")
+        for stage in STAGES:
+            peak = stages[stage].get('peak_bytes')
+            peak_column = f" {peak / 2 ** 20:9.1f} MiB peak" if peak is not None else ''
+            print(f"  {stage:<28} {stages[stage]['seconds']:9.3f}s wall {stages[stage]['cpu_seconds']:9.3f}s cpu"
+                  f"{peak_column}")
+        if baseline:
+            _compare(result, baseline)
+
+    output = args.output or f"pipeline_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
+    with open(output, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"📁 Results written to {output}")
+
+
+if __name__ == '__main__':
+    main()
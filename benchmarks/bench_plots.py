@@ -0,0 +1,60 @@
+"""
+Chart rendering benchmark: headless chart sets for large teacher sets.
+
+A synthetic population is matched, then the full chart set is rendered
+headless: once drawn in-process one chart after another, once in a process
+pool, and once more with unchanged metrics, which only hashes the chart
+data and skips drawing.
+
+Usage:
+    python -m benchmarks.bench_plots [--teachers 500 5000] [--students-per-teacher 20] [--workers 2]
+"""
+
+import argparse
+import contextlib
+import io
+import os
+import tempfile
+import time
+
+from benchmarks.synthetic import write_csvs
+from matching_plots import create_visualizations
+from student_teacher_matcher import StudentTeacherMatcher
+
+
+def timed(matcher, output_dir: str, workers: int, force: bool) -> float:
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        create_visualizations(matcher, output_dir=output_dir, headless=True, workers=workers, force=force)
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--teachers', type=int, nargs='+', default=[500, 5000])
+    parser.add_argument('--students-per-teacher', type=int, default=20)
+    parser.add_argument('--workers', type=int, default=os.cpu_count())
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    print(f"{'teachers':>9} {'lessons':>8} {'serial (s)':>11} {'pool (s)':>9} {'unchanged (s)':>14}")
+    for n_teachers in args.teachers:
+        with tempfile.TemporaryDirectory() as workdir:
+            students_file, teachers_file = write_csvs(workdir, n_teachers * args.students_per_teacher,
+                                                      n_teachers, args.seed)
+            matcher = StudentTeacherMatcher()
+            with contextlib.redirect_stdout(io.StringIO()):
+                matcher.load_data(students_file, teachers_file)
+                matcher.preprocess_data()
+                matcher.create_matches()
+                matcher.calculate_metrics()
+
+            charts = os.path.join(workdir, 'charts')
+            serial = timed(matcher, charts, 1, force=True)
+            pool = timed(matcher, charts, args.workers, force=True)
+            unchanged = timed(matcher, charts, args.workers, force=False)
+            print(f'{n_teachers:>9} {len(matcher.schedule):>8} {serial:11.2f} {pool:9.2f} {unchanged:14.4f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,112 @@
+"""
+What-if scenario benchmark: many teacher deltas over one preprocessed base.
+
+Each scenario removes a few teachers, raises some capacities and hires new
+teachers. The scenarios are evaluated the old way, by loading, preprocessing
+and matching the edited CSVs once per scenario, and with `run_scenarios`,
+in process and in a process pool over shared student arrays. The metrics
+of both ways must agree.
+
+Usage:
+    python -m benchmarks.bench_scenarios [--students 20000] [--teachers 1000] [--scenarios 4] [--workers 2]
+"""
+
+import argparse
+import contextlib
+import io
+import os
+import pickle
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+from benchmarks.synthetic import generate_data
+from matching_scenarios import _share_students, run_scenarios
+from student_teacher_matcher import StudentTeacherMatcher
+
+COMPARED = ['matched_students', 'total_lessons', 'average_compatibility_score',
+            'teacher_utilization.utilized_teachers']
+
+
+def make_scenarios(rng: np.random.Generator, teachers: pd.DataFrame, n_scenarios: int, size: int) -> list:
+    """Teacher deltas: `size` teachers removed, `size` capacities raised and `size` teachers hired."""
+    _, hires = generate_data(0, size * n_scenarios, seed=int(rng.integers(1 << 31)))
+    hires['teacher_id'] += teachers['teacher_id'].max()
+    scenarios = []
+    for number in range(n_scenarios):
+        picked = rng.choice(teachers['teacher_id'].to_numpy(), 2 * size, replace=False).tolist()
+        scenarios.append({
+            'name': f'scenario {number}',
+            'removed': {'teachers': picked[:size]},
+            'updated': {'teachers': [{'teacher_id': teacher, 'max_students_per_slot': 6} for teacher in picked[size:]]},
+            'added': {'teachers': hires[number * size:(number + 1) * size].to_dict('records')},
+        })
+    return scenarios
+
+
+def edited_teachers(teachers: pd.DataFrame, scenario: dict) -> pd.DataFrame:
+    """The raw teachers CSV rows a scenario describes."""
+    edited = teachers[~teachers['teacher_id'].isin(scenario['removed']['teachers'])].copy()
+    raised = [row['teacher_id'] for row in scenario['updated']['teachers']]
+    edited.loc[edited['teacher_id'].isin(raised), 'max_students_per_slot'] = 6
+    return pd.concat([edited, pd.DataFrame(scenario['added']['teachers'])], ignore_index=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--students', type=int, default=20000)
+    parser.add_argument('--teachers', type=int, default=1000)
+    parser.add_argument('--scenarios', type=int, default=4)
+    parser.add_argument('--delta', type=int, default=50, help='Teachers removed, updated and added per scenario')
+    parser.add_argument('--workers', type=int, default=os.cpu_count())
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    students, teachers = generate_data(args.students, args.teachers, args.seed)
+    scenarios = make_scenarios(rng, teachers, args.scenarios, args.delta)
+
+    with tempfile.TemporaryDirectory() as workdir, contextlib.redirect_stdout(io.StringIO()):
+        students_path = os.path.join(workdir, 'students.csv')
+        students.to_csv(students_path, index=False)
+        start = time.perf_counter()
+        reloaded = {}
+        for scenario in scenarios:
+            teachers_path = os.path.join(workdir, 'teachers.csv')
+            edited_teachers(teachers, scenario).to_csv(teachers_path, index=False)
+            matcher = StudentTeacherMatcher()
+            matcher.load_data(students_path, teachers_path)
+            matcher.preprocess_data()
+            matcher.create_matches()
+            reloaded[scenario['name']] = matcher.calculate_metrics()
+        reload_time = time.perf_counter() - start
+
+        matcher = StudentTeacherMatcher()
+        teachers.to_csv(os.path.join(workdir, 'teachers.csv'), index=False)
+        matcher.load_data(students_path, os.path.join(workdir, 'teachers.csv'))
+        matcher.preprocess_data()
+        timings = {}
+        for workers in (1, args.workers):
+            start = time.perf_counter()
+            table = run_scenarios(matcher, scenarios, workers=workers, include_base=False)
+            timings[workers] = time.perf_counter() - start
+
+    for name, metrics in reloaded.items():
+        expected = pd.json_normalize(metrics).iloc[0]
+        assert all(expected[column] == table.loc[name, column] for column in COMPARED), name
+
+    arrays, _ = _share_students(matcher.encoded_students)
+    shared = sum(array.nbytes for array in arrays.values()) / 1e6
+    pickled = len(pickle.dumps(matcher.encoded_students)) / 1e6
+    print(f"{args.scenarios} scenarios, {args.students} students, {args.teachers} teachers")
+    print(f"   reload per scenario: {reload_time:8.2f} s")
+    print(f"   run_scenarios (1):   {timings[1]:8.2f} s")
+    print(f"   run_scenarios ({args.workers}):   {timings[args.workers]:8.2f} s")
+    print(f"   students shared once: {shared:.1f} MB (pickled per scenario: {pickled:.1f} MB)")
+    print(table[COMPARED].to_string())
+
+
+if __name__ == '__main__':
+    main()
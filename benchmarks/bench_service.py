@@ -0,0 +1,142 @@
+"""
+Matching service load test: latency percentiles and throughput per endpoint.
+
+Synthetic input files are written to a temporary directory, the service is
+started on them in a subprocess (so client and server do not share a
+GIL), and keep-alive client connections send a mix of schedule lookups,
+availability queries and batches of new students to match. Reports p50 and
+p99 latency per endpoint and overall requests per second.
+
+Usage:
+    python -m benchmarks.bench_service [--students 20000] [--connections 16] [--requests 2000] [--batch 10]
+"""
+
+import argparse
+import asyncio
+import json
+import subprocess
+import sys
+import tempfile
+import time
+from collections import defaultdict
+
+import numpy as np
+
+from benchmarks.synthetic import SUBJECTS, TIME_SLOTS, generate_data, write_csvs
+
+# Share of requests per endpoint
+MIX = {'schedule': 0.5, 'availability': 0.3, 'match': 0.2}
+
+
+async def request(reader: asyncio.StreamReader, writer: asyncio.StreamWriter, method: str, path: str,
+                  body: dict = None) -> int:
+    """Send one keep-alive request and read the whole response; returns the status code."""
+    data = json.dumps(body).encode() if body is not None else b''
+    writer.write(f'{method} {path} HTTP/1.1\r\nHost: bench\r\nContent-Type: application/json\r\n'
+                 f'Content-Length: {len(data)}\r\n\r\n'.encode() + data)
+    await writer.drain()
+    status = int((await reader.readline()).split()[1])
+    length = 0
+    while True:
+        line = await reader.readline()
+        if line in (b'\r\n', b''):
+            break
+        name, _, value = line.decode('latin-1').partition(':')
+        if name.lower() == 'content-length':
+            length = int(value)
+    await reader.readexactly(length)
+    return status
+
+
+async def client(host: str, port: int, jobs: asyncio.Queue, latencies: dict, errors: list):
+    """One connection working through the shared job queue."""
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        while True:
+            try:
+                endpoint, method, path, body = jobs.get_nowait()
+            except asyncio.QueueEmpty:
+                return
+            start = time.perf_counter()
+            status = await request(reader, writer, method, path, body)
+            latencies[endpoint].append(time.perf_counter() - start)
+            if status != 200:
+                errors.append((endpoint, status))
+    finally:
+        writer.close()
+
+
+def make_jobs(args, n_students: int) -> list:
+    """The request mix, with ids of existing students and batches of new ones."""
+    rng = np.random.default_rng(args.seed)
+    endpoints = rng.choice(list(MIX), size=args.requests, p=list(MIX.values()))
+    n_batches = int((endpoints == 'match').sum())
+    new_students, _ = generate_data(max(1, n_batches * args.batch), 1, args.seed + 1)
+    new_students['student_id'] += n_students
+    batches = iter(np.array_split(new_students.to_dict('records'), max(1, n_batches)))
+
+    jobs = []
+    for endpoint in endpoints.tolist():
+        if endpoint == 'schedule':
+            jobs.append((endpoint, 'GET', f'/schedule?student_id={rng.integers(1, n_students + 1)}', None))
+        elif endpoint == 'availability':
+            jobs.append((endpoint, 'GET', f'/availability?subject={rng.choice(SUBJECTS)}'
+                                          f'&time_slot={rng.choice(TIME_SLOTS)}&limit=20', None))
+        else:
+            jobs.append((endpoint, 'POST', '/match', {'students': list(next(batches))}))
+    return jobs
+
+
+async def load(host: str, port: int, jobs: list, connections: int):
+    queue = asyncio.Queue()
+    for job in jobs:
+        queue.put_nowait(job)
+    latencies, errors = defaultdict(list), []
+    start = time.perf_counter()
+    await asyncio.gather(*(client(host, port, queue, latencies, errors) for _ in range(connections)))
+    return time.perf_counter() - start, latencies, errors
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--students', type=int, default=20000)
+    parser.add_argument('--students-per-teacher', type=int, default=20)
+    parser.add_argument('--connections', type=int, default=16)
+    parser.add_argument('--requests', type=int, default=2000)
+    parser.add_argument('--batch', type=int, default=10, help='New students per /match request')
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as workdir:
+        students_file, teachers_file = write_csvs(workdir, args.students,
+                                                  max(1, args.students // args.students_per_teacher), args.seed)
+        start = time.perf_counter()
+        server = subprocess.Popen([sys.executable, '-m', 'matching_service', '--students', students_file,
+                                   '--teachers', teachers_file, '--port', '0'],
+                                  stdout=subprocess.PIPE, text=True)
+        try:
+            for line in server.stdout:
+                if 'listening on' in line:
+                    host, port = line.split('//')[-1].strip().rsplit(':', 1)
+                    break
+            else:
+                raise RuntimeError("The service did not start")
+            startup = time.perf_counter() - start
+
+            jobs = make_jobs(args, args.students)
+            seconds, latencies, errors = asyncio.run(load(host, int(port), jobs, args.connections))
+        finally:
+            server.terminate()
+            server.wait()
+
+    print(f"students: {args.students}, connections: {args.connections}, startup (load + match): {startup:.2f}s")
+    print(f"{'endpoint':>13} {'requests':>9} {'p50 (ms)':>9} {'p99 (ms)':>9}")
+    for endpoint in MIX:
+        times = np.array(latencies[endpoint]) * 1000
+        if len(times):
+            print(f'{endpoint:>13} {len(times):>9} {np.percentile(times, 50):9.2f} {np.percentile(times, 99):9.2f}')
+    print(f"throughput: {len(jobs) / seconds:.0f} requests/s over {seconds:.2f}s, {len(errors)} errors")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,53 @@
+"""
+Sharded matching benchmark: wall time of create_matches by worker count.
+
+Students and teachers are spread over synthetic regions passed as the shard
+column, so every region is an independent shard.
+
+Usage:
+    python -m benchmarks.bench_shards [--students 200000] [--regions 64] [--workers 1 2 4 8 16 32]
+"""
+
+import argparse
+import contextlib
+import io
+import time
+
+import numpy as np
+
+from benchmarks.synthetic import generate_data
+from student_teacher_matcher import StudentTeacherMatcher
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--students', type=int, default=200000)
+    parser.add_argument('--students-per-teacher', type=int, default=20)
+    parser.add_argument('--regions', type=int, default=64)
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4, 8, 16, 32])
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    students, teachers = generate_data(args.students, max(1, args.students // args.students_per_teacher), args.seed)
+    rng = np.random.default_rng(args.seed)
+    students['region'] = rng.integers(0, args.regions, size=len(students))
+    teachers['region'] = rng.integers(0, args.regions, size=len(teachers))
+
+    matcher = StudentTeacherMatcher()
+    matcher.students_df, matcher.teachers_df = students, teachers
+    with contextlib.redirect_stdout(io.StringIO()):
+        matcher.preprocess_data()
+
+    print(f"{'workers':>8} {'time (s)':>9} {'speedup':>8} {'matched':>8}")
+    baseline = None
+    for workers in args.workers:
+        with contextlib.redirect_stdout(io.StringIO()):
+            start = time.perf_counter()
+            matches = matcher.create_matches(workers=workers, shard_column='region')
+            elapsed = time.perf_counter() - start
+        baseline = baseline or elapsed
+        print(f'{workers:>8} {elapsed:9.2f} {baseline / elapsed:7.1f}x {len(matches):>8}')
+
+
+if __name__ == '__main__':
+    main()
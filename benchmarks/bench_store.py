@@ -0,0 +1,82 @@
+"""
+SQLite store benchmark: bulk CSV load, schedule write and indexed group lookups.
+
+Synthetic CSVs are bulk-loaded into a fresh database, matched from the store
+and the schedule written back in one transaction. Looking up the students of
+a teacher's time slot is then timed as an indexed query and as a scan over
+the in-memory schedule list; both must return the same students.
+
+Usage:
+    python -m benchmarks.bench_store [--students 10000 100000] [--students-per-teacher 20] [--lookups 1000]
+"""
+
+import argparse
+import contextlib
+import io
+import os
+import tempfile
+import time
+
+import numpy as np
+
+from benchmarks.synthetic import write_csvs
+from matching_store import MatchingStore
+from student_teacher_matcher import StudentTeacherMatcher
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--students', type=int, nargs='+', default=[10000, 100000])
+    parser.add_argument('--students-per-teacher', type=int, default=20)
+    parser.add_argument('--lookups', type=int, default=1000)
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    print(f"{'students':>9} {'matches':>8} {'load (s)':>9} {'write (s)':>10} "
+          f"{'scan (us)':>10} {'indexed (us)':>13}")
+    for n_students in args.students:
+        n_teachers = max(1, n_students // args.students_per_teacher)
+        with tempfile.TemporaryDirectory() as workdir:
+            students_file, teachers_file = write_csvs(workdir, n_students, n_teachers, args.seed)
+            path = os.path.join(workdir, 'schedule.db')
+
+            store = MatchingStore(path)
+            start = time.perf_counter()
+            store.load_csv('students', students_file)
+            store.load_csv('teachers', teachers_file)
+            load = time.perf_counter() - start
+            store.close()
+
+            matcher = StudentTeacherMatcher(instrument=True, store=path)
+            with contextlib.redirect_stdout(io.StringIO()):
+                matcher.load_store()
+                matcher.preprocess_data()
+                matcher.create_matches()
+            write = matcher.stats.stages['create_matches.store_schedule']['wall_seconds']
+            schedule = matcher.schedule
+
+            rng = np.random.default_rng(args.seed)
+            groups = [(schedule[i]['teacher_id'], schedule[i]['time_slot'])
+                      for i in rng.integers(0, len(schedule), args.lookups)]
+
+            start = time.perf_counter()
+            scanned = [[match['student_id'] for match in schedule
+                        if match['teacher_id'] == teacher_id and match['time_slot'] == time_slot]
+                       for teacher_id, time_slot in groups]
+            scan = (time.perf_counter() - start) / len(groups)
+
+            reader = MatchingStore(path)
+            start = time.perf_counter()
+            indexed = [[row['student_id'] for row in reader.group(teacher_id, time_slot)]
+                       for teacher_id, time_slot in groups]
+            lookup = (time.perf_counter() - start) / len(groups)
+            reader.close()
+            matcher.store.close()
+
+            assert all(sorted(a) == sorted(b) for a, b in zip(scanned, indexed))
+            print(f'{n_students:>9} {len(schedule):>8} {load:9.3f} {write:10.3f} '
+                  f'{scan * 1e6:10.1f} {lookup * 1e6:13.1f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,48 @@
+"""
+Greedy vs. optimal (min-cost flow) assignment benchmark.
+
+Usage:
+    python -m benchmarks.bench_strategies [--students 1000 10000 100000] [--students-per-teacher 20]
+                                          [--strategies greedy optimal]
+"""
+
+import argparse
+import contextlib
+import io
+import time
+
+from benchmarks.synthetic import generate_data
+from student_teacher_matcher import StudentTeacherMatcher
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--students', type=int, nargs='+', default=[1000, 10000, 100000])
+    parser.add_argument('--students-per-teacher', type=int, default=20,
+                        help='Lower values leave spare capacity and both strategies match everyone')
+    parser.add_argument('--strategies', nargs='+', default=['greedy', 'optimal'],
+                        choices=['greedy', 'optimal'])
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    print(f"{'students':>9} {'teachers':>9} {'strategy':>9} {'time (s)':>9} {'matched':>8} {'avg score':>10}")
+
+    for n_students in args.students:
+        n_teachers = max(1, n_students // args.students_per_teacher)
+        students, teachers = generate_data(n_students, n_teachers, args.seed)
+
+        for strategy in args.strategies:
+            matcher = StudentTeacherMatcher()
+            matcher.students_df, matcher.teachers_df = students, teachers
+            with contextlib.redirect_stdout(io.StringIO()):
+                matcher.preprocess_data()
+                start = time.perf_counter()
+                matches = matcher.create_matches(strategy=strategy)
+                elapsed = time.perf_counter() - start
+
+            average = sum(match['compatibility_score'] for match in matches) / max(1, len(matches))
+            print(f'{n_students:>9} {n_teachers:>9} {strategy:>9} {elapsed:9.2f} {len(matches):>8} {average:10.3f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,72 @@
+"""
+Greedy assignment benchmark: every candidate materialized vs. bounded top-k buffers.
+
+Both runs must produce the same matches; time and peak traced memory
+(tracemalloc) of `match_students` are reported for each.
+
+Usage:
+    python -m benchmarks.bench_top_k [--students 10000 50000] [--students-per-teacher 20] [--top-k 1 8]
+"""
+
+import argparse
+import contextlib
+import io
+import time
+import tracemalloc
+
+import numpy as np
+
+from benchmarks.synthetic import generate_data
+from matching_engine import CapacityTable, match_students
+from student_teacher_matcher import StudentTeacherMatcher
+
+
+def run(matcher: StudentTeacherMatcher, top_k: int, trace_memory: bool):
+    """Greedy-match the matcher's processed data; returns (seconds or peak bytes, accepted matches)."""
+    engine = matcher._build_engine()
+    capacity = CapacityTable(matcher.processed_teachers['max_students_per_slot'], engine.teacher_slots,
+                             len(engine.slots))
+    if trace_memory:
+        tracemalloc.start()
+        accepted = match_students(engine, capacity, top_k=top_k)
+        measurement = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+    else:
+        start = time.perf_counter()
+        accepted = match_students(engine, capacity, top_k=top_k)
+        measurement = time.perf_counter() - start
+    return measurement, accepted
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--students', type=int, nargs='+', default=[10000, 50000])
+    parser.add_argument('--students-per-teacher', type=int, default=20)
+    parser.add_argument('--top-k', type=int, nargs='+', default=[1, 8])
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    print(f"{'students':>9} {'teachers':>9} {'top-k':>6} {'matches':>8} {'time (s)':>9} {'peak (MiB)':>11}")
+    for n_students in args.students:
+        n_teachers = max(1, n_students // args.students_per_teacher)
+        matcher = StudentTeacherMatcher()
+        matcher.students_df, matcher.teachers_df = generate_data(n_students, n_teachers, args.seed)
+        with contextlib.redirect_stdout(io.StringIO()):
+            matcher.preprocess_data()
+
+        reference = None
+        for top_k in [0] + args.top_k:
+            seconds, accepted = run(matcher, top_k, trace_memory=False)
+            peak, _ = run(matcher, top_k, trace_memory=True)
+            if reference is None:
+                reference = accepted
+            else:
+                assert all(np.array_equal(a, b) for a, b in zip(reference[:4], accepted[:4])), top_k
+                assert reference[4] == accepted[4], top_k
+            label = 'all' if not top_k else top_k
+            print(f'{n_students:>9} {n_teachers:>9} {label:>6} {len(accepted[0]):>8} {seconds:9.3f} '
+                  f'{peak / 2 ** 20:11.1f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,109 @@
+"""
+Seeded synthetic students/teachers data in the schemas of the sample CSVs.
+"""
+
+import os
+import numpy as np
+import pandas as pd
+from typing import List, Optional, Tuple
+
+SUBJECTS = ['Math', 'Science', 'English', 'History', 'Geography', 'Art', 'Music',
+            'Physics', 'Chemistry', 'Biology', 'French', 'Spanish', 'Economics',
+            'Literature', 'Computing', 'Statistics', 'Civics', 'Drama', 'Yoruba', 'Igbo']
+TIME_SLOTS = ['Morning', 'Afternoon', 'Evening']
+GRID_DAYS = ['Mon', 'Tue', 'Wed', 'Thu', 'Fri', 'Sat', 'Sun']
+
+# Rows in the sample students.csv / teachers.csv
+SAMPLE_STUDENTS = 10
+SAMPLE_TEACHERS = 5
+
+
+def subject_names(n_subjects: int) -> List[str]:
+    """The first `n_subjects` of SUBJECTS, extended with 'Subject N' names beyond it."""
+    return SUBJECTS[:n_subjects] + [f'Subject {i}' for i in range(len(SUBJECTS) + 1, n_subjects + 1)]
+
+
+def slot_weights(slot_skew: float) -> Optional[np.ndarray]:
+    """
+    Zipf-like time slot popularity: slot i is weighted 1 / (i + 1) ** slot_skew.
+
+    Returns:
+        np.ndarray or None: Probabilities, None (uniform) when `slot_skew` is 0
+    """
+    if not slot_skew:
+        return None
+    weights = 1.0 / np.arange(1, len(TIME_SLOTS) + 1) ** slot_skew
+    return weights / weights.sum()
+
+
+def _pick(rng: np.random.Generator, options, max_items: int, size: int, p: np.ndarray = None) -> list:
+    """Pick `size` comma-separated lists of 1..max_items distinct options."""
+    counts = rng.integers(1, max_items + 1, size=size)
+    return [', '.join(rng.choice(options, size=count, replace=False, p=p)) for count in counts]
+
+
+def _intervals(rng: np.random.Generator, max_intervals: int, max_hours: int, size: int) -> list:
+    """Pick `size` '; '-separated lists of 1..max_intervals weekly intervals of 1..max_hours hours."""
+    counts = rng.integers(1, max_intervals + 1, size=size)
+    days = rng.choice(GRID_DAYS, size=counts.sum())
+    starts = rng.integers(8, 20, size=counts.sum())
+    ends = np.minimum(starts + rng.integers(1, max_hours + 1, size=counts.sum()), 22)
+    cells = [f'{day} {start:02d}:00-{end:02d}:00' for day, start, end in zip(days, starts.tolist(), ends.tolist())]
+    bounds = np.cumsum(counts)
+    return ['; '.join(cells[stop - count:stop]) for count, stop in zip(counts.tolist(), bounds.tolist())]
+
+
+def generate_data(n_students: int, n_teachers: int, seed: int = 42, n_subjects: int = len(SUBJECTS),
+                  slot_skew: float = 0.0, time_grid: bool = False) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    """
+    Generate students and teachers frames.
+
+    Args:
+        n_students: Number of student rows
+        n_teachers: Number of teacher rows
+        seed: Random seed
+        n_subjects: Size of the subject vocabulary
+        slot_skew: Zipf exponent of student time slot preferences (0 = uniform);
+            teachers stay uniform, so a skew crowds students into the first slots
+        time_grid: Weekly interval availability ('Mon 09:00-11:00; ...') for
+            `StudentTeacherMatcher(time_grid=True)` instead of the three slots
+
+    Returns:
+        tuple: (students_df, teachers_df)
+    """
+    rng = np.random.default_rng(seed)
+    subjects = subject_names(n_subjects)
+
+    students = pd.DataFrame({
+        'student_id': np.arange(1, n_students + 1),
+        'name': [f'Student {i}' for i in range(1, n_students + 1)],
+        'grade': rng.integers(1, 13, size=n_students),
+        'subjects': _pick(rng, subjects, 3, n_students),
+        'preferred_time_slots': (_intervals(rng, 3, 3, n_students) if time_grid else
+                                 _pick(rng, TIME_SLOTS, 2, n_students, p=slot_weights(slot_skew))),
+    })
+    teachers = pd.DataFrame({
+        'teacher_id': np.arange(1, n_teachers + 1),
+        'name': [f'Teacher {i}' for i in range(1, n_teachers + 1)],
+        'subjects': _pick(rng, subjects, 2, n_teachers),
+        'available_time_slots': (_intervals(rng, 5, 6, n_teachers) if time_grid else
+                                 _pick(rng, TIME_SLOTS, 3, n_teachers)),
+        'max_students_per_slot': rng.integers(1, 5, size=n_teachers),
+    })
+    return students, teachers
+
+
+def write_csvs(directory: str, n_students: int, n_teachers: int, seed: int = 42,
+               n_subjects: int = len(SUBJECTS), slot_skew: float = 0.0, time_grid: bool = False) -> Tuple[str, str]:
+    """
+    Generate data (see `generate_data`) and write it as students.csv / teachers.csv.
+
+    Returns:
+        tuple: (students CSV path, teachers CSV path)
+    """
+    os.makedirs(directory, exist_ok=True)
+    students, teachers = generate_data(n_students, n_teachers, seed, n_subjects, slot_skew, time_grid)
+    paths = os.path.join(directory, 'students.csv'), os.path.join(directory, 'teachers.csv')
+    students.to_csv(paths[0], index=False)
+    teachers.to_csv(paths[1], index=False)
+    return paths
@@ -0,0 +1,192 @@
+"""
+On-disk cache of preprocessed data and candidate sets for the Student-Teacher Matching system.
+
+Entries are keyed by a hash of the students and teachers file contents, the
+ingest mode and the code version (a hash of the ingest, vocabulary, time grid
+and engine modules and of the matcher's preprocessing methods), so editing
+either the data or the matching code invalidates them. Each entry is a
+directory holding the encoded frames as Parquet files, their packed masks as
+`.npy` files, the vocabularies and, once matches were created, the scored
+candidate arrays. Nothing is unpickled, so a cache directory can be shared
+without trusting whoever wrote it. The cache needs pyarrow. The cache
+directory is kept under a byte budget by evicting the least recently used
+entries.
+"""
+
+import hashlib
+import inspect
+import json
+import os
+import shutil
+import tempfile
+import numpy as np
+import pandas as pd
+from typing import Callable, List, Optional, Tuple
+
+import matching_engine
+import matching_ingest
+import matching_timegrid
+import matching_vocabulary
+from matching_ingest import EncodedTable
+
+# Bump when the on-disk layout changes
+CACHE_FORMAT = 2
+
+# Default byte budget of a cache directory
+DEFAULT_CACHE_BYTES = 1 << 30
+
+_CANDIDATE_ARRAYS = ('student_idx', 'teacher_idx', 'slot_idx', 'scores')
+
+
+def _file_digest(path: str, digest=None):
+    """Feed a file's contents into a hash object in 1 MiB blocks."""
+    digest = digest or hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest
+
+
+def code_version(*functions: Callable) -> str:
+    """
+    Hash of the code that decides what ends up in a cache entry.
+
+    Args:
+        *functions: Further functions or methods whose source is hashed
+            (e.g. the matcher's `preprocess_data`) besides the ingest,
+            vocabulary, time grid and engine modules
+
+    Returns:
+        str: Hex digest
+    """
+    digest = hashlib.sha256(str(CACHE_FORMAT).encode())
+    for module in (matching_ingest, matching_vocabulary, matching_timegrid, matching_engine):
+        _file_digest(module.__file__, digest)
+    for function in functions:
+        digest.update(inspect.getsource(function).encode())
+    return digest.hexdigest()
+
+
+def _directory_size(path: str) -> int:
+    """Total size of the files directly inside `path`."""
+    return sum(entry.stat().st_size for entry in os.scandir(path) if entry.is_file())
+
+
+class MatchingCache:
+    """Size-bounded LRU cache of encoded students/teachers and their candidates."""
+
+    def __init__(self, directory: str, max_bytes: int = None, code: Tuple[Callable, ...] = ()):
+        """
+        Args:
+            directory: Cache directory, created if missing
+            max_bytes: Byte budget (DEFAULT_CACHE_BYTES if None); least
+                recently used entries are evicted beyond it
+            code: Functions whose source is part of the code version (see `code_version`)
+        """
+        try:
+            import pyarrow  # noqa: F401
+        except ImportError as error:
+            raise ImportError("The preprocessing cache needs pyarrow: pip install pyarrow") from error
+        self.directory = directory
+        self.max_bytes = DEFAULT_CACHE_BYTES if max_bytes is None else max_bytes
+        self._code_version = code_version(*code)
+        os.makedirs(directory, exist_ok=True)
+
+    def key(self, students_file: str, teachers_file: str, mode: str) -> str:
+        """
+        Cache key of a pair of input files.
+
+        Args:
+            students_file: Path to students CSV file
+            teachers_file: Path to teachers CSV file
+            mode: Ingest mode, since chunked and full reads keep different columns
+
+        Returns:
+            str: Hex digest of the file contents, mode and code version
+        """
+        digest = hashlib.sha256(f'{self._code_version}:{mode}'.encode())
+        for path in (students_file, teachers_file):
+            digest.update(_file_digest(path).digest())
+        return digest.hexdigest()
+
+    def _path(self, key: str, name: str = '') -> str:
+        return os.path.join(self.directory, key, name)
+
+    def _touch(self, key: str):
+        """Mark an entry as most recently used."""
+        os.utime(self._path(key))
+
+    def load_tables(self, key: str) -> Optional[Tuple[EncodedTable, EncodedTable, List[str], List[str]]]:
+        """
+        Encoded students and teachers of an entry.
+
+        Returns:
+            tuple or None: (students, teachers, subject tokens, time slot tokens)
+            in code order, None on a miss
+        """
+        try:
+            with open(self._path(key, 'meta.json')) as f:
+                meta = json.load(f)
+            tables = [
+                EncodedTable(pd.read_parquet(self._path(key, f'{kind}.parquet')),
+                             np.load(self._path(key, f'{kind}_subjects.npy')),
+                             np.load(self._path(key, f'{kind}_slots.npy')))
+                for kind in ('students', 'teachers')
+            ]
+        except (OSError, ValueError):
+            return None
+        self._touch(key)
+        return tables[0], tables[1], meta['subjects'], meta['time_slots']
+
+    def store_tables(self, key: str, students: EncodedTable, teachers: EncodedTable,
+                     subject_tokens: List[str], slot_tokens: List[str]):
+        """Write a new entry with encoded students and teachers; existing entries are kept."""
+        if os.path.isdir(self._path(key)):
+            return
+        staging = tempfile.mkdtemp(prefix=f'.{key}.', dir=self.directory)
+        for kind, table in (('students', students), ('teachers', teachers)):
+            table.frame.to_parquet(os.path.join(staging, f'{kind}.parquet'), index=False)
+            np.save(os.path.join(staging, f'{kind}_subjects.npy'), table.subjects)
+            np.save(os.path.join(staging, f'{kind}_slots.npy'), table.slots)
+        with open(os.path.join(staging, 'meta.json'), 'w') as f:
+            json.dump({'subjects': subject_tokens, 'time_slots': slot_tokens}, f)
+        try:
+            os.rename(staging, self._path(key))
+        except OSError:
+            # Another process stored the same entry first
+            shutil.rmtree(staging, ignore_errors=True)
+        self._evict(keep=key)
+
+    def load_candidates(self, key: str) -> Optional[Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]]:
+        """Scored candidate arrays of an entry, None on a miss (see `CompatibilityEngine.candidate_pairs`)."""
+        try:
+            with np.load(self._path(key, 'candidates.npz')) as arrays:
+                candidates = tuple(arrays[name] for name in _CANDIDATE_ARRAYS)
+        except (OSError, ValueError, KeyError):
+            return None
+        self._touch(key)
+        return candidates
+
+    def store_candidates(self, key: str, candidates: Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]):
+        """Add scored candidate arrays to an existing entry."""
+        if not os.path.isdir(self._path(key)):
+            return
+        fd, staging = tempfile.mkstemp(suffix='.npz', dir=self._path(key))
+        with os.fdopen(fd, 'wb') as f:
+            np.savez(f, **dict(zip(_CANDIDATE_ARRAYS, candidates)))
+        os.replace(staging, self._path(key, 'candidates.npz'))
+        self._touch(key)
+        self._evict(keep=key)
+
+    def _evict(self, keep: str):
+        """Remove least recently used entries until the cache fits its byte budget."""
+        entries = [entry for entry in os.scandir(self.directory)
+                   if entry.is_dir() and not entry.name.startswith('.')]
+        sizes = {entry.name: _directory_size(entry.path) for entry in entries}
+        total = sum(sizes.values())
+        for entry in sorted(entries, key=lambda entry: entry.stat().st_mtime):
+            if total <= self.max_bytes:
+                break
+            if entry.name != keep:
+                shutil.rmtree(entry.path, ignore_errors=True)
+                total -= sizes[entry.name]
@@ -0,0 +1,779 @@
+"""
+Vectorized compatibility engine for the Student-Teacher Matching system.
+
+Subjects and time slots are encoded once as packed integer bitmasks. An
+inverted (subject, time slot) index restricts scoring to teachers who could
+actually match a student, and Jaccard scores and slot overlaps for those
+pairs are computed with NumPy instead of building Python sets per pair.
+"""
+
+import heapq
+import numpy as np
+from typing import Iterable, Iterator, List, Sequence, Tuple
+
+from matching_stats import DISABLED, MatchingStats
+from matching_vocabulary import Vocabulary, mask_positions, pad_words, popcount, unpack_bits
+
+# Candidates buffered per student by the greedy top-k assignment
+DEFAULT_TOP_K = 8
+
+class CandidateIndex:
+    """
+    Inverted index from (subject, time slot bucket) to the teachers offering it.
+
+    Postings hold teacher row positions in the processed teachers frame; use
+    `teacher_ids` to translate them back to `teacher_id` values. With the
+    three coarse slots every slot is its own bucket; on a time grid a bucket
+    is a day of blocks, so teachers share keys per day instead of per block
+    and exact slot overlaps are left to scoring.
+    """
+
+    def __init__(self, teacher_ids: Sequence, teacher_subjects: np.ndarray, teacher_slots: np.ndarray,
+                 slots_per_bucket: int = 1):
+        """
+        Build the index from encoded teachers.
+
+        Args:
+            teacher_ids: `teacher_id` of every teacher row
+            teacher_subjects: Packed subject bitmasks, one row per teacher
+            teacher_slots: Packed time slot bitmasks, one row per teacher
+            slots_per_bucket: Consecutive slot codes sharing one key
+        """
+        self.teacher_ids = np.asarray(teacher_ids)
+        self.slots_per_bucket = slots_per_bucket
+        postings = {}
+        for teacher, (subjects, slots) in enumerate(zip(teacher_subjects, teacher_slots)):
+            for key in self._keys(subjects, slots):
+                postings.setdefault(key, []).append(teacher)
+        self._postings = {key: np.array(teachers, dtype=np.int64) for key, teachers in postings.items()}
+
+    def __len__(self) -> int:
+        return len(self._postings)
+
+    def _buckets(self, slot_codes: Iterable[int]) -> List[int]:
+        """Distinct buckets of time slot codes."""
+        return sorted({slot // self.slots_per_bucket for slot in slot_codes})
+
+    def _keys(self, subjects: np.ndarray, slots: np.ndarray) -> List[Tuple[int, int]]:
+        """(subject, slot bucket) keys covered by one teacher's masks."""
+        buckets = self._buckets(mask_positions(slots))
+        return [(subject, bucket) for subject in mask_positions(subjects) for bucket in buckets]
+
+    def add(self, teacher: int, subjects: np.ndarray, slots: np.ndarray):
+        """
+        Post one teacher row under every (subject, slot bucket) key of its masks.
+
+        Args:
+            teacher: Teacher row position
+            subjects: Packed subject bitmask of the teacher
+            slots: Packed time slot bitmask of the teacher
+        """
+        for key in self._keys(subjects, slots):
+            postings = self._postings.get(key)
+            if postings is None:
+                self._postings[key] = np.array([teacher], dtype=np.int64)
+            elif teacher not in postings:
+                position = np.searchsorted(postings, teacher)
+                self._postings[key] = np.insert(postings, position, teacher)
+
+    def remove(self, teacher: int, subjects: np.ndarray, slots: np.ndarray):
+        """Withdraw one teacher row from every (subject, slot bucket) key of its masks."""
+        for key in self._keys(subjects, slots):
+            postings = self._postings.get(key)
+            if postings is None:
+                continue
+            postings = postings[postings != teacher]
+            if len(postings):
+                self._postings[key] = postings
+            else:
+                del self._postings[key]
+
+    def append_teacher(self, teacher_id, subjects: np.ndarray, slots: np.ndarray) -> int:
+        """
+        Add a new teacher row at the end and index it.
+
+        Returns:
+            int: Row position of the new teacher
+        """
+        teacher = len(self.teacher_ids)
+        self.teacher_ids = np.append(self.teacher_ids, teacher_id)
+        self.add(teacher, subjects, slots)
+        return teacher
+
+    def compact(self, keep: np.ndarray):
+        """
+        Drop teacher rows and renumber the rest in order.
+
+        Args:
+            keep: Boolean mask of teacher rows to keep; dropped rows must
+                already have been withdrawn with `remove`
+        """
+        row = np.cumsum(keep) - 1
+        self.teacher_ids = self.teacher_ids[keep]
+        self._postings = {key: row[teachers] for key, teachers in self._postings.items()}
+
+    def lookup(self, subject_codes: Iterable[int], slot_codes: Iterable[int]) -> np.ndarray:
+        """
+        Teachers sharing at least one subject and one time slot bucket with a student.
+
+        With one slot per bucket these are exactly the teachers sharing a
+        subject and a time slot; with wider buckets some may share no slot.
+
+        Args:
+            subject_codes: Bit positions of the student's subjects
+            slot_codes: Bit positions of the student's time slots
+
+        Returns:
+            np.ndarray: Sorted, unique teacher row positions
+        """
+        buckets = self._buckets(slot_codes)
+        postings = [self._postings[key] for key in
+                    ((subject, bucket) for subject in subject_codes for bucket in buckets)
+                    if key in self._postings]
+        if not postings:
+            return np.array([], dtype=np.int64)
+        return np.unique(np.concatenate(postings))
+
+
+class CompatibilityEngine:
+    """
+    Generates scored student-teacher candidates using packed bitmasks.
+
+    Students and teachers are held as packed subject and time slot bitmasks
+    encoded with shared `Vocabulary` objects. Students with the same subjects
+    and time slots share one lookup in the `CandidateIndex`, and only the
+    teachers returned by it are scored. An optional teachers x slots score
+    adjustment (e.g. learned from feedback, see `matching_feedback`) is added
+    to the Jaccard score of every candidate.
+    """
+
+    def __init__(self, student_subjects: np.ndarray, student_slots: np.ndarray,
+                 teacher_subjects: np.ndarray, teacher_slots: np.ndarray, teacher_ids: Sequence,
+                 subject_vocab: Vocabulary, slot_vocab: Vocabulary, index: 'CandidateIndex' = None,
+                 score_adjustment: np.ndarray = None):
+        """
+        Set up the engine from packed bitmasks.
+
+        Args:
+            student_subjects, student_slots: Packed masks, one row per student
+            teacher_subjects, teacher_slots: Packed masks, one row per teacher
+            teacher_ids: `teacher_id` of every teacher row
+            subject_vocab: Vocabulary the subject masks were encoded with
+            slot_vocab: Vocabulary the time slot masks were encoded with
+            index: Prebuilt `CandidateIndex` over the same teachers
+            score_adjustment: Optional amount added to the scores of every
+                (teacher row, slot code); teachers and slots beyond it get none
+        """
+        self.subject_vocab = subject_vocab
+        self.slot_vocab = slot_vocab
+        self.slots = slot_vocab.tokens
+
+        self.student_subjects = pad_words(student_subjects, subject_vocab.words)
+        self.teacher_subjects = pad_words(teacher_subjects, subject_vocab.words)
+        self.student_slots = pad_words(student_slots, slot_vocab.words)
+        self.teacher_slots = pad_words(teacher_slots, slot_vocab.words)
+
+        self.teacher_subject_counts = popcount(self.teacher_subjects)
+        self.score_adjustment = score_adjustment
+
+        self.index = index or CandidateIndex(teacher_ids, self.teacher_subjects, self.teacher_slots,
+                                             slot_vocab.codes_per_bucket)
+
+    def student_profiles(self) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Distinct (subjects, time slots) student profiles.
+
+        Returns:
+            tuple: (profile bitmask rows, profile id of every student row)
+        """
+        profiles, profile_of_student = np.unique(
+            np.hstack([self.student_subjects, self.student_slots]), axis=0, return_inverse=True
+        )
+        return profiles, profile_of_student.reshape(-1)
+
+    def teacher_profiles(self) -> np.ndarray:
+        """
+        Profile id of every teacher row.
+
+        Teachers share a profile when every student scores them the same in
+        every slot: same subjects and, with a score adjustment, the same
+        adjustment row.
+        """
+        keys = self.teacher_subjects
+        if self.score_adjustment is not None:
+            n_teachers, n_slots = len(self.teacher_subjects), len(self.slots)
+            known = self.score_adjustment[:n_teachers, :n_slots]
+            rows = np.zeros((n_teachers, n_slots))
+            rows[:known.shape[0], :known.shape[1]] = known
+            keys = np.hstack([keys, rows.view(np.uint64)])
+        _, profile_of_teacher = np.unique(keys, axis=0, return_inverse=True)
+        return profile_of_teacher.reshape(-1)
+
+    def adjust_scores(self, teacher_idx: np.ndarray, slot_idx: np.ndarray, scores: np.ndarray) -> np.ndarray:
+        """Subject scores plus the score adjustment of their (teacher, slot), kept within [0, 1]."""
+        adjustment = self.score_adjustment
+        if adjustment is None:
+            return scores
+        teacher_idx, slot_idx = np.asarray(teacher_idx), np.asarray(slot_idx)
+        if adjustment.shape[0] >= len(self.teacher_subjects) and adjustment.shape[1] >= len(self.slots):
+            bias = adjustment[teacher_idx, slot_idx]
+        else:
+            # Teachers or slots added since the adjustment was computed get none
+            known = (teacher_idx < adjustment.shape[0]) & (slot_idx < adjustment.shape[1])
+            bias = np.zeros(len(scores))
+            bias[known] = adjustment[teacher_idx[known], slot_idx[known]]
+        return np.minimum(np.maximum(scores + bias, 0.0), 1.0)
+
+    def _score_profile(self, subjects: np.ndarray, slots: np.ndarray,
+                       adjusted: bool = True) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Score one student profile against the teachers it can reach.
+
+        Returns:
+            tuple: (teacher_idx, slot_idx, subject_score) ordered by teacher, then
+            slot; scores include the score adjustment unless `adjusted` is False
+        """
+        teachers = self.index.lookup(mask_positions(subjects), mask_positions(slots))
+
+        # Index buckets can be coarser than slots, so drop teachers without a common slot first
+        overlaps = slots[None, :] & self.teacher_slots[teachers]
+        overlapping = overlaps.any(axis=1)
+        teachers, overlaps = teachers[overlapping], overlaps[overlapping]
+
+        inter = popcount(subjects[None, :] & self.teacher_subjects[teachers])
+        union = popcount(subjects[None, :]) + self.teacher_subject_counts[teachers] - inter
+        scores = inter / union
+
+        # One candidate per common slot; rows are teacher-major already
+        rows, slot_idx = np.divmod(np.flatnonzero(unpack_bits(overlaps, len(self.slots))), len(self.slots))
+        if not adjusted:
+            return teachers[rows], slot_idx, scores[rows]
+        return teachers[rows], slot_idx, self.adjust_scores(teachers[rows], slot_idx, scores[rows])
+
+    def ranked_profile(self, subjects: np.ndarray, slots: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Score one student profile and rank its candidates in greedy order.
+
+        Returns:
+            tuple: (teacher_idx, slot_idx, subject_score) by descending score,
+            ties by teacher, then slot
+        """
+        teachers, slot_idx, scores = self._score_profile(subjects, slots)
+        order = np.argsort(-scores, kind='stable')
+        return teachers[order], slot_idx[order], scores[order]
+
+    def _profile_groups(self) -> Iterator[Tuple[np.ndarray, np.ndarray, np.ndarray]]:
+        """Yield (subjects, time slots, student rows in row order) of every distinct student profile."""
+        profiles, profile_of_student = self.student_profiles()
+        n_subject_words = self.student_subjects.shape[1]
+
+        # Students grouped by profile, in row order within each group
+        students_by_profile = np.argsort(profile_of_student, kind='stable')
+        group_ends = np.cumsum(np.bincount(profile_of_student, minlength=len(profiles)))
+        for profile, (start, stop) in enumerate(zip(np.r_[0, group_ends[:-1]], group_ends)):
+            yield (profiles[profile, :n_subject_words], profiles[profile, n_subject_words:],
+                   students_by_profile[start:stop])
+
+    def candidate_pairs(self, adjusted: bool = True) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Find every (student, teacher, common slot) with a positive subject score.
+
+        Candidates are returned in the order the original nested loop produced
+        them: by student row, then teacher row, then slot.
+
+        Args:
+            adjusted: Include the score adjustment (see `adjust_scores`)
+
+        Returns:
+            tuple: (student_idx, teacher_idx, slot_idx, subject_score) arrays
+        """
+        results = []
+        for subjects, slots, students in self._profile_groups():
+            teachers, slot_idx, scores = self._score_profile(subjects, slots, adjusted)
+            if len(teachers) == 0:
+                continue
+            results.append((np.repeat(students, len(teachers)), np.tile(teachers, len(students)),
+                            np.tile(slot_idx, len(students)), np.tile(scores, len(students))))
+
+        if not results:
+            empty = np.array([], dtype=np.int64)
+            return empty, empty, empty, np.array([], dtype=float)
+
+        student_idx, teacher_idx, slot_idx, scores = (np.concatenate(parts) for parts in zip(*results))
+        order = np.lexsort((slot_idx, teacher_idx, student_idx))
+        return student_idx[order], teacher_idx[order], slot_idx[order], scores[order]
+
+    def top_candidates(self, top_k: int) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Every student's `top_k` best candidates, ranked as in `ranked_profile`.
+
+        Returns:
+            tuple: (student_idx, teacher_idx, slot_idx, subject_score) grouped by
+            student row and ranked within each student, and the untruncated
+            number of candidates of every student row
+        """
+        totals = np.zeros(len(self.student_subjects), dtype=np.int64)
+        results = []
+        for subjects, slots, students in self._profile_groups():
+            teachers, slot_idx, scores = self.ranked_profile(subjects, slots)
+            totals[students] = len(teachers)
+            teachers, slot_idx, scores = teachers[:top_k], slot_idx[:top_k], scores[:top_k]
+            if len(teachers) == 0:
+                continue
+            results.append((np.repeat(students, len(teachers)), np.tile(teachers, len(students)),
+                            np.tile(slot_idx, len(students)), np.tile(scores, len(students))))
+
+        if not results:
+            empty = np.array([], dtype=np.int64)
+            return empty, empty, empty, np.array([], dtype=float), totals
+
+        student_idx, teacher_idx, slot_idx, scores = (np.concatenate(parts) for parts in zip(*results))
+        order = np.argsort(student_idx, kind='stable')
+        return student_idx[order], teacher_idx[order], slot_idx[order], scores[order], totals
+
+    def common_subjects(self, student_idx: int, teacher_idx: int) -> np.ndarray:
+        """Packed mask of the subjects shared by a student and a teacher."""
+        return self.student_subjects[student_idx] & self.teacher_subjects[teacher_idx]
+
+
+class CapacityTable:
+    """
+    Remaining and maximum capacity per (teacher, time slot).
+
+    Both tables are NumPy int arrays indexed by teacher row position and slot
+    code, so capacity checks and lesson type decisions are O(1) lookups.
+    """
+
+    def __init__(self, max_students_per_slot: Sequence[int], teacher_slots: np.ndarray, n_slots: int):
+        """
+        Build the table from encoded teachers.
+
+        Args:
+            max_students_per_slot: Capacity of every teacher row
+            teacher_slots: Packed time slot bitmasks, one row per teacher
+            n_slots: Number of time slot codes
+        """
+        capacity = np.asarray(max_students_per_slot, dtype=np.int32)
+        available = unpack_bits(teacher_slots, n_slots)
+
+        self.max_capacity = np.where(available, capacity[:, None], 0).astype(np.int32)
+        self.remaining = self.max_capacity.copy()
+
+    def assign(self, teacher_idx: int, slot_idx: int):
+        """
+        Take one seat in a teacher's time slot if one is free.
+
+        Args:
+            teacher_idx: Teacher row position
+            slot_idx: Time slot code
+
+        Returns:
+            str or None: Lesson type ("1:1" or "Group") of the seat, None if full
+        """
+        remaining = self.remaining[teacher_idx, slot_idx]
+        if remaining <= 0:
+            return None
+
+        max_capacity = self.max_capacity[teacher_idx, slot_idx]
+        self.remaining[teacher_idx, slot_idx] = remaining - 1
+        return "1:1" if max_capacity == 1 or remaining == max_capacity else "Group"
+
+
+class MinCostFlow:
+    """
+    Min-cost max-flow solver (primal-dual successive shortest paths).
+
+    Each phase runs Dijkstra on reduced costs to update node potentials, then
+    pushes a blocking flow along zero-reduced-cost edges, so flow is augmented
+    many paths at a time. Costs must be integers.
+    """
+
+    def __init__(self, n_nodes: int):
+        """Create an empty network with `n_nodes` nodes."""
+        self.n_nodes = n_nodes
+        self.adjacency = [[] for _ in range(n_nodes)]
+        self.to = []
+        self.cap = []
+        self.cost = []
+
+    def add_edge(self, source: int, target: int, capacity: int, cost: int) -> int:
+        """Add an edge and return its id; edge `id ^ 1` is its residual twin."""
+        edge = len(self.to)
+        self.to += [target, source]
+        self.cap += [capacity, 0]
+        self.cost += [cost, -cost]
+        self.adjacency[source].append(edge)
+        self.adjacency[target].append(edge + 1)
+        return edge
+
+    def flow(self, edge: int) -> int:
+        """Flow currently carried by an edge."""
+        return self.cap[edge ^ 1]
+
+    def _shortest_paths(self, source: int, potential: List[int]) -> List[float]:
+        """Dijkstra distances from `source` using reduced edge costs."""
+        dist = [float('inf')] * self.n_nodes
+        dist[source] = 0
+        heap = [(0, source)]
+        to, cap, cost = self.to, self.cap, self.cost
+        while heap:
+            d, node = heapq.heappop(heap)
+            if d > dist[node]:
+                continue
+            base = d + potential[node]
+            for edge in self.adjacency[node]:
+                if cap[edge] > 0:
+                    target = to[edge]
+                    nd = base + cost[edge] - potential[target]
+                    if nd < dist[target]:
+                        dist[target] = nd
+                        heapq.heappush(heap, (nd, target))
+        return dist
+
+    def _blocking_flow(self, source: int, sink: int, potential: List[int]) -> int:
+        """Push flow along zero-reduced-cost edges until the sink is cut off."""
+        to, cap, cost, adjacency = self.to, self.cap, self.cost, self.adjacency
+
+        def admissible(edge, node):
+            return cap[edge] > 0 and cost[edge] + potential[node] - potential[to[edge]] == 0
+
+        pushed = 0
+        while True:
+            # Level graph over admissible edges
+            level = [-1] * self.n_nodes
+            level[source] = 0
+            queue = [source]
+            for node in queue:
+                for edge in adjacency[node]:
+                    if level[to[edge]] < 0 and admissible(edge, node):
+                        level[to[edge]] = level[node] + 1
+                        queue.append(to[edge])
+            if level[sink] < 0:
+                return pushed
+
+            # Iterative DFS with current-arc pointers
+            pointer = [0] * self.n_nodes
+            path = []
+            node = source
+            while True:
+                if node == sink:
+                    amount = min(cap[edge] for edge in path)
+                    for edge in path:
+                        cap[edge] -= amount
+                        cap[edge ^ 1] += amount
+                    pushed += amount
+                    # Retreat to the tail of the first saturated edge
+                    cut = next(i for i, edge in enumerate(path) if cap[edge] == 0)
+                    del path[cut:]
+                    node = to[path[-1]] if path else source
+                    continue
+
+                edges = adjacency[node]
+                while pointer[node] < len(edges):
+                    edge = edges[pointer[node]]
+                    if level[to[edge]] == level[node] + 1 and admissible(edge, node):
+                        break
+                    pointer[node] += 1
+                else:
+                    # Dead end: drop the node from the level graph
+                    level[node] = -1
+                    if not path:
+                        break
+                    node = to[path.pop() ^ 1]
+                    pointer[node] += 1
+                    continue
+
+                path.append(edges[pointer[node]])
+                node = to[edges[pointer[node]]]
+
+    def solve(self, source: int, sink: int, potential: List[int]) -> int:
+        """
+        Send the maximum flow from `source` to `sink` at minimum total cost.
+
+        Args:
+            source: Source node
+            sink: Sink node
+            potential: Initial node potentials giving non-negative reduced costs
+
+        Returns:
+            int: Total flow sent
+        """
+        potential = list(potential)
+        total = 0
+        while True:
+            dist = self._shortest_paths(source, potential)
+            if dist[sink] == float('inf'):
+                return total
+            limit = dist[sink]
+            potential = [p + min(d, limit) for p, d in zip(potential, dist)]
+            total += self._blocking_flow(source, sink, potential)
+
+
+# Integer scale applied to subject scores for the min-cost flow solver
+SCORE_SCALE = 10 ** 6
+
+
+def solve_optimal_assignment(student_profile: np.ndarray, teacher_profile: np.ndarray,
+                             student_idx: np.ndarray, teacher_idx: np.ndarray, slot_idx: np.ndarray,
+                             scores: np.ndarray, remaining: np.ndarray) -> np.ndarray:
+    """
+    Pick at most one candidate per student, maximizing matched students and then total score.
+
+    Scores only depend on the students' and teachers' profiles, so students
+    with the same profile and teacher-slots with the same teacher profile
+    (see `CompatibilityEngine.teacher_profiles`) and slot are
+    interchangeable. They are collapsed into supply and seat nodes of a
+    bipartite flow network, solved with `MinCostFlow`, and the flow is then
+    handed out to individual students and teacher-slots in row order.
+
+    Args:
+        student_profile: Profile id of every student row
+        teacher_profile: Profile id of every teacher row
+        student_idx, teacher_idx, slot_idx, scores: Candidate arrays, ordered by
+            student, teacher, then slot as returned by `candidate_pairs`
+        remaining: Remaining capacity table (teachers x slots)
+
+    Returns:
+        np.ndarray: Positions of the chosen candidates
+    """
+    if len(student_idx) == 0:
+        return np.array([], dtype=np.int64)
+    n_slots = remaining.shape[1]
+
+    # Supply nodes (student profiles) and seat nodes (teacher profile, slot)
+    types, type_of_candidate = np.unique(student_profile[student_idx], return_inverse=True)
+    groups, group_of_candidate = np.unique(teacher_profile[teacher_idx] * n_slots + slot_idx,
+                                           return_inverse=True)
+    type_of_candidate = type_of_candidate.reshape(-1)
+    group_of_candidate = group_of_candidate.reshape(-1)
+
+    students = np.unique(student_idx)
+    student_type = np.searchsorted(types, student_profile[students])
+    supply = np.bincount(student_type, minlength=len(types))
+
+    seats = np.unique(teacher_idx * n_slots + slot_idx)
+    seat_teacher, seat_slot = seats // n_slots, seats % n_slots
+    seat_group = np.searchsorted(groups, teacher_profile[seat_teacher] * n_slots + seat_slot)
+    seat_capacity = remaining[seat_teacher, seat_slot]
+    group_capacity = np.bincount(seat_group, weights=seat_capacity, minlength=len(groups)).astype(np.int64)
+
+    arcs, arc_candidate = np.unique(type_of_candidate * len(groups) + group_of_candidate, return_index=True)
+    arc_type, arc_group = arcs // len(groups), arcs % len(groups)
+    arc_cost = -np.rint(scores[arc_candidate] * SCORE_SCALE).astype(np.int64)
+
+    # Nodes: source, supply nodes, seat nodes, sink
+    source, sink = 0, 1 + len(types) + len(groups)
+    network = MinCostFlow(sink + 1)
+    for node, amount in enumerate(supply.tolist()):
+        network.add_edge(source, 1 + node, amount, 0)
+    arc_edges = [network.add_edge(1 + t, 1 + len(types) + g, int(supply[t]), c)
+                 for t, g, c in zip(arc_type.tolist(), arc_group.tolist(), arc_cost.tolist())]
+    for node, amount in enumerate(group_capacity.tolist()):
+        network.add_edge(1 + len(types) + node, sink, amount, 0)
+
+    # Potentials that make every initial reduced cost non-negative
+    group_potential = np.zeros(len(groups), dtype=np.int64)
+    np.minimum.at(group_potential, arc_group, arc_cost)
+    potential = [0] * (1 + len(types)) + group_potential.tolist() + [int(group_potential.min())]
+    network.solve(source, sink, potential)
+
+    # Hand the aggregated flow out to concrete students and teacher-slots
+    students_of_type = [list(students[student_type == t]) for t in range(len(types))]
+    seats_of_group = [[] for _ in range(len(groups))]
+    for teacher, slot, group, count in zip(seat_teacher.tolist(), seat_slot.tolist(),
+                                           seat_group.tolist(), seat_capacity.tolist()):
+        seats_of_group[group].extend([(teacher, slot)] * count)
+
+    # Candidates are ordered by (student, teacher, slot), so their keys are sorted
+    n_teachers = remaining.shape[0]
+    candidate_keys = (student_idx * n_teachers + teacher_idx) * n_slots + slot_idx
+
+    chosen = []
+    type_cursor = [0] * len(types)
+    group_cursor = [0] * len(groups)
+    for edge, t, g in zip(arc_edges, arc_type.tolist(), arc_group.tolist()):
+        amount = network.flow(edge)
+        for _ in range(amount):
+            student = students_of_type[t][type_cursor[t]]
+            teacher, slot = seats_of_group[g][group_cursor[g]]
+            type_cursor[t] += 1
+            group_cursor[g] += 1
+            chosen.append((int(student) * n_teachers + teacher) * n_slots + slot)
+
+    return np.searchsorted(candidate_keys, np.sort(np.array(chosen, dtype=np.int64)))
+
+
+def assign_greedy(student_idx: np.ndarray, teacher_idx: np.ndarray, slot_idx: np.ndarray,
+                  scores: np.ndarray, capacity: CapacityTable,
+                  stats: MatchingStats = DISABLED) -> Tuple[np.ndarray, List[str]]:
+    """
+    Assign candidates in descending score order, one per student, respecting capacity.
+
+    Ties keep the candidate order, so candidates as returned by
+    `candidate_pairs` are taken by student, teacher, then slot.
+
+    Args:
+        student_idx, teacher_idx, slot_idx, scores: Candidate arrays
+        capacity: Capacity table, updated in place
+        stats: Receives 'sort' and 'assign' stage times and the number of
+            candidates rejected because their seat was full
+
+    Returns:
+        tuple: (positions of the accepted candidates in acceptance order, lesson types)
+    """
+    with stats.stage('sort'):
+        # Stable, so ties keep the candidate order
+        order = np.argsort(-scores, kind='stable')
+
+    with stats.stage('assign'):
+        accepted, lesson_types = [], []
+        assigned_students = set()
+        rejected = 0
+        for position, student, teacher, slot in zip(order.tolist(), student_idx[order].tolist(),
+                                                    teacher_idx[order].tolist(), slot_idx[order].tolist()):
+            if student in assigned_students:
+                continue
+
+            lesson_type = capacity.assign(teacher, slot)
+            if lesson_type is None:
+                rejected += 1
+                continue
+
+            accepted.append(position)
+            lesson_types.append(lesson_type)
+            assigned_students.add(student)
+
+    stats.count('candidates_rejected_capacity', rejected)
+    return np.array(accepted, dtype=np.int64), lesson_types
+
+
+def assign_top_k(engine: CompatibilityEngine, capacity: CapacityTable, top_k: int = DEFAULT_TOP_K,
+                 stats: MatchingStats = DISABLED):
+    """
+    Greedy assignment that only holds each student's next `top_k` candidates.
+
+    The result is exactly that of `assign_greedy` over every candidate of
+    `candidate_pairs`. A heap holds the best remaining candidate of each
+    unassigned student, so popping it yields candidates in the same global
+    order. Seats never reopen, so a student's candidates at full seats are
+    skipped when its cursor advances, and assignment stops once every seat
+    is taken. A student that runs out of buffered candidates has its profile
+    ranked in full once, shared by every student with that profile.
+
+    Args:
+        engine: Engine over the students and teachers to match
+        capacity: Capacity table over the engine's teachers, updated in place
+        top_k: Candidates buffered per student up front
+        stats: Receives stage times and candidate/assignment counters
+
+    Returns:
+        tuple: (student_idx, teacher_idx, slot_idx, scores, lesson_types) of the
+        accepted matches, in acceptance order
+    """
+    with stats.stage('candidates'):
+        student_idx, teacher_idx, slot_idx, scores, totals = engine.top_candidates(top_k)
+    stats.count('candidates_generated', len(student_idx))
+
+    n_students = len(totals)
+    starts = np.searchsorted(student_idx, np.arange(n_students)).tolist()
+    buffered = np.bincount(student_idx, minlength=n_students).tolist()
+    teachers, slots, score_list, totals = teacher_idx.tolist(), slot_idx.tolist(), scores.tolist(), totals.tolist()
+    del student_idx, teacher_idx, slot_idx, scores
+    profile_of_student = None
+    rankings = {}
+    open_seats = int(np.clip(capacity.remaining, 0, None).sum())
+    rejected = 0
+
+    def candidate(student: int, rank: int) -> Tuple[int, int, float]:
+        """(teacher, slot, score) at `rank` of a student's ranking."""
+        nonlocal profile_of_student
+        if rank < buffered[student]:
+            position = starts[student] + rank
+            return teachers[position], slots[position], score_list[position]
+        if profile_of_student is None:
+            profile_of_student = engine.student_profiles()[1].tolist()
+        profile = profile_of_student[student]
+        if profile not in rankings:
+            ranked = engine.ranked_profile(engine.student_subjects[student], engine.student_slots[student])
+            rankings[profile] = list(zip(*(array.tolist() for array in ranked)))
+            stats.count('candidates_generated', len(ranked[0]))
+        return rankings[profile][rank]
+
+    def next_open(student: int, rank: int):
+        """Heap entry of the student's first candidate from `rank` on whose seat is not full."""
+        nonlocal rejected
+        while rank < totals[student]:
+            teacher, slot, score = candidate(student, rank)
+            if capacity.remaining[teacher, slot] > 0:
+                return -score, student, teacher, slot, rank
+            rejected += 1
+            rank += 1
+        return None
+
+    with stats.stage('assign'):
+        heap = [entry for entry in map(next_open, range(n_students), [0] * n_students) if entry]
+        heapq.heapify(heap)
+        accepted, lesson_types = [], []
+        while heap and open_seats:
+            negative_score, student, teacher, slot, rank = heapq.heappop(heap)
+            lesson_type = capacity.assign(teacher, slot)
+            if lesson_type is None:
+                rejected += 1
+                entry = next_open(student, rank + 1)
+                if entry:
+                    heapq.heappush(heap, entry)
+                continue
+            accepted.append((student, teacher, slot, -negative_score))
+            lesson_types.append(lesson_type)
+            open_seats -= 1
+
+    stats.count('candidates_rejected_capacity', rejected)
+    if not accepted:
+        empty = np.array([], dtype=np.int64)
+        return empty, empty, empty, np.array([], dtype=float), lesson_types
+    student_idx, teacher_idx, slot_idx, scores = (np.array(column) for column in zip(*accepted))
+    return student_idx, teacher_idx, slot_idx, scores.astype(float), lesson_types
+
+
+def match_students(engine: CompatibilityEngine, capacity: CapacityTable, strategy: str = 'greedy',
+                   candidates: Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray] = None,
+                   stats: MatchingStats = DISABLED, top_k: int = DEFAULT_TOP_K):
+    """
+    Generate candidates for an engine's students and assign them.
+
+    Args:
+        engine: Engine over the students and teachers to match
+        capacity: Capacity table over the engine's teachers, updated in place
+        strategy: 'greedy' or 'optimal' (see `solve_optimal_assignment`)
+        candidates: Precomputed `engine.candidate_pairs()`, e.g. from the on-disk cache
+        stats: Receives stage times and candidate/assignment counters
+        top_k: Greedy matching without precomputed candidates buffers only this
+            many candidates per student (see `assign_top_k`); None or 0
+            materializes every candidate
+
+    Returns:
+        tuple: (student_idx, teacher_idx, slot_idx, scores, lesson_types) of the
+        accepted matches, in acceptance order
+    """
+    if strategy == 'greedy' and candidates is None and top_k:
+        accepted = assign_top_k(engine, capacity, top_k, stats)
+        stats.count('students_assigned', len(accepted[0]))
+        return accepted
+
+    if candidates is None:
+        with stats.stage('candidates'):
+            candidates = engine.candidate_pairs()
+    student_idx, teacher_idx, slot_idx, scores = candidates
+    stats.count('candidates_generated', len(student_idx))
+
+    if strategy == 'optimal':
+        with stats.stage('optimal_flow'):
+            chosen = solve_optimal_assignment(engine.student_profiles()[1], engine.teacher_profiles(),
+                                              student_idx, teacher_idx, slot_idx, scores, capacity.remaining)
+        student_idx, teacher_idx, slot_idx, scores = (student_idx[chosen], teacher_idx[chosen],
+                                                      slot_idx[chosen], scores[chosen])
+
+    accepted, lesson_types = assign_greedy(student_idx, teacher_idx, slot_idx, scores, capacity, stats)
+    stats.count('students_assigned', len(accepted))
+    return (student_idx[accepted], teacher_idx[accepted], slot_idx[accepted], scores[accepted],
+            lesson_types)
@@ -0,0 +1,161 @@
+"""
+Streaming schedule exports for the Student-Teacher Matching system.
+
+The schedule is written in batches of rows, with student and teacher names
+looked up through one vectorized index per export, so exports run in memory
+bounded by the batch size rather than the schedule size. Besides CSV and
+JSON (same output as before), schedules can be written as newline-delimited
+JSON, Parquet or an Arrow IPC stream; the columnar formats dictionary-encode
+names, subjects, time slots and lesson types and are compressed. pyarrow is
+only imported when a columnar format is requested. Text formats are
+gzip-compressed when the filename ends in '.gz'.
+"""
+
+import gzip
+import importlib
+import json
+import pandas as pd
+from typing import Dict, Iterator, List
+
+# Column order of exported schedules
+SCHEDULE_COLUMNS = ['student_id', 'student_name', 'teacher_id', 'teacher_name',
+                    'time_slot', 'lesson_type', 'subjects', 'compatibility_score']
+
+# Repeated string columns stored dictionary-encoded in columnar formats
+DICTIONARY_COLUMNS = ['student_name', 'teacher_name', 'time_slot', 'lesson_type', 'subjects']
+
+# Schedule rows per written batch
+DEFAULT_BATCH_SIZE = 100_000
+
+EXPORT_FORMATS = ('csv', 'json', 'ndjson', 'parquet', 'arrow')
+
+
+def _open_text(filename: str):
+    """Open a text file for writing, gzip-compressed if it ends in '.gz'."""
+    if filename.endswith('.gz'):
+        return gzip.open(filename, 'wt', encoding='utf-8')
+    return open(filename, 'w', encoding='utf-8')
+
+
+def _name_lookup(frame: pd.DataFrame, id_column: str) -> pd.Series:
+    """Names indexed by id; the last row wins for duplicate ids, as with a dict."""
+    frame = frame.drop_duplicates(id_column, keep='last')
+    return frame.set_index(id_column)['name']
+
+
+def schedule_batches(schedule: List[Dict], students: pd.DataFrame, teachers: pd.DataFrame,
+                     batch_size: int = DEFAULT_BATCH_SIZE) -> Iterator[pd.DataFrame]:
+    """
+    Yield the schedule as frames of at most `batch_size` rows with names added.
+
+    Args:
+        schedule: Match dictionaries
+        students: Processed students (student_id, name)
+        teachers: Processed teachers (teacher_id, name)
+        batch_size: Rows per frame
+
+    Yields:
+        pd.DataFrame: Rows in SCHEDULE_COLUMNS order
+    """
+    student_names = _name_lookup(students, 'student_id')
+    teacher_names = _name_lookup(teachers, 'teacher_id')
+    for start in range(0, len(schedule), batch_size):
+        batch = pd.DataFrame(schedule[start:start + batch_size])
+        batch['student_name'] = batch['student_id'].map(student_names)
+        batch['teacher_name'] = batch['teacher_id'].map(teacher_names)
+        yield batch[SCHEDULE_COLUMNS]
+
+
+def write_csv(batches: Iterator[pd.DataFrame], filename: str):
+    """Write schedule batches as one CSV with a single header."""
+    with _open_text(filename) as f:
+        for number, batch in enumerate(batches):
+            batch.to_csv(f, index=False, header=number == 0)
+
+
+def write_json(schedule: List[Dict], filename: str):
+    """Write the match dictionaries as an indented JSON array, one match at a time."""
+    with _open_text(filename) as f:
+        f.write('[')
+        for number, match in enumerate(schedule):
+            f.write(',\n  ' if number else '\n  ')
+            f.write(json.dumps(match, indent=2).replace('\n', '\n  '))
+        f.write('\n]' if schedule else ']')
+
+
+def write_ndjson(batches: Iterator[pd.DataFrame], filename: str):
+    """Write schedule batches as newline-delimited JSON, one match per line."""
+    with _open_text(filename) as f:
+        for batch in batches:
+            f.write(batch.to_json(orient='records', lines=True, force_ascii=False))
+            f.write('\n')
+
+
+def _pyarrow(module: str = 'pyarrow'):
+    """Import pyarrow or one of its modules, pointing at the install command when it is missing."""
+    try:
+        return importlib.import_module(module)
+    except ImportError as error:
+        raise ImportError("Parquet and Arrow exports need pyarrow: pip install pyarrow") from error
+
+
+def _arrow_tables(batches: Iterator[pd.DataFrame]):
+    """
+    Convert schedule batches to Arrow tables with dictionary-encoded string columns.
+
+    Id columns are int64 when the ids are integers and strings otherwise,
+    as found in the first batch; every later batch is written with the same
+    schema.
+    """
+    pa = _pyarrow()
+    schema = None
+    for batch in batches:
+        if schema is None:
+            id_types = {name: pa.int64() if pd.api.types.is_integer_dtype(batch[name]) else pa.string()
+                        for name in ('student_id', 'teacher_id')}
+            schema = pa.schema([
+                ('student_id', id_types['student_id']), ('student_name', pa.dictionary(pa.int32(), pa.string())),
+                ('teacher_id', id_types['teacher_id']), ('teacher_name', pa.dictionary(pa.int32(), pa.string())),
+                ('time_slot', pa.dictionary(pa.int32(), pa.string())),
+                ('lesson_type', pa.dictionary(pa.int32(), pa.string())),
+                ('subjects', pa.dictionary(pa.int32(), pa.string())),
+                ('compatibility_score', pa.float64()),
+            ])
+        columns = [pa.array(batch[name], type=pa.string()).dictionary_encode() if name in DICTIONARY_COLUMNS
+                   else pa.array(batch[name], type=schema.field(name).type)
+                   for name in SCHEDULE_COLUMNS]
+        yield pa.Table.from_arrays(columns, schema=schema)
+
+
+def write_parquet(batches: Iterator[pd.DataFrame], filename: str, compression: str = 'zstd'):
+    """Write schedule batches as one Parquet file, a row group per batch."""
+    pq = _pyarrow('pyarrow.parquet')
+    writer = None
+    try:
+        for table in _arrow_tables(batches):
+            if writer is None:
+                writer = pq.ParquetWriter(filename, table.schema, compression=compression)
+            writer.write_table(table)
+    finally:
+        if writer is not None:
+            writer.close()
+
+
+def write_arrow(batches: Iterator[pd.DataFrame], filename: str, compression: str = 'zstd'):
+    """
+    Write schedule batches as an Arrow IPC stream (read with `pyarrow.ipc.open_stream`).
+
+    The stream format is used rather than the file format because it lets
+    every batch carry its own name and subject dictionaries.
+    """
+    pa = _pyarrow()
+    writer = None
+    try:
+        for table in _arrow_tables(batches):
+            if writer is None:
+                writer = pa.ipc.new_stream(filename, table.schema,
+                                           options=pa.ipc.IpcWriteOptions(compression=compression))
+            writer.write_table(table)
+    finally:
+        if writer is not None:
+            writer.close()
@@ -0,0 +1,224 @@
+"""
+Feedback-learned score adjustments for the Student-Teacher Matching system.
+
+`FeedbackModel` folds lesson ratings into running rating counts and sums per
+teacher and per (teacher, time slot). Those are all a mean rating needs, so
+each new feedback batch costs a few bincounts, with no refit over the whole
+history. Every teacher's bias is its mean rating's distance from the
+overall mean. Every (teacher, slot) bias is the further distance of that
+slot's mean from the teacher's. Both are shrunk towards zero by a prior of
+neutral pseudo-ratings, so a handful of ratings only moves a teacher a
+little. The biases are computed once per batch and cached. `adjustments`
+lays them out as a teachers x slots matrix, which the `CompatibilityEngine`
+adds to Jaccard scores. The same sums answer per-teacher and per-slot
+rating trends without going back to the ratings.
+"""
+
+import numpy as np
+import pandas as pd
+from typing import Dict, Iterable, Sequence, Tuple, Union
+
+from matching_metrics import ValueCodes
+
+FEEDBACK_COLUMNS = ['teacher_id', 'time_slot', 'rating']
+
+# Ratings are 1-5, so a mean is at most 4 points from another
+RATING_RANGE = 4.0
+
+# Neutral pseudo-ratings every teacher and (teacher, slot) mean is shrunk with
+DEFAULT_PRIOR = 5
+
+# Score adjustment of a full-range rating bias; also the largest adjustment
+DEFAULT_WEIGHT = 0.2
+
+
+def feedback_frame(feedback: Union[pd.DataFrame, Iterable[Dict]]) -> pd.DataFrame:
+    """
+    Ratings as a DataFrame, checked before anything is folded in.
+
+    Args:
+        feedback: Ratings with teacher_id, time_slot and rating (a DataFrame
+            or feedback dictionaries)
+
+    Returns:
+        DataFrame: The ratings, `rating` as floats
+
+    Raises:
+        ValueError: If a column is missing, a teacher or slot is empty, or a
+            rating is not a number from 1 to 5
+    """
+    frame = feedback if isinstance(feedback, pd.DataFrame) else pd.DataFrame(list(feedback))
+    if frame.empty:
+        return frame
+    missing = [column for column in FEEDBACK_COLUMNS if column not in frame]
+    if missing:
+        raise ValueError(f"Feedback is missing columns: {', '.join(missing)}")
+    if frame['teacher_id'].isna().any() or frame['time_slot'].isna().any():
+        raise ValueError("Feedback has ratings without a teacher_id or time_slot")
+    ratings = pd.to_numeric(frame['rating'], errors='coerce').astype(float)
+    if not ratings.between(1, 5).all():
+        raise ValueError("Feedback ratings must be numbers from 1 to 5")
+    return frame.assign(rating=ratings)
+
+
+def _grow(array: np.ndarray, shape: Tuple[int, ...]) -> np.ndarray:
+    """`array` padded with zeros at the end of every axis up to `shape`."""
+    return np.pad(array, [(0, size - current) for size, current in zip(shape, array.shape)])
+
+
+class FeedbackModel:
+    """Per-teacher and per-(teacher, time slot) score adjustments learned incrementally from ratings."""
+
+    def __init__(self, weight: float = DEFAULT_WEIGHT, prior: float = DEFAULT_PRIOR):
+        """
+        Args:
+            weight: Score adjustment of a rating bias spanning the whole 1-5
+                range; adjustments never exceed it either way
+            prior: Neutral pseudo-ratings added to every mean
+        """
+        self.weight = weight
+        self.prior = prior
+        self._teachers = ValueCodes()
+        self._slots = ValueCodes()
+        self.teacher_counts = np.zeros(0)
+        self.teacher_sums = np.zeros(0)
+        self.pair_counts = np.zeros((0, 0))
+        self.pair_sums = np.zeros((0, 0))
+        self.total_ratings = 0
+        self.rating_sum = 0.0
+        self._biases = None
+
+    def update(self, feedback: Union[pd.DataFrame, Iterable[Dict]]) -> 'FeedbackModel':
+        """
+        Fold a batch of ratings into the running sums.
+
+        Args:
+            feedback: Ratings with teacher_id, time_slot and rating (a
+                DataFrame or feedback dictionaries); other fields are ignored
+
+        Returns:
+            FeedbackModel: self
+
+        Raises:
+            ValueError: If the batch is malformed (see `feedback_frame`);
+                the model is then left unchanged
+        """
+        frame = feedback_frame(feedback)
+        if frame.empty:
+            return self
+        teachers = self._teachers.encode(frame['teacher_id'])
+        slots = self._slots.encode(frame['time_slot'])
+        ratings = frame['rating'].to_numpy(dtype=float)
+        n_teachers, n_slots = len(self._teachers.values), len(self._slots.values)
+
+        self.teacher_counts = _grow(self.teacher_counts, (n_teachers,)) + np.bincount(teachers, minlength=n_teachers)
+        self.teacher_sums = _grow(self.teacher_sums, (n_teachers,)) + np.bincount(
+            teachers, weights=ratings, minlength=n_teachers)
+        pairs = teachers * n_slots + slots
+        self.pair_counts = _grow(self.pair_counts, (n_teachers, n_slots)) + np.bincount(
+            pairs, minlength=n_teachers * n_slots).reshape(n_teachers, n_slots)
+        self.pair_sums = _grow(self.pair_sums, (n_teachers, n_slots)) + np.bincount(
+            pairs, weights=ratings, minlength=n_teachers * n_slots).reshape(n_teachers, n_slots)
+        self.total_ratings += len(ratings)
+        self.rating_sum += float(ratings.sum())
+        self._biases = None
+        return self
+
+    @property
+    def teacher_ids(self) -> pd.Index:
+        """Rated teacher ids in first-rated order; a teacher's position is its code in the sums."""
+        return pd.Index([]) if self._teachers.values is None else self._teachers.values
+
+    @property
+    def time_slots(self) -> pd.Index:
+        """Rated time slots in first-rated order; a slot's position is its code in the sums."""
+        return pd.Index([]) if self._slots.values is None else self._slots.values
+
+    def teacher_trends(self) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Ratings per teacher, read off the running sums.
+
+        Returns:
+            tuple: (rated teacher ids sorted, ratings of each, mean rating of each)
+        """
+        if not self.total_ratings:
+            return np.array([]), np.zeros(0, dtype=np.int64), np.zeros(0)
+        order = self._teachers.values.argsort()
+        counts = self.teacher_counts[order]
+        return self._teachers.values[order].to_numpy(), counts.astype(np.int64), self.teacher_sums[order] / counts
+
+    def slot_trends(self) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Ratings per time slot, read off the running sums.
+
+        Returns:
+            tuple: (rated time slots sorted, ratings of each, mean rating of each)
+        """
+        if not self.total_ratings:
+            return np.array([]), np.zeros(0, dtype=np.int64), np.zeros(0)
+        order = self._slots.values.argsort()
+        counts = self.pair_counts.sum(axis=0)[order]
+        sums = self.pair_sums.sum(axis=0)[order]
+        return self._slots.values[order].to_numpy(), counts.astype(np.int64), sums / counts
+
+    def state(self) -> Tuple[Dict, Dict[str, np.ndarray]]:
+        """
+        Running sums for saving.
+
+        Returns:
+            tuple: (JSON-serializable totals and rated ids, sum arrays)
+        """
+        values = {'teacher_ids': [] if self._teachers.values is None else self._teachers.values.tolist(),
+                  'time_slots': [] if self._slots.values is None else self._slots.values.tolist(),
+                  'total_ratings': self.total_ratings, 'rating_sum': self.rating_sum}
+        arrays = {'teacher_counts': self.teacher_counts, 'teacher_sums': self.teacher_sums,
+                  'pair_counts': self.pair_counts, 'pair_sums': self.pair_sums}
+        return values, arrays
+
+    def restore(self, values: Dict, arrays: Dict[str, np.ndarray]) -> 'FeedbackModel':
+        """Load running sums saved with `state`; returns self."""
+        self._teachers.values = pd.Index(values['teacher_ids']) if values['teacher_ids'] else None
+        self._slots.values = pd.Index(values['time_slots']) if values['time_slots'] else None
+        self.teacher_counts, self.teacher_sums = arrays['teacher_counts'], arrays['teacher_sums']
+        self.pair_counts, self.pair_sums = arrays['pair_counts'], arrays['pair_sums']
+        self.total_ratings, self.rating_sum = values['total_ratings'], values['rating_sum']
+        self._biases = None
+        return self
+
+    def biases(self) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Rating biases in rating points, cached until the next `update`.
+
+        Returns:
+            tuple: (bias of every rated teacher, further bias of every
+            (teacher, slot) over the teacher's), in first-rated order
+        """
+        if self._biases is None:
+            mean = self.rating_sum / max(self.total_ratings, 1)
+            teacher = (self.teacher_sums - self.teacher_counts * mean) / (self.teacher_counts + self.prior)
+            pair = ((self.pair_sums - self.pair_counts * (mean + teacher[:, None]))
+                    / (self.pair_counts + self.prior))
+            self._biases = teacher, pair
+        return self._biases
+
+    def adjustments(self, teacher_ids: Sequence, time_slots: Sequence[str]) -> np.ndarray:
+        """
+        Score adjustment of every (teacher, time slot), for `CompatibilityEngine`.
+
+        Args:
+            teacher_ids: `teacher_id` of every teacher row
+            time_slots: Time slot of every slot code
+
+        Returns:
+            np.ndarray: Teachers x slots adjustments; 0 where nothing was rated
+        """
+        bias = np.zeros((len(teacher_ids), len(time_slots)))
+        if not self.total_ratings:
+            return bias
+        teacher_bias, pair_bias = self.biases()
+        rows = self._teachers.values.get_indexer(pd.Index(teacher_ids))
+        columns = self._slots.values.get_indexer(pd.Index(time_slots))
+        rated, rated_slots = rows >= 0, columns >= 0
+        bias[rated] = teacher_bias[rows[rated]][:, None]
+        bias[np.ix_(rated, rated_slots)] += pair_bias[np.ix_(rows[rated], columns[rated_slots])]
+        return np.clip(self.weight * bias / RATING_RANGE, -self.weight, self.weight)
@@ -0,0 +1,278 @@
+"""
+Out-of-core feedback history for the Student-Teacher Matching system.
+
+`FeedbackLog` keeps every rating ever given in an append-only, columnar log
+on disk. Each column is a raw binary file of fixed-width values, which
+appends extend and reads memory-map. Teachers, time slots and terms are
+stored as integer codes, and so are student ids unless they are all
+integers. Next to the log it keeps running per-teacher and
+per-(teacher, slot) rating sums and counts (a `FeedbackModel`), updated
+with every appended batch. Trend queries and feedback-aware scoring
+therefore cost O(teachers x slots) however many ratings accumulate, and
+memory stays bounded by the batch being appended.
+
+An append checks and converts the whole batch before it touches the
+aggregates or the files. It then writes the column files and replaces
+`meta.json`, which holds the committed row count, the code values and the
+name of the aggregates file. A half-written append is therefore invisible:
+it is rolled back in memory and cut off the files straight away, or the
+next time the log is opened if the process died.
+
+Usage:
+    python -m matching_feedback_log --log feedback_log
+"""
+
+import argparse
+import json
+import os
+import tempfile
+from typing import Dict, Iterable, Iterator, Tuple, Union
+
+import numpy as np
+import pandas as pd
+
+from matching_feedback import DEFAULT_PRIOR, DEFAULT_WEIGHT, FeedbackModel, feedback_frame
+from matching_metrics import ValueCodes
+
+# Stored columns and their on-disk dtypes; teacher, time_slot and term hold codes,
+# student_id holds ids or, in a log of non-integer ids, codes (-1 where unknown)
+LOG_COLUMNS = {
+    'student_id': np.int64,
+    'teacher': np.int32,
+    'time_slot': np.int16,
+    'rating': np.int8,
+    'satisfaction_score': np.float32,
+    'term': np.int16,
+}
+
+# Rows decoded per batch by `batches`
+DEFAULT_BATCH_SIZE = 1_000_000
+
+
+def _replace_file(path: str, write):
+    """Write a file through a temporary file in the same directory, then swap it in."""
+    fd, staging = tempfile.mkstemp(prefix='.', dir=os.path.dirname(path))
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            write(f)
+        os.replace(staging, path)
+    except BaseException:
+        os.unlink(staging)
+        raise
+
+
+class FeedbackLog:
+    """Append-only columnar log of ratings with running per-teacher/per-slot aggregates."""
+
+    def __init__(self, directory: str, weight: float = DEFAULT_WEIGHT, prior: float = DEFAULT_PRIOR):
+        """
+        Open (and if needed create) a feedback log.
+
+        Args:
+            directory: Directory holding the log
+            weight, prior: Scoring parameters of the aggregates' `FeedbackModel`
+        """
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+        self.model = FeedbackModel(weight, prior)
+        self.rows = 0
+        self.terms = []
+        # Codes of non-integer student ids; None while the log stores integer ids as they are
+        self._students = None
+        self._aggregates = None
+
+        meta_path = os.path.join(directory, 'meta.json')
+        if os.path.exists(meta_path):
+            with open(meta_path) as f:
+                meta = json.load(f)
+            self.rows, self.terms, self._aggregates = meta['rows'], meta['terms'], meta['aggregates']
+            if meta.get('student_ids') is not None:
+                self._students = ValueCodes()
+                self._students.values = pd.Index(meta['student_ids'], dtype=object)
+            with np.load(os.path.join(directory, self._aggregates)) as arrays:
+                self.model.restore(meta['model'], dict(arrays))
+
+        self._truncate()
+
+    def __len__(self) -> int:
+        return self.rows
+
+    def _column_path(self, name: str) -> str:
+        return os.path.join(self.directory, f'{name}.bin')
+
+    def _truncate(self):
+        """Cut off columns of an append that never committed."""
+        for name, dtype in LOG_COLUMNS.items():
+            path = self._column_path(name)
+            committed = self.rows * np.dtype(dtype).itemsize
+            if not os.path.exists(path):
+                open(path, 'wb').close()
+            elif os.path.getsize(path) != committed:
+                os.truncate(path, committed)
+
+    def _integer_students(self, frame: pd.DataFrame) -> Union[np.ndarray, None]:
+        """
+        Stored student_id values of a batch if they need no codes, without changing the log.
+
+        Returns:
+            np.ndarray: Integer ids (-1 where unknown), or None if the batch's
+            ids are to be stored as codes
+
+        Raises:
+            ValueError: If non-integer ids would join integer ids already stored
+        """
+        ids = frame['student_id'] if 'student_id' in frame else pd.Series(np.nan, index=frame.index)
+        known = ids.dropna()
+        if self._students is None:
+            numbers = pd.to_numeric(known, errors='coerce')
+            if numbers.notna().all() and (numbers % 1 == 0).all():
+                return pd.to_numeric(ids).fillna(-1).to_numpy(dtype=np.int64)
+            if (self.column('student_id') != -1).any():
+                raise ValueError("Feedback log stores integer student ids; got non-integer ids")
+        elif known.empty:
+            return np.full(len(frame), -1, dtype=np.int64)
+        return None
+
+    def _columns(self, frame: pd.DataFrame, term: str) -> Dict[str, np.ndarray]:
+        """
+        On-disk values of a batch, converted before anything is changed.
+
+        Raises:
+            ValueError: If a rating is not a whole number or a column cannot be converted
+        """
+        if (frame['rating'] % 1 != 0).any():
+            raise ValueError("Feedback log ratings must be whole numbers")
+        satisfaction = (pd.to_numeric(frame['satisfaction_score']) if 'satisfaction_score' in frame
+                        else np.full(len(frame), np.nan))
+        return {'student_id': self._integer_students(frame), 'rating': frame['rating'].to_numpy(),
+                'satisfaction_score': np.asarray(satisfaction, dtype=float),
+                'term': np.full(len(frame), self.terms.index(term) if term in self.terms
+                                else len(self.terms))}
+
+    def append(self, feedback: Union[pd.DataFrame, Iterable[Dict]], term: str = '') -> int:
+        """
+        Append a batch of ratings and fold it into the aggregates.
+
+        Args:
+            feedback: Ratings with teacher_id, time_slot and rating, and
+                optionally student_id and satisfaction_score (a DataFrame or
+                feedback dictionaries as made by `simulate_feedback`)
+            term: Label of the term the ratings belong to
+
+        Returns:
+            int: Rows appended
+
+        Raises:
+            ValueError: If the batch is malformed (see `feedback_frame`); the
+                log and its aggregates are then left unchanged
+        """
+        frame = feedback_frame(feedback)
+        if frame.empty:
+            return 0
+        columns = self._columns(frame, term)
+
+        # Everything below changes the log; undo it all if anything fails
+        model_state, terms = self.model.state(), list(self.terms)
+        student_ids = None if self._students is None else self._students.values
+        try:
+            if columns['student_id'] is None:
+                if self._students is None:
+                    self._students = ValueCodes()
+                    self._students.values = pd.Index([], dtype=object)
+                known = frame['student_id'].notna().to_numpy()
+                codes = np.full(len(frame), -1, dtype=np.int64)
+                codes[known] = self._students.encode(frame['student_id'][known].astype(object))
+                columns['student_id'] = codes
+            self.model.update(frame)
+            if term not in self.terms:
+                self.terms.append(term)
+            columns['teacher'] = self.model.teacher_ids.get_indexer(frame['teacher_id'])
+            columns['time_slot'] = self.model.time_slots.get_indexer(frame['time_slot'])
+            for name, dtype in LOG_COLUMNS.items():
+                with open(self._column_path(name), 'ab') as f:
+                    np.asarray(columns[name]).astype(dtype).tofile(f)
+
+            # Aggregates go to a new file, so the old meta.json stays consistent until it is replaced
+            rows = self.rows + len(frame)
+            state, arrays = self.model.state()
+            aggregates = f'aggregates-{rows}.npz'
+            _replace_file(os.path.join(self.directory, aggregates), lambda f: np.savez(f, **arrays))
+            meta = {'rows': rows, 'terms': self.terms, 'aggregates': aggregates, 'model': state,
+                    'student_ids': None if self._students is None else self._students.values.tolist(),
+                    'columns': {name: np.dtype(dtype).str for name, dtype in LOG_COLUMNS.items()}}
+            _replace_file(os.path.join(self.directory, 'meta.json'),
+                          lambda f: f.write(json.dumps(meta).encode()))
+        except BaseException:
+            self.model.restore(*model_state)
+            self.terms = terms
+            if student_ids is None:
+                self._students = None
+            else:
+                self._students.values = student_ids
+            self._truncate()
+            raise
+
+        if self._aggregates and self._aggregates != aggregates:
+            os.remove(os.path.join(self.directory, self._aggregates))
+        self.rows, self._aggregates = rows, aggregates
+        return len(frame)
+
+    def column(self, name: str) -> np.ndarray:
+        """One stored column (codes for teacher, time_slot and term), memory-mapped read-only."""
+        if not self.rows:
+            return np.zeros(0, dtype=LOG_COLUMNS[name])
+        return np.memmap(self._column_path(name), dtype=LOG_COLUMNS[name], mode='r', shape=(self.rows,))
+
+    def read(self, start: int = 0, stop: int = None) -> pd.DataFrame:
+        """
+        Decode rows `start` to `stop` into feedback records.
+
+        Returns:
+            DataFrame: student_id, teacher_id, time_slot, rating,
+            satisfaction_score, feedback_positive and term of every row
+        """
+        stop = self.rows if stop is None else min(stop, self.rows)
+        columns = {name: np.asarray(self.column(name)[start:stop]) for name in LOG_COLUMNS}
+        students = columns['student_id']
+        if self._students is not None:
+            students = np.where(students >= 0, self._students.values.take(np.maximum(students, 0)), None)
+        frame = pd.DataFrame({
+            'student_id': students,
+            'teacher_id': self.model.teacher_ids.take(columns['teacher']),
+            'time_slot': self.model.time_slots.take(columns['time_slot']),
+            'rating': columns['rating'].astype(np.int64),
+            'satisfaction_score': columns['satisfaction_score'].astype(float).round(3),
+        })
+        frame['feedback_positive'] = frame['rating'] >= 4
+        frame['term'] = np.asarray(self.terms, dtype=object)[columns['term']] if len(frame) else []
+        return frame
+
+    def batches(self, batch_size: int = DEFAULT_BATCH_SIZE) -> Iterator[pd.DataFrame]:
+        """Decode the whole log, `batch_size` rows at a time."""
+        for start in range(0, self.rows, batch_size):
+            yield self.read(start, start + batch_size)
+
+    def teacher_trends(self) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """(teacher ids, ratings, mean rating) of every rated teacher, from the aggregates."""
+        return self.model.teacher_trends()
+
+    def slot_trends(self) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """(time slots, ratings, mean rating) of every rated time slot, from the aggregates."""
+        return self.model.slot_trends()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Summarize a feedback log")
+    parser.add_argument('--log', default='feedback_log', help='Log directory')
+    args = parser.parse_args()
+
+    log = FeedbackLog(args.log)
+    print(f"📒 {len(log)} ratings over {len(log.terms)} terms in {args.log}")
+    if len(log):
+        print(f"   • Average Rating: {log.model.rating_sum / log.model.total_ratings:.2f}/5.0")
+        for time_slot, count, mean in zip(*(array.tolist() for array in log.slot_trends())):
+            print(f"   • {time_slot}: {mean:.2f}/5.0 (from {count} ratings)")
+
+
+if __name__ == '__main__':
+    main()
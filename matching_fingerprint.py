@@ -0,0 +1,100 @@
+"""
+Content fingerprints for the Student-Teacher Matching system.
+
+A fingerprint is a SHA-256 hex digest of what a run consumed or produced,
+independent of row order, column order and the order of subjects and time
+slots within a cell. Two equivalent inputs (e.g. the same CSVs shuffled)
+therefore get the same input fingerprint. Every ingest path puts rows in id
+order and subject codes in sorted order (`canonical_tables`), so they also
+get the same schedule. Downstream systems can compare fingerprints to skip reprocessing
+results that did not change.
+"""
+
+import hashlib
+import json
+from typing import Dict, Optional
+
+import numpy as np
+import pandas as pd
+
+from matching_ingest import EncodedTable, canonical_tables
+from matching_vocabulary import Vocabulary, pad_words
+
+# Bump when what goes into a fingerprint changes
+FINGERPRINT_VERSION = 1
+
+# Columns that identify a schedule entry, in sort order
+SCHEDULE_KEY = ['student_id', 'teacher_id', 'time_slot']
+
+
+def _update_frame(digest, frame: pd.DataFrame):
+    """Feed a frame's column names and row hashes, columns in sorted order, into a hash object."""
+    columns = sorted(frame.columns, key=str)
+    digest.update(json.dumps([str(column) for column in columns] + [len(frame)]).encode())
+    if len(frame):
+        digest.update(pd.util.hash_pandas_object(frame[columns], index=False).to_numpy().tobytes())
+
+
+def input_fingerprint(students: EncodedTable, teachers: EncodedTable, subject_vocab: Vocabulary,
+                      slot_vocab: Vocabulary, feedback_model=None) -> str:
+    """
+    Fingerprint of preprocessed matching input.
+
+    Args:
+        students, teachers: Encoded tables, in any row order and with any
+            subject codes
+        subject_vocab, slot_vocab: Vocabularies the masks were encoded with
+        feedback_model: Optional `FeedbackModel` whose score adjustments
+            matching will apply
+
+    Returns:
+        str: Hex digest
+    """
+    subject_vocab, tables = canonical_tables(subject_vocab, students=students, teachers=teachers)
+    digest = hashlib.sha256(json.dumps([FINGERPRINT_VERSION, subject_vocab.tokens, type(slot_vocab).__name__,
+                                        slot_vocab.tokens]).encode())
+    for table in tables.values():
+        _update_frame(digest, table.frame)
+        digest.update(np.ascontiguousarray(pad_words(table.subjects, subject_vocab.words)).tobytes())
+        digest.update(np.ascontiguousarray(pad_words(table.slots, slot_vocab.words)).tobytes())
+    if feedback_model is not None and feedback_model.total_ratings:
+        values, arrays = feedback_model.state()
+        digest.update(json.dumps([feedback_model.weight, feedback_model.prior, values], default=str).encode())
+        for name in sorted(arrays):
+            digest.update(np.ascontiguousarray(arrays[name], dtype=float).tobytes())
+    return digest.hexdigest()
+
+
+def schedule_fingerprint(schedule: pd.DataFrame) -> Optional[str]:
+    """
+    Fingerprint of a schedule, independent of entry order.
+
+    Args:
+        schedule: Schedule entries (e.g. `pd.DataFrame(matcher.schedule)`)
+
+    Returns:
+        str: Hex digest (None for an empty schedule)
+    """
+    if schedule.empty:
+        return None
+    key = [column for column in SCHEDULE_KEY if column in schedule]
+    ordered = schedule.sort_values(key, kind='stable').reset_index(drop=True) if key else schedule
+    digest = hashlib.sha256(json.dumps([FINGERPRINT_VERSION, 'schedule']).encode())
+    _update_frame(digest, ordered)
+    return digest.hexdigest()
+
+
+def fingerprints(matcher) -> Dict[str, Optional[str]]:
+    """
+    Input and schedule fingerprints of a matcher.
+
+    Returns:
+        dict: {'input': digest or None before preprocessing, 'schedule':
+        digest or None without matches}
+    """
+    if matcher.encoded_students is None or matcher.processed_students is None:
+        input_digest = None
+    else:
+        input_digest = input_fingerprint(matcher.encoded_students, matcher.encoded_teachers, matcher.subject_vocab,
+                                         matcher.slot_vocab, matcher.feedback_model)
+    return {'input': input_digest, 'schedule': schedule_fingerprint(pd.DataFrame(matcher.schedule))}
@@ -0,0 +1,237 @@
+"""
+Group formation for the Student-Teacher Matching system.
+
+Matching decides which teacher each student gets; which of that teacher's
+common time slots the student sits in does not change the compatibility
+score. Group packing uses that freedom to regroup every teacher's students.
+A group (teacher time slot) costs a fixed amount for being open, plus its
+grade spread (max - min), plus a penalty if its students share no subject,
+all in grades. Students are visited by shared subject focus and grade, and
+each joins the group whose cost it raises least. Joining a group whose grade
+range already covers the student is free, and opening a group is dearer than
+any spread, so teachers teach fewer, fuller lessons. When every slot a
+student can use is full, an augmenting path moves other students along, so
+everyone matched keeps a seat. Moves and swaps between open groups then
+undo placements that looked cheap before later students arrived. Lesson
+types follow the final group sizes.
+"""
+
+import numpy as np
+from typing import Dict, List, Tuple
+
+from matching_engine import CompatibilityEngine
+from matching_vocabulary import unpack_bits
+
+# Cost of an open group, in grades of spread
+DEFAULT_OPEN_COST = 6.0
+
+# Cost of a group whose students share no subject, in grades
+DEFAULT_FOCUS_PENALTY = 3.0
+
+# Passes of single-student moves and swaps after greedy placement
+DEFAULT_PASSES = 4
+
+
+def _as_ints(masks: np.ndarray) -> List[int]:
+    """Packed bitmask rows as Python ints, for cheap bitwise tests in loops."""
+    return [int.from_bytes(row.tobytes(), 'little') for row in np.ascontiguousarray(masks, dtype='<u8')]
+
+
+class _TeacherGroups:
+    """Groups of one teacher while it is being packed, one per time slot."""
+
+    def __init__(self, capacity: np.ndarray, grades: List[float], focus: List[int]):
+        self.capacity = capacity
+        self.grades = grades
+        self.focus = focus
+        self.members: Dict[int, List[int]] = {}
+
+    def room(self, slot: int) -> bool:
+        return len(self.members.get(slot, ())) < self.capacity[slot]
+
+    def group_cost(self, members: List[int], open_cost: float, focus_penalty: float) -> float:
+        """Cost of a group: opening it, its grade spread and, if its students share no subject, the penalty."""
+        if not members:
+            return 0.0
+        grades = [self.grades[member] for member in members if self.grades[member] == self.grades[member]]
+        shared = self.focus[members[0]]
+        for member in members[1:]:
+            shared &= self.focus[member]
+        return open_cost + (max(grades) - min(grades) if grades else 0.0) + (0.0 if shared else focus_penalty)
+
+    def cost(self, student: int, slot: int, open_cost: float, focus_penalty: float) -> float:
+        """Cost of adding a student to the group of `slot`: how much the group's cost grows."""
+        members = self.members.get(slot, [])
+        return (self.group_cost(members + [student], open_cost, focus_penalty)
+                - self.group_cost(members, open_cost, focus_penalty))
+
+    def place(self, student: int, slot: int):
+        self.members.setdefault(slot, []).append(student)
+
+    def improve(self, feasible: Dict[int, List[int]], open_cost: float, focus_penalty: float,
+                max_passes: int = DEFAULT_PASSES):
+        """
+        Move single students, or swap two, between groups while that lowers the total group cost.
+
+        Greedy placement decides early students before the later ones are
+        known, so a pass over every student can still regroup them, e.g. by
+        trading two students of different grades between two groups.
+        """
+        slot_of = {student: slot for slot, members in self.members.items() for student in members}
+        costs = {slot: self.group_cost(members, open_cost, focus_penalty) for slot, members in self.members.items()}
+
+        def gain(slot: int, leaving: int, joining: int) -> Tuple[float, List[int]]:
+            members = [member for member in self.members.get(slot, []) if member != leaving]
+            if joining is not None:
+                members.append(joining)
+            return costs.get(slot, 0.0) - self.group_cost(members, open_cost, focus_penalty), members
+
+        for _ in range(max_passes):
+            improved = False
+            for student in sorted(slot_of):
+                here = slot_of[student]
+                if costs[here] <= open_cost and len(self.members[here]) > 1:
+                    # Leaving a cohesive group saves nothing
+                    continue
+                profile = self.grades[student], self.focus[student]
+                for there in feasible[student]:
+                    # Only into open groups: opening one never pays for itself here
+                    if there == here or not self.members.get(there):
+                        continue
+                    # Alone, or swapped with a different student who can take this slot
+                    partners = [None] if self.room(there) else []
+                    partners += [other for other in self.members[there]
+                                 if here in feasible[other] and (self.grades[other], self.focus[other]) != profile]
+                    for other in partners:
+                        gain_here, members_here = gain(here, student, other)
+                        gain_there, members_there = gain(there, other, student)
+                        if gain_here + gain_there > 1e-9:
+                            self.members[here], self.members[there] = members_here, members_there
+                            costs[here] = self.group_cost(members_here, open_cost, focus_penalty)
+                            costs[there] = self.group_cost(members_there, open_cost, focus_penalty)
+                            slot_of[student] = there
+                            if other is not None:
+                                slot_of[other] = here
+                            improved = True
+                            break
+                    if slot_of[student] != here:
+                        break
+            if not improved:
+                break
+
+    def augment(self, student: int, slots: List[int], feasible: Dict[int, List[int]], visited: set) -> bool:
+        """Seat `student` in one of `slots`, moving occupants to other slots they can use if needed."""
+        for slot in slots:
+            if slot in visited:
+                continue
+            visited.add(slot)
+            if self.room(slot):
+                self.place(student, slot)
+                return True
+            for other in list(self.members[slot]):
+                if self.augment(other, feasible[other], feasible, visited):
+                    self.members[slot].remove(other)
+                    self.place(student, slot)
+                    return True
+        return False
+
+
+def pack_groups(engine: CompatibilityEngine, max_capacity: np.ndarray, grades: np.ndarray,
+                student_idx: np.ndarray, teacher_idx: np.ndarray, slot_idx: np.ndarray,
+                open_cost: float = DEFAULT_OPEN_COST,
+                focus_penalty: float = DEFAULT_FOCUS_PENALTY) -> Tuple[np.ndarray, List[str]]:
+    """
+    Regroup matched students among their teacher's time slots.
+
+    Args:
+        engine: Engine the matches were created with
+        max_capacity: Seats per (teacher row, slot code)
+        grades: Grade of every student row (NaN when unknown)
+        student_idx, teacher_idx, slot_idx: Accepted matches
+        open_cost: Cost of an open group, in grades
+        focus_penalty: Cost of a group whose students share no subject, in grades
+
+    Returns:
+        tuple: (new slot code of every match, lesson type of every match:
+        "1:1" when the student is alone in its group, else "Group")
+    """
+    n_matches = len(student_idx)
+    new_slots = np.asarray(slot_idx, dtype=np.int64).copy()
+    if n_matches == 0:
+        return new_slots, []
+
+    # Subjects each student shares with its teacher, and its focus: the lowest such subject code
+    common = engine.student_subjects[student_idx] & engine.teacher_subjects[teacher_idx]
+    focus_code = unpack_bits(common, common.shape[1] * 64).argmax(axis=1)
+    match_grades = np.asarray(grades, dtype=float)[student_idx]
+    feasible_masks = engine.student_slots[student_idx] & engine.teacher_slots[teacher_idx]
+    feasible_bits = unpack_bits(feasible_masks, max_capacity.shape[1])
+
+    # Teacher by teacher, students by focus then grade (unknown grades last)
+    order = np.lexsort((np.nan_to_num(match_grades, nan=np.inf), focus_code, teacher_idx))
+    bounds = np.flatnonzero(np.diff(teacher_idx[order])) + 1
+    focus = _as_ints(common)
+    grade_list = match_grades.tolist()
+
+    for block in np.split(order, bounds):
+        teacher = int(teacher_idx[block[0]])
+        groups = _TeacherGroups(max_capacity[teacher], grade_list, focus)
+        feasible = {match: np.flatnonzero(feasible_bits[match]).tolist() for match in block.tolist()}
+        # Students still to be placed that could use each slot
+        demand = feasible_bits[block].sum(axis=0).tolist()
+        packed = True
+        for match in block.tolist():
+            for slot in feasible[match]:
+                demand[slot] -= 1
+            open_slots = [slot for slot in feasible[match] if groups.room(slot)]
+            if open_slots:
+                # Cheapest group; among equals the fuller one, then the one more students can still join
+                slot = min(open_slots, key=lambda slot: (groups.cost(match, slot, open_cost, focus_penalty),
+                                                         -len(groups.members.get(slot, ())), -demand[slot], slot))
+                groups.place(match, slot)
+            elif not groups.augment(match, feasible[match], feasible, set()):
+                packed = False
+                break
+        if packed:
+            groups.improve(feasible, open_cost, focus_penalty)
+            for slot, members in groups.members.items():
+                new_slots[members] = slot
+
+    # Group sizes decide lesson types
+    keys = teacher_idx.astype(np.int64) * max_capacity.shape[1] + new_slots
+    _, inverse, counts = np.unique(keys, return_inverse=True, return_counts=True)
+    lesson_types = ["1:1" if size == 1 else "Group" for size in counts[inverse.reshape(-1)].tolist()]
+    return new_slots, lesson_types
+
+
+def group_quality(engine: CompatibilityEngine, grades: np.ndarray, student_idx: np.ndarray,
+                  teacher_idx: np.ndarray, slot_idx: np.ndarray) -> Dict[str, float]:
+    """
+    Summary of how well matches are grouped.
+
+    Returns:
+        dict: Number of lessons (teacher time slots in use), mean students per
+        lesson, share of students in group lessons, mean grade spread (max -
+        min) of group lessons, and share of group lessons whose students all
+        share a subject with the teacher
+    """
+    if len(student_idx) == 0:
+        return {'lessons': 0, 'mean_lesson_size': 0.0, 'grouped_students_rate': 0.0,
+                'mean_grade_spread': 0.0, 'shared_focus_rate': 0.0}
+    keys = teacher_idx.astype(np.int64) * (int(slot_idx.max()) + 1) + slot_idx
+    order = np.argsort(keys, kind='stable')
+    _, starts, counts = np.unique(keys[order], return_index=True, return_counts=True)
+
+    match_grades = np.asarray(grades, dtype=float)[student_idx][order]
+    common = (engine.student_subjects[student_idx] & engine.teacher_subjects[teacher_idx])[order]
+    spread = np.fmax.reduceat(match_grades, starts) - np.fmin.reduceat(match_grades, starts)
+    shared = np.bitwise_and.reduceat(common, starts, axis=0).any(axis=1)
+
+    groups = counts > 1
+    return {
+        'lessons': int(len(counts)),
+        'mean_lesson_size': round(float(counts.mean()), 3),
+        'grouped_students_rate': round(float(counts[groups].sum() / counts.sum()), 3),
+        'mean_grade_spread': round(float(np.nanmean(spread[groups])), 3) if groups.any() else 0.0,
+        'shared_focus_rate': round(float(shared[groups].mean()), 3) if groups.any() else 0.0,
+    }
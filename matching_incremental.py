@@ -0,0 +1,350 @@
+"""
+Incremental re-matching for the Student-Teacher Matching system.
+
+After `create_matches` the engine (packed masks plus `CandidateIndex`), the
+capacity table and every student's seat are kept live in a `LiveSchedule`.
+Enrollment and availability changes then only touch the seats they affect:
+students whose seat disappears are displaced, freed or new seats are offered
+to the unmatched students that can use them, and only those students are
+re-scored and re-assigned (greedily, in descending score order).
+"""
+
+import numpy as np
+from collections import defaultdict
+from typing import Iterable, List, Set, Tuple
+
+from matching_engine import CapacityTable, CompatibilityEngine, assign_greedy
+from matching_vocabulary import pad_words, popcount
+
+Seat = Tuple[int, int]
+
+
+def _slot_bits(slot_masks: np.ndarray, slot: int) -> np.ndarray:
+    """Whether each packed slot mask row has `slot` set."""
+    return ((slot_masks[:, slot // 64] >> np.uint64(slot % 64)) & np.uint64(1)).astype(bool)
+
+
+class LiveSchedule:
+    """
+    Assignment state kept live between incremental updates.
+
+    Every per-student array is indexed by student row: the assigned teacher
+    row, slot code and score (-1 / 0.0 when unmatched), the seating sequence
+    number and the position of the student's entry in the schedule list.
+    Seating order decides lesson types, so the first student of a multi-seat
+    slot keeps the "1:1" lesson type just as in a full run, unless groups
+    were packed, in which case group sizes decide them. Being plain arrays,
+    the state is renumbered with vectorized indexing when rows go.
+    """
+
+    def __init__(self, engine: CompatibilityEngine, capacity: CapacityTable, student_idx: np.ndarray,
+                 teacher_idx: np.ndarray, slot_idx: np.ndarray, scores: np.ndarray,
+                 lesson_types_by_size: bool = False):
+        """
+        Args:
+            engine: Engine the matches were created with (its arrays are updated in place)
+            capacity: Capacity table over the engine's teachers
+            student_idx, teacher_idx, slot_idx, scores: Accepted matches in
+                acceptance order, which is also the schedule order
+            lesson_types_by_size: "1:1" only for students alone in their slot
+                (see `matching_groups.pack_groups`)
+        """
+        self.engine = engine
+        self.capacity = capacity
+        self.lesson_types_by_size = lesson_types_by_size
+
+        n_students = len(engine.student_subjects)
+        self.teacher = np.full(n_students, -1, dtype=np.int64)
+        self.slot = np.full(n_students, -1, dtype=np.int64)
+        self.score = np.zeros(n_students, dtype=float)
+        self.seated = np.full(n_students, -1, dtype=np.int64)
+        self.entry = np.full(n_students, -1, dtype=np.int64)
+        self.teacher[student_idx] = teacher_idx
+        self.slot[student_idx] = slot_idx
+        self.score[student_idx] = scores
+        self.seated[student_idx] = self.entry[student_idx] = np.arange(len(student_idx))
+        self._next_seat = len(student_idx)
+
+        # Occupancy is the source of truth, whichever path produced the matches
+        capacity.remaining = capacity.max_capacity.copy()
+        np.subtract.at(capacity.remaining, (np.asarray(teacher_idx), np.asarray(slot_idx)), 1)
+
+    @property
+    def n_slots(self) -> int:
+        return self.capacity.max_capacity.shape[1]
+
+    def _seat_keys(self) -> np.ndarray:
+        """Seat key (teacher * n_slots + slot) of every student row, negative when unmatched."""
+        return np.where(self.teacher >= 0, self.teacher * self.n_slots + self.slot, -1)
+
+    def occupants(self, seats: Iterable[Seat]) -> np.ndarray:
+        """Student rows seated in any of `seats`, in seating order."""
+        keys = [teacher * self.n_slots + slot for teacher, slot in seats]
+        if not keys:
+            return np.array([], dtype=np.int64)
+        rows = np.nonzero(np.isin(self._seat_keys(), keys))[0]
+        return rows[np.argsort(self.seated[rows], kind='stable')]
+
+    def lesson_types(self, students: np.ndarray) -> List[str]:
+        """Lesson type of every (assigned) student in `students`."""
+        students = np.asarray(students, dtype=np.int64)
+        keys = self._seat_keys()
+        wanted = np.unique(keys[students])
+        members = np.nonzero(np.isin(keys, wanted))[0]
+        if self.lesson_types_by_size:
+            sizes = np.bincount(np.searchsorted(wanted, keys[members]), minlength=len(wanted))
+            sizes = sizes[np.searchsorted(wanted, keys[students])]
+            return ["1:1" if size == 1 else "Group" for size in sizes.tolist()]
+        first = np.full(len(wanted), np.iinfo(np.int64).max, dtype=np.int64)
+        np.minimum.at(first, np.searchsorted(wanted, keys[members]), self.seated[members])
+
+        is_first = self.seated[students] == first[np.searchsorted(wanted, keys[students])]
+        single = self.capacity.max_capacity[self.teacher[students], self.slot[students]] == 1
+        return ["1:1" if one else "Group" for one in (is_first | single).tolist()]
+
+    def _widen(self, subjects: np.ndarray, slots: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Pad the engine's masks and the given mask rows to the current vocabulary widths."""
+        engine = self.engine
+        subject_words, slot_words = engine.subject_vocab.words, engine.slot_vocab.words
+        engine.student_subjects = pad_words(engine.student_subjects, subject_words)
+        engine.teacher_subjects = pad_words(engine.teacher_subjects, subject_words)
+        engine.student_slots = pad_words(engine.student_slots, slot_words)
+        engine.teacher_slots = pad_words(engine.teacher_slots, slot_words)
+        return (pad_words(np.atleast_2d(subjects), subject_words).reshape(subjects.shape[:-1] + (-1,)),
+                pad_words(np.atleast_2d(slots), slot_words).reshape(slots.shape[:-1] + (-1,)))
+
+    def _scores(self, students: np.ndarray, teacher: int, slots) -> np.ndarray:
+        """Score of `students` against one teacher in `slots` (one slot, or one per student)."""
+        engine = self.engine
+        inter = popcount(engine.student_subjects[students] & engine.teacher_subjects[teacher])
+        union = popcount(engine.student_subjects[students]) + engine.teacher_subject_counts[teacher] - inter
+        return engine.adjust_scores(np.full(len(students), teacher), np.broadcast_to(slots, len(students)),
+                                    inter / np.maximum(union, 1))
+
+    def _clear(self, students: np.ndarray):
+        """Mark `students` unmatched without touching capacity."""
+        self.teacher[students] = self.slot[students] = self.seated[students] = -1
+        self.score[students] = 0.0
+
+    def unassign(self, students: Iterable[int]) -> Set[Seat]:
+        """
+        Free the seats of `students`.
+
+        Returns:
+            set: Seats that were freed
+        """
+        students = np.asarray(list(students), dtype=np.int64)
+        students = students[self.teacher[students] >= 0]
+        teachers, slots = self.teacher[students], self.slot[students]
+        np.add.at(self.capacity.remaining, (teachers, slots), 1)
+        self._clear(students)
+        return set(zip(teachers.tolist(), slots.tolist()))
+
+    def _waiting_pairs(self, seats: Iterable[Seat], exclude: np.ndarray) -> Tuple[np.ndarray, ...]:
+        """
+        Candidates of unmatched students for the open seats among `seats`.
+
+        A greedy pass leaves no unmatched student with a compatible open seat,
+        so after a change only the seats it touched can take waiting students.
+
+        Args:
+            seats: Seats touched by the change; full ones are ignored
+            exclude: Boolean mask of student rows to leave out
+
+        Returns:
+            tuple: (student_idx, teacher_idx, slot_idx, scores) arrays
+        """
+        open_slots = defaultdict(list)
+        for teacher, slot in seats:
+            if self.capacity.remaining[teacher, slot] > 0:
+                open_slots[teacher].append(slot)
+
+        engine = self.engine
+        waiting = np.nonzero((self.teacher < 0) & ~exclude)[0]
+        subjects, slot_masks = engine.student_subjects[waiting], engine.student_slots[waiting]
+        pairs = []
+        for teacher, slots in open_slots.items():
+            shares_subject = (subjects & engine.teacher_subjects[teacher]).any(axis=1)
+            for slot in slots:
+                students = waiting[shares_subject & _slot_bits(slot_masks, slot)]
+                pairs.append((students, np.full(len(students), teacher), np.full(len(students), slot),
+                              self._scores(students, teacher, slot)))
+        if not pairs:
+            empty = np.array([], dtype=np.int64)
+            return empty, empty, empty, np.array([], dtype=float)
+        return tuple(np.concatenate(parts) for parts in zip(*pairs))
+
+    def place(self, students: Iterable[int], seats: Iterable[Seat], exclude: np.ndarray) -> Tuple[Set[Seat], np.ndarray]:
+        """
+        Greedily seat unmatched `students`, together with the waiting students
+        that fit one of the changed `seats`, in the remaining capacity.
+
+        Args:
+            students: Unmatched student rows that need a seat (displaced, new or updated)
+            seats: Seats freed or opened by the change
+            exclude: Boolean mask of student rows that must not be seated
+
+        Returns:
+            tuple: (seats that were taken, student rows that were seated)
+        """
+        students = np.unique(np.asarray(list(students), dtype=np.int64))
+        engine = self.engine
+        subset = CompatibilityEngine(engine.student_subjects[students], engine.student_slots[students],
+                                     engine.teacher_subjects, engine.teacher_slots, engine.index.teacher_ids,
+                                     engine.subject_vocab, engine.slot_vocab, index=engine.index,
+                                     score_adjustment=engine.score_adjustment)
+        student_idx, teacher_idx, slot_idx, scores = subset.candidate_pairs()
+        skip = exclude.copy()
+        skip[students] = True
+        waiting = self._waiting_pairs(seats, skip)
+
+        # Only open seats can be taken; keep the candidate order of a full run
+        student_idx, teacher_idx, slot_idx, scores = (
+            np.concatenate(parts) for parts in zip((students[student_idx], teacher_idx, slot_idx, scores), waiting))
+        open_seat = self.capacity.remaining[teacher_idx, slot_idx] > 0
+        student_idx, teacher_idx, slot_idx, scores = (
+            array[open_seat] for array in (student_idx, teacher_idx, slot_idx, scores))
+        order = np.lexsort((slot_idx, teacher_idx, student_idx))
+        student_idx, teacher_idx, slot_idx, scores = (
+            array[order] for array in (student_idx, teacher_idx, slot_idx, scores))
+        accepted, _ = assign_greedy(student_idx, teacher_idx, slot_idx, scores, self.capacity)
+
+        placed = student_idx[accepted]
+        self.teacher[placed] = teacher_idx[accepted]
+        self.slot[placed] = slot_idx[accepted]
+        self.score[placed] = scores[accepted]
+        self.seated[placed] = self._next_seat + np.arange(len(placed))
+        self._next_seat += len(placed)
+        return set(zip(teacher_idx[accepted].tolist(), slot_idx[accepted].tolist())), placed
+
+    def add_students(self, subjects: np.ndarray, slots: np.ndarray) -> np.ndarray:
+        """
+        Append unmatched student rows.
+
+        Returns:
+            np.ndarray: Row positions of the new students
+        """
+        subjects, slots = self._widen(subjects, slots)
+        engine = self.engine
+        first = len(engine.student_subjects)
+        engine.student_subjects = np.vstack([engine.student_subjects, subjects])
+        engine.student_slots = np.vstack([engine.student_slots, slots])
+
+        unmatched = np.full(len(subjects), -1, dtype=np.int64)
+        self.teacher = np.concatenate([self.teacher, unmatched])
+        self.slot = np.concatenate([self.slot, unmatched])
+        self.seated = np.concatenate([self.seated, unmatched])
+        self.entry = np.concatenate([self.entry, unmatched])
+        self.score = np.concatenate([self.score, np.zeros(len(subjects), dtype=float)])
+        return np.arange(first, first + len(subjects))
+
+    def set_student(self, student: int, subjects: np.ndarray, slots: np.ndarray):
+        """Replace the masks of an unassigned student row."""
+        subjects, slots = self._widen(subjects, slots)
+        self.engine.student_subjects[student] = subjects
+        self.engine.student_slots[student] = slots
+
+    def add_teachers(self, teacher_ids: Iterable, subjects: np.ndarray, slots: np.ndarray,
+                     max_students_per_slot: Iterable[int]) -> np.ndarray:
+        """
+        Append teacher rows, index them and open their seats.
+
+        Returns:
+            np.ndarray: Row positions of the new teachers
+        """
+        subjects, slots = self._widen(subjects, slots)
+        engine = self.engine
+        engine.teacher_subjects = np.vstack([engine.teacher_subjects, subjects])
+        engine.teacher_slots = np.vstack([engine.teacher_slots, slots])
+        engine.teacher_subject_counts = np.concatenate([engine.teacher_subject_counts, popcount(subjects)])
+
+        rows = [engine.index.append_teacher(teacher_id, subject_mask, slot_mask)
+                for teacher_id, subject_mask, slot_mask in zip(teacher_ids, subjects, slots)]
+
+        added = CapacityTable(max_students_per_slot, slots, self.n_slots)
+        self.capacity.max_capacity = np.vstack([self.capacity.max_capacity, added.max_capacity])
+        self.capacity.remaining = np.vstack([self.capacity.remaining, added.remaining])
+        return np.array(rows, dtype=np.int64)
+
+    def set_teacher(self, teacher: int, subjects: np.ndarray, slots: np.ndarray,
+                    max_students_per_slot: int) -> Tuple[np.ndarray, Set[Seat]]:
+        """
+        Replace a teacher's subjects, time slots and capacity.
+
+        Seated students stay (re-scored) while they still share a subject and
+        the slot is still offered; the latest-seated students beyond a reduced
+        capacity are displaced first.
+
+        Returns:
+            tuple: (displaced student rows, every seat of the teacher)
+        """
+        subjects, slots = self._widen(subjects, slots)
+        engine = self.engine
+        engine.index.remove(teacher, engine.teacher_subjects[teacher], engine.teacher_slots[teacher])
+        engine.teacher_subjects[teacher] = subjects
+        engine.teacher_slots[teacher] = slots
+        engine.teacher_subject_counts[teacher] = popcount(subjects[None, :])[0]
+        engine.index.add(teacher, subjects, slots)
+
+        seat_capacity = CapacityTable([max_students_per_slot], slots[None, :], self.n_slots).max_capacity[0]
+        self.capacity.max_capacity[teacher] = seat_capacity
+
+        seats = {(teacher, slot) for slot in range(self.n_slots)}
+        seated = self.occupants(seats)
+        kept = np.zeros(len(seated), dtype=bool)
+        shares_subject = (engine.student_subjects[seated] & subjects).any(axis=1)
+        for slot in range(self.n_slots):
+            in_slot = np.nonzero((self.slot[seated] == slot) & shares_subject)[0]
+            kept[in_slot[:seat_capacity[slot]]] = True
+
+        displaced = seated[~kept]
+        self._clear(displaced)
+        self.score[seated[kept]] = self._scores(seated[kept], teacher, self.slot[seated[kept]])
+        self.capacity.remaining[teacher] = seat_capacity - np.bincount(self.slot[seated[kept]],
+                                                                       minlength=self.n_slots)
+        return np.sort(displaced), seats
+
+    def remove_teachers(self, teachers: Iterable[int]) -> np.ndarray:
+        """
+        Withdraw teachers from the index and close all of their seats.
+
+        Returns:
+            np.ndarray: Student rows displaced from the teachers' seats
+        """
+        engine = self.engine
+        teachers = np.asarray(list(teachers), dtype=np.int64)
+        for teacher in teachers.tolist():
+            engine.index.remove(teacher, engine.teacher_subjects[teacher], engine.teacher_slots[teacher])
+        self.capacity.max_capacity[teachers] = 0
+        self.capacity.remaining[teachers] = 0
+
+        displaced = np.nonzero(np.isin(self.teacher, teachers))[0]
+        self._clear(displaced)
+        return displaced
+
+    def compact(self, keep_students: np.ndarray, keep_teachers: np.ndarray):
+        """
+        Drop removed student and teacher rows, renumbering the rest in order.
+
+        Args:
+            keep_students: Boolean mask of student rows to keep
+            keep_teachers: Boolean mask of teacher rows to keep (their students
+                must already be displaced)
+        """
+        engine = self.engine
+        engine.student_subjects = engine.student_subjects[keep_students]
+        engine.student_slots = engine.student_slots[keep_students]
+        self.teacher, self.slot, self.score, self.seated, self.entry = (
+            array[keep_students] for array in (self.teacher, self.slot, self.score, self.seated, self.entry))
+
+        if not keep_teachers.all():
+            teacher_row = np.cumsum(keep_teachers) - 1
+            self.teacher = np.where(self.teacher >= 0, teacher_row[self.teacher], -1)
+            engine.teacher_subjects = engine.teacher_subjects[keep_teachers]
+            engine.teacher_slots = engine.teacher_slots[keep_teachers]
+            engine.teacher_subject_counts = engine.teacher_subject_counts[keep_teachers]
+            if engine.score_adjustment is not None:
+                engine.score_adjustment = engine.score_adjustment[keep_teachers[:len(engine.score_adjustment)]]
+            engine.index.compact(keep_teachers)
+            self.capacity.max_capacity = self.capacity.max_capacity[keep_teachers]
+            self.capacity.remaining = self.capacity.remaining[keep_teachers]
@@ -0,0 +1,218 @@
+"""
+Streaming CSV ingestion for the Student-Teacher Matching system.
+
+Input files are read in chunks with explicit dtypes and only the columns the
+matcher uses. Subject and time slot strings are parsed once per chunk into
+packed integer bitmasks through shared vocabularies, so no per-row Python
+lists are ever built.
+"""
+
+import numpy as np
+import pandas as pd
+from typing import Dict, Iterator, List, Tuple
+
+from matching_vocabulary import Vocabulary, pad_words, sorted_vocabulary
+
+# Columns and dtypes read from each input file; ids are read as text and
+# become integers when every id of a file is one (see `infer_ids`)
+STUDENT_DTYPES = {
+    'student_id': str,
+    'name': 'string',
+    'grade': 'Int16',
+    'subjects': 'string',
+    'preferred_time_slots': 'string',
+}
+TEACHER_DTYPES = {
+    'teacher_id': str,
+    'name': 'string',
+    'subjects': 'string',
+    'available_time_slots': 'string',
+    'max_students_per_slot': 'Float64',
+}
+
+# Columns an input file may lack; teachers without a capacity get DEFAULT_CAPACITY
+OPTIONAL_COLUMNS = {'grade', 'max_students_per_slot'}
+
+# Capacity of teachers without a max_students_per_slot
+DEFAULT_CAPACITY = 2
+
+# Rows parsed per chunk when streaming
+DEFAULT_CHUNKSIZE = 100_000
+
+
+class EncodedTable:
+    """Compact processed rows: scalar columns plus packed subject/slot masks."""
+
+    def __init__(self, frame: pd.DataFrame, subjects: np.ndarray, slots: np.ndarray):
+        """
+        Args:
+            frame: Scalar columns (ids, names, grade/capacity), one row per entity
+            subjects: Packed subject bitmasks aligned with `frame`
+            slots: Packed time slot bitmasks aligned with `frame`
+        """
+        self.frame = frame
+        self.subjects = subjects
+        self.slots = slots
+
+    def __len__(self) -> int:
+        return len(self.frame)
+
+    @classmethod
+    def concat(cls, tables: List['EncodedTable']) -> 'EncodedTable':
+        """Concatenate chunks, widening masks encoded before the vocabulary grew."""
+        subject_words = max(table.subjects.shape[1] for table in tables)
+        slot_words = max(table.slots.shape[1] for table in tables)
+        return cls(
+            pd.concat([table.frame for table in tables], ignore_index=True),
+            np.vstack([pad_words(table.subjects, subject_words) for table in tables]),
+            np.vstack([pad_words(table.slots, slot_words) for table in tables]),
+        )
+
+
+# Per input kind: (dtypes, id column, time slot column)
+SCHEMAS = {
+    'students': (STUDENT_DTYPES, 'student_id', 'preferred_time_slots'),
+    'teachers': (TEACHER_DTYPES, 'teacher_id', 'available_time_slots'),
+}
+
+
+def encode_frame(df: pd.DataFrame, kind: str, subject_vocab: Vocabulary, slot_vocab: Vocabulary) -> EncodedTable:
+    """
+    Clean a raw students or teachers frame and encode its subjects and time slots.
+
+    Rows without an id or name are dropped and missing teacher capacities
+    (or a missing capacity column) default to 2. The raw subject and time slot columns are replaced by
+    packed masks; every other column is kept.
+
+    Args:
+        df: Raw frame as read from CSV
+        kind: 'students' or 'teachers'
+        subject_vocab: Vocabulary for subjects, extended in place
+        slot_vocab: Vocabulary for time slots, extended in place
+
+    Returns:
+        EncodedTable: Cleaned rows and their masks
+    """
+    if kind not in SCHEMAS:
+        raise ValueError(f"Unknown input kind: {kind}")
+    _, id_column, slot_column = SCHEMAS[kind]
+
+    df = df.dropna(subset=[id_column, 'name']).reset_index(drop=True)
+    subjects = subject_vocab.encode(df['subjects'])
+    slots = slot_vocab.encode(df[slot_column])
+
+    frame = df.drop(columns=['subjects', slot_column])
+    if pd.api.types.is_integer_dtype(frame[id_column].dtype):
+        frame[id_column] = frame[id_column].astype(np.int64)
+    if kind == 'teachers':
+        if 'max_students_per_slot' not in frame:
+            frame['max_students_per_slot'] = DEFAULT_CAPACITY
+        frame['max_students_per_slot'] = frame['max_students_per_slot'].fillna(DEFAULT_CAPACITY).astype(np.int32)
+
+    return EncodedTable(frame, subjects, slots)
+
+
+def sort_rows(table: EncodedTable, kind: str) -> EncodedTable:
+    """
+    Rows of an encoded table in id order.
+
+    Matching breaks ties by row position, so sorted rows make schedules the
+    same for any order of the input rows. Rows sharing an id keep their
+    input order.
+
+    Args:
+        table: Encoded students or teachers
+        kind: 'students' or 'teachers'
+
+    Returns:
+        EncodedTable: The rows sorted by id (`table` itself if already sorted)
+    """
+    _, id_column, _ = SCHEMAS[kind]
+    ids = table.frame[id_column]
+    if ids.is_monotonic_increasing:
+        return table
+    order = ids.to_numpy().argsort(kind='stable')
+    return EncodedTable(table.frame.iloc[order].reset_index(drop=True), table.subjects[order], table.slots[order])
+
+
+def canonical_tables(subject_vocab: Vocabulary, **tables: EncodedTable) -> Tuple[Vocabulary, Dict[str, EncodedTable]]:
+    """
+    Encoded tables in canonical form: rows in id order, subject codes in sorted order.
+
+    Matching breaks ties by row position and subject code, so canonical
+    tables give the same schedule for any order of equivalent input rows and
+    of the subjects within a cell.
+
+    Args:
+        subject_vocab: Vocabulary the subject masks were encoded with
+        **tables: Encoded tables by kind ('students' and/or 'teachers')
+
+    Returns:
+        tuple: (subject vocabulary with sorted codes, canonical tables by kind)
+    """
+    kinds = list(tables)
+    subject_vocab, subjects = sorted_vocabulary(subject_vocab, *(tables[kind].subjects for kind in kinds))
+    return subject_vocab, {kind: sort_rows(EncodedTable(tables[kind].frame, masks, tables[kind].slots), kind)
+                           for kind, masks in zip(kinds, subjects)}
+
+
+def iter_encoded_chunks(path: str, kind: str, subject_vocab: Vocabulary, slot_vocab: Vocabulary,
+                        chunksize: int = DEFAULT_CHUNKSIZE) -> Iterator[EncodedTable]:
+    """
+    Read a students or teachers CSV in chunks and encode each chunk.
+
+    Args:
+        path: CSV file path
+        kind: 'students' or 'teachers'
+        subject_vocab: Vocabulary shared by all chunks for subjects
+        slot_vocab: Vocabulary shared by all chunks for time slots
+        chunksize: Rows per chunk
+
+    Yields:
+        EncodedTable: One encoded chunk
+    """
+    if kind not in SCHEMAS:
+        raise ValueError(f"Unknown input kind: {kind}")
+    header = pd.read_csv(path, nrows=0).columns
+    dtypes = {column: dtype for column, dtype in SCHEMAS[kind][0].items() if column in header}
+    missing = [column for column in SCHEMAS[kind][0] if column not in dtypes and column not in OPTIONAL_COLUMNS]
+    if missing:
+        raise ValueError(f"{path} lacks required columns: {', '.join(missing)}")
+
+    for chunk in pd.read_csv(path, usecols=list(dtypes), dtype=dtypes, chunksize=chunksize):
+        yield encode_frame(chunk, kind, subject_vocab, slot_vocab)
+
+
+def integer_ids(ids: pd.Series) -> pd.Series:
+    """Text ids as int64 when every one of them is an integer, as `pd.read_csv` would type them."""
+    if pd.api.types.is_string_dtype(ids.dtype) and ids.str.fullmatch(r'\s*[+-]?\d+\s*').all():
+        return ids.astype(np.int64)
+    return ids
+
+
+def infer_ids(table: EncodedTable, kind: str) -> EncodedTable:
+    """
+    Type the text ids of an encoded table (see `integer_ids`).
+
+    Args:
+        table: Encoded students or teachers (e.g. from `iter_encoded_chunks`)
+        kind: 'students' or 'teachers'
+
+    Returns:
+        EncodedTable: `table`, with integer ids where possible
+    """
+    _, id_column, _ = SCHEMAS[kind]
+    table.frame[id_column] = integer_ids(table.frame[id_column])
+    return table
+
+
+def read_encoded(path: str, kind: str, subject_vocab: Vocabulary, slot_vocab: Vocabulary,
+                 chunksize: int = DEFAULT_CHUNKSIZE) -> EncodedTable:
+    """
+    Read a whole students or teachers CSV in chunks (see `iter_encoded_chunks`).
+
+    Returns:
+        EncodedTable: Every row, ids typed over the whole file (see `infer_ids`)
+    """
+    return infer_ids(EncodedTable.concat(list(iter_encoded_chunks(path, kind, subject_vocab, slot_vocab,
+                                                                  chunksize))), kind)
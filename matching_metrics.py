@@ -0,0 +1,187 @@
+"""
+Schedule metrics for the Student-Teacher Matching system.
+
+`ScheduleMetrics` keeps running lesson counts of a schedule per student,
+teacher, time slot, lesson type, score and subject, each as a numpy array
+over stable integer codes. Matches are added and removed column-wise (one
+bincount per category) while the schedule is built, streamed or repaired,
+so metrics are read off the counts without another pass over the schedule.
+"""
+
+import numpy as np
+import pandas as pd
+from collections import Counter
+from typing import Dict, List, Tuple
+
+from matching_vocabulary import popcount, unpack_bits
+
+# Categories counted per lesson, in match dictionary key order
+CATEGORIES = ('student_id', 'teacher_id', 'time_slot', 'lesson_type', 'compatibility_score')
+
+# Scores are counted in thousandths, the precision of the schedule
+SCORE_SCALE = 1000
+
+
+class ValueCodes:
+    """Integer codes of values in first-seen order; a value's code never changes."""
+
+    def __init__(self):
+        self.values = None
+
+    def encode(self, values) -> np.ndarray:
+        # Factorize the batch, then look up only its distinct values
+        codes, uniques = pd.factorize(np.asarray(values))
+        if self.values is None:
+            self.values = pd.Index(uniques)
+            return codes
+        mapping = self.values.get_indexer(uniques)
+        new = mapping < 0
+        if new.any():
+            mapping[new] = np.arange(len(self.values), len(self.values) + int(new.sum()))
+            self.values = self.values.append(pd.Index(uniques[new]))
+        return mapping[codes]
+
+
+def _add_counts(counts: np.ndarray, codes: np.ndarray, sign: int) -> np.ndarray:
+    """Add `sign` per occurrence of every code to `counts`, growing it as needed."""
+    delta = np.bincount(codes, minlength=len(counts))
+    if len(delta) > len(counts):
+        counts = np.concatenate([counts, np.zeros(len(delta) - len(counts), dtype=np.int64)])
+    return counts + sign * delta
+
+
+def group_means(keys, *columns) -> Tuple[np.ndarray, np.ndarray, List[np.ndarray]]:
+    """
+    Per-key counts and column means in one factorize/bincount pass.
+
+    Args:
+        keys: Group key of every row
+        *columns: Numeric columns to average per key
+
+    Returns:
+        tuple: (sorted unique keys, rows per key, mean of every column per key)
+    """
+    codes, uniques = pd.factorize(np.asarray(keys), sort=True)
+    counts = np.bincount(codes, minlength=len(uniques))
+    means = [np.bincount(codes, weights=np.asarray(column, dtype=float), minlength=len(uniques)) / counts
+             for column in columns]
+    return np.asarray(uniques), counts, means
+
+
+class ScheduleMetrics:
+    """Running lesson counts of a schedule, updated as matches are added and removed."""
+
+    def __init__(self):
+        self._codes = {category: ValueCodes() for category in CATEGORIES}
+        self._counts = {category: np.zeros(0, dtype=np.int64) for category in CATEGORIES}
+        self.subject_counts = np.zeros(0, dtype=np.int64)
+        self.total_lessons = 0
+
+    def update(self, student_ids, teacher_ids, time_slots, lesson_types, scores,
+               subject_masks: np.ndarray, sign: int = 1):
+        """
+        Count lessons given column-wise.
+
+        Args:
+            student_ids, teacher_ids, time_slots, lesson_types, scores: One
+                value per lesson
+            subject_masks: Packed subjects taught in every lesson
+            sign: 1 to add the lessons, -1 to remove lessons counted before
+        """
+        score_codes = np.rint(np.asarray(scores, dtype=float) * SCORE_SCALE).astype(np.int64)
+        for category, values in zip(CATEGORIES, (student_ids, teacher_ids, time_slots, lesson_types, score_codes)):
+            codes = self._codes[category].encode(values)
+            self._counts[category] = _add_counts(self._counts[category], codes, sign)
+
+        subject_masks = np.asarray(subject_masks, dtype=np.uint64)
+        if len(subject_masks):
+            lessons = unpack_bits(subject_masks, subject_masks.shape[1] * 64).sum(axis=0, dtype=np.int64)
+            if len(lessons) < len(self.subject_counts):
+                lessons = np.concatenate([lessons, np.zeros(len(self.subject_counts) - len(lessons), dtype=np.int64)])
+            elif len(lessons) > len(self.subject_counts):
+                self.subject_counts = np.concatenate(
+                    [self.subject_counts, np.zeros(len(lessons) - len(self.subject_counts), dtype=np.int64)])
+            self.subject_counts = self.subject_counts + sign * lessons
+        self.total_lessons += sign * len(score_codes)
+
+    def add(self, *columns):
+        """Count lessons given column-wise (see `update`)."""
+        self.update(*columns, sign=1)
+
+    def remove(self, *columns):
+        """Stop counting lessons given column-wise (see `update`)."""
+        self.update(*columns, sign=-1)
+
+    def update_matches(self, matches: List[Dict], subject_masks: np.ndarray, sign: int = 1):
+        """Count (sign 1) or stop counting (sign -1) match dictionaries."""
+        if not matches:
+            return
+        columns = [[match[category] for match in matches] for category in CATEGORIES]
+        self.update(*columns, subject_masks, sign=sign)
+
+    def lessons_by(self, category: str) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Values of a category that have lessons, and their lesson counts.
+
+        Args:
+            category: One of CATEGORIES; scores are returned in thousandths
+
+        Returns:
+            tuple: (values in first-seen order, lessons per value)
+        """
+        counts = self._counts[category]
+        used = np.flatnonzero(counts > 0)
+        if self._codes[category].values is None:
+            return np.array([]), counts[used]
+        return self._codes[category].values[used].to_numpy(), counts[used]
+
+    def _distribution(self, category: str) -> Dict:
+        values, counts = self.lessons_by(category)
+        return dict(zip(values.tolist(), counts.tolist()))
+
+    def summary(self, total_students: int, total_teachers: int, total_subjects: int) -> Dict:
+        """
+        Metrics of the counted lessons in the layout of `calculate_metrics`.
+
+        Args:
+            total_students: Students in the population (matched or not)
+            total_teachers: Teachers in the population
+            total_subjects: Subjects requested by the population
+        """
+        matched_students = int((self._counts['student_id'] > 0).sum())
+        utilized_teachers = int((self._counts['teacher_id'] > 0).sum())
+        score_counts = self._counts['compatibility_score']
+        used = score_counts > 0
+        milli_scores = self._codes['compatibility_score'].values.to_numpy(dtype=np.int64)[used]
+        covered_subjects = int((self.subject_counts > 0).sum())
+
+        return {
+            'total_students': total_students,
+            'matched_students': matched_students,
+            'unmatched_students': total_students - matched_students,
+            'matching_rate': round((matched_students / total_students) * 100, 2),
+            'total_lessons': self.total_lessons,
+            'lesson_types': Counter(self._distribution('lesson_type')),
+            'teacher_utilization': {
+                'total_teachers': total_teachers,
+                'utilized_teachers': utilized_teachers,
+                'utilization_rate': round((utilized_teachers / total_teachers) * 100, 2)
+            },
+            'time_slot_distribution': self._distribution('time_slot'),
+            'average_compatibility_score': round(
+                float((milli_scores * score_counts[used]).sum()) / SCORE_SCALE / self.total_lessons, 3),
+            'min_compatibility_score': round(int(milli_scores.min()) / SCORE_SCALE, 3),
+            'max_compatibility_score': round(int(milli_scores.max()) / SCORE_SCALE, 3),
+            'subject_coverage': {
+                'total_subjects': total_subjects,
+                'covered_subjects': covered_subjects,
+                'coverage_rate': round((covered_subjects / total_subjects) * 100, 2) if total_subjects else 0
+            }
+        }
+
+
+def total_subjects(subject_masks: np.ndarray) -> int:
+    """Number of distinct subjects set in any row of packed masks."""
+    if len(subject_masks) == 0:
+        return 0
+    return int(popcount(np.bitwise_or.reduce(subject_masks, axis=0)))
@@ -0,0 +1,284 @@
+"""
+Charts for the Student-Teacher Matching system.
+
+Kept apart from `student_teacher_matcher` so that matching and exporting
+never import matplotlib or seaborn; the matcher only imports this module
+when a chart is requested, and matplotlib itself is only imported by the
+code that draws.
+
+Every chart is drawn from a small, picklable summary of the matcher (counts
+rather than the schedule), so charts can be rendered in worker processes.
+In headless mode (the Agg backend, no `plt.show()`; the default when no
+display is available) charts are drawn in a process pool, and a chart whose
+summary hashes the same as when its file was last written is not redrawn.
+Teacher utilization shows one bar per teacher only for small teacher sets;
+larger ones get the busiest teachers plus a histogram of students per
+teacher.
+"""
+
+import hashlib
+import json
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable, Dict, List, Tuple
+
+import numpy as np
+import pandas as pd
+
+DEFAULT_DPI = 300
+
+# Teachers drawn one bar each; larger sets get the top ones plus a histogram
+TOP_TEACHERS = 30
+
+# Bar charts with more bars than this get no value labels
+MAX_LABELLED_BARS = 30
+
+# Bump when drawing changes, so charts rendered by older code are redrawn
+CHART_VERSION = 1
+
+ANALYSIS_CHART = 'matching_analysis.png'
+UTILIZATION_CHART = 'teacher_utilization.png'
+
+# Summary hash of every chart file in an output directory
+HASH_FILE = '.chart_hashes.json'
+
+
+def display_available() -> bool:
+    """Whether charts can be shown in a window (otherwise render headless)."""
+    if os.environ.get('MPLBACKEND', '').lower() == 'agg':
+        return False
+    if sys.platform.startswith('linux'):
+        return bool(os.environ.get('DISPLAY') or os.environ.get('WAYLAND_DISPLAY'))
+    return True
+
+
+def _pyplot(headless: bool):
+    """pyplot in the chart style, on the Agg backend when headless."""
+    import matplotlib
+    if headless:
+        matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+    import seaborn as sns
+
+    plt.style.use('default')
+    sns.set_palette("husl")
+    return plt
+
+
+def _finish(plt, fig, path: str, dpi: int, headless: bool):
+    plt.tight_layout()
+    fig.savefig(path, dpi=dpi, bbox_inches='tight')
+    if headless:
+        plt.close(fig)
+    else:
+        plt.show()
+
+
+def _label_bars(ax, bars, skip_zero: bool = False):
+    """Value labels on top of bars."""
+    for bar in bars:
+        height = bar.get_height()
+        if height > 0 or not skip_zero:
+            ax.text(bar.get_x() + bar.get_width() / 2., height, f'{int(height)}', ha='center', va='bottom')
+
+
+def _synced_metrics(matcher):
+    """The matcher's running metrics, recalculated (with `matcher.metrics`) if the schedule changed since."""
+    if (matcher.metrics_version != matcher.schedule_version or matcher.schedule_metrics is None
+            or matcher.schedule_metrics.total_lessons != len(matcher.schedule)):
+        matcher.calculate_metrics()
+    return matcher.schedule_metrics
+
+
+def analysis_data(matcher) -> Dict:
+    """Summary behind the four-panel matching analysis chart."""
+    milli_scores, score_counts = _synced_metrics(matcher).lessons_by('compatibility_score')
+    metrics = matcher.metrics
+    return {
+        'matched': metrics['matched_students'],
+        'unmatched': metrics['unmatched_students'],
+        'time_slots': dict(metrics['time_slot_distribution']),
+        'lesson_types': dict(metrics['lesson_types']),
+        'milli_scores': milli_scores.astype(np.int64).tolist(),
+        'score_counts': score_counts.tolist(),
+        'average_score': metrics['average_compatibility_score'],
+    }
+
+
+def teacher_data(matcher, top: int = TOP_TEACHERS) -> Dict:
+    """
+    Summary behind the teacher utilization chart.
+
+    Returns:
+        dict: Names and student counts of every teacher when there are at
+        most `top` of them; otherwise of the `top` busiest, plus the number of
+        teachers with 0, 1, 2, ... students
+    """
+    teachers = matcher.processed_teachers
+    teacher_ids, lessons = _synced_metrics(matcher).lessons_by('teacher_id')
+    positions = pd.Index(teacher_ids).get_indexer(teachers['teacher_id'])
+    usage = np.where(positions >= 0, lessons[positions], 0)
+    names = teachers['name'].astype(str).tolist()
+
+    if len(usage) <= top:
+        return {'names': names, 'usage': usage.tolist()}
+    busiest = np.argsort(-usage, kind='stable')[:top]
+    return {'names': [names[row] for row in busiest.tolist()], 'usage': usage[busiest].tolist(),
+            'teachers': len(usage), 'teachers_by_usage': np.bincount(usage).tolist()}
+
+
+def render_analysis(data: Dict, path: str, dpi: int = DEFAULT_DPI, headless: bool = True):
+    """Draw the four-panel matching analysis chart to `path`."""
+    plt = _pyplot(headless)
+    fig, axes = plt.subplots(2, 2, figsize=(15, 12))
+    fig.suptitle('Student-Teacher Matching Analysis', fontsize=16, fontweight='bold')
+
+    # 1. Matching Rate Pie Chart
+    ax1 = axes[0, 0]
+    ax1.pie([data['matched'], data['unmatched']], labels=['Matched', 'Unmatched'], colors=['#2ecc71', '#e74c3c'],
+            autopct='%1.1f%%', startangle=90)
+    ax1.set_title('Student Matching Rate')
+
+    # 2. Time Slot Distribution (grid schedules have one bar per 30-minute block in use)
+    ax2 = axes[0, 1]
+    bars = ax2.bar(list(data['time_slots']), list(data['time_slots'].values()),
+                   color=['#3498db', '#f39c12', '#9b59b6'])
+    ax2.set_title('Lessons by Time Slot')
+    ax2.set_ylabel('Number of Lessons')
+    if len(bars) <= MAX_LABELLED_BARS:
+        _label_bars(ax2, bars)
+    else:
+        ax2.tick_params(axis='x', labelrotation=90, labelsize=6)
+
+    # 3. Lesson Type Distribution
+    ax3 = axes[1, 0]
+    ax3.pie(list(data['lesson_types'].values()), labels=list(data['lesson_types']), colors=['#1abc9c', '#e67e22'],
+            autopct='%1.1f%%', startangle=90)
+    ax3.set_title('Lesson Type Distribution')
+
+    # 4. Compatibility Score Distribution, from lesson counts per score
+    ax4 = axes[1, 1]
+    ax4.hist(np.asarray(data['milli_scores']) / 1000, bins=10, weights=data['score_counts'],
+             color='#34495e', alpha=0.7, edgecolor='black')
+    ax4.set_title('Compatibility Score Distribution')
+    ax4.set_xlabel('Compatibility Score')
+    ax4.set_ylabel('Number of Matches')
+    ax4.axvline(data['average_score'], color='red', linestyle='--', label=f"Mean: {data['average_score']}")
+    ax4.legend()
+
+    _finish(plt, fig, path, dpi, headless)
+
+
+def render_teacher_utilization(data: Dict, path: str, dpi: int = DEFAULT_DPI, headless: bool = True):
+    """Draw the teacher utilization chart to `path`."""
+    plt = _pyplot(headless)
+    colors = ['#2ecc71' if count > 0 else '#e74c3c' for count in data['usage']]
+
+    if 'teachers_by_usage' not in data:
+        fig, ax = plt.subplots(figsize=(12, 6))
+        bars = ax.bar(data['names'], data['usage'], color=colors)
+        ax.set_title('Teacher Utilization - Number of Students Assigned', fontsize=14, fontweight='bold')
+        ax.set_xlabel('Teachers')
+        ax.set_ylabel('Number of Students')
+        ax.tick_params(axis='x', labelrotation=45)
+        plt.setp(ax.get_xticklabels(), ha='right')
+        _label_bars(ax, bars, skip_zero=True)
+    else:
+        fig, (top, spread) = plt.subplots(1, 2, figsize=(16, 6), gridspec_kw={'width_ratios': [3, 2]})
+        fig.suptitle(f"Teacher Utilization - {data['teachers']} Teachers", fontsize=14, fontweight='bold')
+        bars = top.bar(data['names'], data['usage'], color=colors)
+        top.set_title(f"Top {len(data['names'])} Teachers by Students Assigned")
+        top.set_ylabel('Number of Students')
+        top.tick_params(axis='x', labelrotation=45, labelsize=8)
+        plt.setp(top.get_xticklabels(), ha='right')
+        _label_bars(top, bars, skip_zero=True)
+
+        by_usage = data['teachers_by_usage']
+        spread.bar(range(len(by_usage)), by_usage,
+                   color=['#e74c3c'] + ['#2ecc71'] * (len(by_usage) - 1), edgecolor='black')
+        spread.set_title(f"Students per Teacher ({by_usage[0]} teachers unused)")
+        spread.set_xlabel('Number of Students')
+        spread.set_ylabel('Number of Teachers')
+
+    _finish(plt, fig, path, dpi, headless)
+
+
+def _digest(data: Dict, dpi: int) -> str:
+    return hashlib.sha256(json.dumps([CHART_VERSION, dpi, data], sort_keys=True).encode()).hexdigest()
+
+
+def _render(jobs: List[Tuple[Callable, Dict, str]], output_dir: str, headless: bool, workers: int,
+            dpi: int, force: bool) -> List[str]:
+    """Draw (render function, summary, file name) jobs; returns the chart paths."""
+    workers = (os.cpu_count() or 1) if workers is None else workers
+    os.makedirs(output_dir, exist_ok=True)
+    hash_path = os.path.join(output_dir, HASH_FILE)
+    hashes = {}
+    if headless and os.path.exists(hash_path):
+        with open(hash_path) as f:
+            hashes = json.load(f)
+
+    pending = []
+    for render, data, name in jobs:
+        path = os.path.join(output_dir, name)
+        digest = _digest(data, dpi)
+        if headless and not force and hashes.get(name) == digest and os.path.exists(path):
+            print(f"📊 {path} is up to date")
+            continue
+        pending.append((render, data, path, name, digest))
+
+    if headless and workers > 1 and len(pending) > 1:
+        with ProcessPoolExecutor(min(workers, len(pending))) as pool:
+            for future in [pool.submit(render, data, path, dpi, True) for render, data, path, _, _ in pending]:
+                future.result()
+    else:
+        for render, data, path, _, _ in pending:
+            render(data, path, dpi, headless)
+
+    for _, _, path, name, digest in pending:
+        hashes[name] = digest
+        print(f"📊 Saved {path}")
+    if headless and pending:
+        with open(hash_path, 'w') as f:
+            json.dump(hashes, f, indent=2)
+    return [os.path.join(output_dir, name) for _, _, name in jobs]
+
+
+def create_visualizations(matcher, output_dir: str = '.', headless: bool = None, workers: int = None,
+                          dpi: int = DEFAULT_DPI, force: bool = False) -> List[str]:
+    """
+    Create comprehensive visualizations for a matcher's results.
+
+    Args:
+        matcher: Matcher with a schedule and metrics
+        output_dir: Directory the PNG files are written to
+        headless: Render with the Agg backend, without showing windows;
+            defaults to whether no display is available
+        workers: Processes drawing charts in parallel when headless;
+            defaults to the number of CPUs
+        dpi: Resolution of the PNG files
+        force: Redraw headless charts even if their summary is unchanged
+
+    Returns:
+        list: Paths of the chart files
+    """
+    if not matcher.schedule or not matcher.metrics:
+        print("❌ No data available for visualization")
+        return []
+
+    headless = not display_available() if headless is None else headless
+    jobs = [(render_analysis, analysis_data(matcher), ANALYSIS_CHART),
+            (render_teacher_utilization, teacher_data(matcher), UTILIZATION_CHART)]
+    return _render(jobs, output_dir, headless, workers, dpi, force)
+
+
+def create_teacher_utilization_chart(matcher, output_dir: str = '.', headless: bool = None,
+                                     dpi: int = DEFAULT_DPI, force: bool = False) -> List[str]:
+    """Create a detailed chart showing a matcher's teacher utilization (see `create_visualizations`)."""
+    if not matcher.schedule:
+        print("❌ No data available for visualization")
+        return []
+    headless = not display_available() if headless is None else headless
+    return _render([(render_teacher_utilization, teacher_data(matcher), UTILIZATION_CHART)],
+                   output_dir, headless, 1, dpi, force)
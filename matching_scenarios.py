@@ -0,0 +1,299 @@
+"""
+What-if scenarios for the Student-Teacher Matching system.
+
+Planners ask questions such as "what if we hire two Science teachers" or
+"what if Mr. John adds Evening". A scenario is a teacher delta in the
+layout of `apply_changes`: teachers added, removed, or updated, where an
+update may give only the columns that change (e.g. just
+`available_time_slots` or `max_students_per_slot`). `run_scenarios` matches
+every scenario from scratch against one preprocessed base state, in a
+process pool, and returns a table comparing their `calculate_metrics`
+outputs.
+
+The base students are encoded once. Their masks and columns are placed in
+shared memory (`multiprocessing.shared_memory`), and every worker maps
+them instead of receiving a pickled copy. Only the small teacher table,
+the vocabularies and the scenario itself are sent per scenario.
+
+Usage:
+    python -m matching_scenarios --students students.csv --teachers teachers.csv --scenarios scenarios.json
+"""
+
+import argparse
+import copy
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+from typing import Dict, List, Tuple
+
+import numpy as np
+import pandas as pd
+
+from matching_ingest import EncodedTable, encode_frame, sort_rows
+from matching_vocabulary import Vocabulary, pad_words
+
+BASE_SCENARIO = 'base'
+
+# Student columns matching never reads; they are not shared with workers
+UNSHARED_COLUMNS = ('name',)
+
+
+class SharedArrays:
+    """Numpy arrays copied once into shared memory blocks, unlinked on exit."""
+
+    def __init__(self, arrays: Dict[str, np.ndarray]):
+        self.blocks = []
+        self.spec = {}
+        for name, array in arrays.items():
+            array = np.ascontiguousarray(array)
+            block = shared_memory.SharedMemory(create=True, size=max(array.nbytes, 1))
+            np.ndarray(array.shape, dtype=array.dtype, buffer=block.buf)[...] = array
+            self.blocks.append(block)
+            self.spec[name] = (block.name, array.shape, array.dtype.str)
+
+    def __enter__(self) -> 'SharedArrays':
+        return self
+
+    def __exit__(self, *exc):
+        for block in self.blocks:
+            block.close()
+            block.unlink()
+
+
+def attach(spec: Dict[str, Tuple[str, Tuple[int, ...], str]]) -> Tuple[Dict[str, np.ndarray], List]:
+    """
+    Map arrays shared with `SharedArrays`, read-only.
+
+    Returns:
+        tuple: (arrays by name, blocks that must stay open while they are used)
+    """
+    arrays, blocks = {}, []
+    for name, (block_name, shape, dtype) in spec.items():
+        block = shared_memory.SharedMemory(name=block_name)
+        array = np.ndarray(shape, dtype=np.dtype(dtype), buffer=block.buf)
+        array.flags.writeable = False
+        arrays[name] = array
+        blocks.append(block)
+    return arrays, blocks
+
+
+def _share_students(students: EncodedTable) -> Tuple[Dict[str, np.ndarray], Dict[str, pd.Index]]:
+    """
+    Student masks and columns as plain arrays for shared memory.
+
+    Numeric columns are shared as they are (nullable ones as floats); other
+    columns are shared as factorized codes, whose distinct values are
+    returned separately.
+
+    Returns:
+        tuple: (arrays by name, distinct values of every factorized column)
+    """
+    arrays = {'subjects': students.subjects, 'slots': students.slots}
+    categories = {}
+    for column in students.frame.columns.drop(list(UNSHARED_COLUMNS), errors='ignore'):
+        values = students.frame[column]
+        if isinstance(values.dtype, np.dtype) and values.dtype.kind in 'iufb':
+            arrays[f'column:{column}'] = values.to_numpy()
+        elif pd.api.types.is_numeric_dtype(values.dtype):
+            arrays[f'column:{column}'] = values.to_numpy(dtype=float, na_value=np.nan)
+        else:
+            codes, categories[column] = pd.factorize(values)
+            arrays[f'column:{column}'] = codes
+    return arrays, categories
+
+
+def _students_from(arrays: Dict[str, np.ndarray], categories: Dict[str, pd.Index]) -> EncodedTable:
+    """Rebuild the shared students (see `_share_students`) over the mapped arrays."""
+    columns = {}
+    for name, array in arrays.items():
+        if name.startswith('column:'):
+            column = name[len('column:'):]
+            columns[column] = (pd.Categorical.from_codes(array, categories[column]) if column in categories
+                               else array)
+    return EncodedTable(pd.DataFrame(columns), arrays['subjects'], arrays['slots'])
+
+
+def apply_teacher_delta(teachers: EncodedTable, delta: Dict, subject_vocab: Vocabulary,
+                        slot_vocab: Vocabulary) -> EncodedTable:
+    """
+    Teachers of a scenario: the base teachers with a delta applied.
+
+    Args:
+        teachers: Encoded base teachers (not modified)
+        delta: {'added': {'teachers': rows}, 'removed': {'teachers': ids},
+            'updated': {'teachers': rows}}; updated rows are matched on
+            teacher_id and only replace the columns they give
+        subject_vocab, slot_vocab: Vocabularies of the base state, extended
+            in place by subjects or slots the delta introduces
+
+    Returns:
+        EncodedTable: The scenario's teachers in id order, masks as wide as
+        the vocabularies
+    """
+    for change in ('added', 'removed', 'updated'):
+        if set(delta.get(change) or {}) - {'teachers'}:
+            raise ValueError("Scenarios can only add, remove or update teachers")
+
+    frame, subjects, slots = teachers.frame.copy(), teachers.subjects, teachers.slots
+    updated = (delta.get('updated') or {}).get('teachers')
+    if updated is not None and len(updated):
+        updated = updated if isinstance(updated, pd.DataFrame) else pd.DataFrame(list(updated))
+        rows = pd.Index(frame['teacher_id']).get_indexer(updated['teacher_id'])
+        if (rows < 0).any():
+            raise ValueError(f"Unknown teachers: {updated['teacher_id'][rows < 0].tolist()}")
+        subjects, slots = subjects.copy(), slots.copy()
+        for column, masks, vocab in (('subjects', subjects, subject_vocab),
+                                     ('available_time_slots', slots, slot_vocab)):
+            if column in updated:
+                given = updated[column].notna().to_numpy()
+                encoded = vocab.encode(updated[column][given])
+                masks = pad_words(masks, vocab.words)
+                masks[rows[given]] = pad_words(encoded, vocab.words)
+                if column == 'subjects':
+                    subjects = masks
+                else:
+                    slots = masks
+        for column in updated.columns.intersection(frame.columns).drop('teacher_id'):
+            given = updated[column].notna().to_numpy()
+            frame.loc[rows[given], column] = updated[column][given].astype(frame[column].dtype).to_numpy()
+
+    removed = (delta.get('removed') or {}).get('teachers')
+    if removed is not None and len(removed):
+        keep = ~frame['teacher_id'].isin(list(removed)).to_numpy()
+        frame, subjects, slots = frame[keep].reset_index(drop=True), subjects[keep], slots[keep]
+
+    tables = [EncodedTable(frame, subjects, slots)]
+    added = (delta.get('added') or {}).get('teachers')
+    if added is not None and len(added):
+        added = added if isinstance(added, pd.DataFrame) else pd.DataFrame(list(added))
+        if 'max_students_per_slot' not in added:
+            added = added.assign(max_students_per_slot=np.nan)
+        tables.append(encode_frame(added, 'teachers', subject_vocab, slot_vocab))
+    result = EncodedTable.concat(tables)
+    return sort_rows(EncodedTable(result.frame, pad_words(result.subjects, subject_vocab.words),
+                                  pad_words(result.slots, slot_vocab.words)), 'teachers')
+
+
+def _run_scenario(payload: tuple) -> Dict:
+    """Match one scenario from scratch and return its metrics (runs in a worker process)."""
+    from student_teacher_matcher import StudentTeacherMatcher
+
+    students, categories, teachers, subject_vocab, slot_vocab, time_grid, feedback_model, delta, options = payload
+    # Pooled workers get shared memory specs; in-process runs get the arrays themselves
+    shared = not isinstance(students['subjects'], np.ndarray)
+    arrays, blocks = attach(students) if shared else (students, [])
+    try:
+        matcher = StudentTeacherMatcher(time_grid=time_grid, verbose=False)
+        matcher.subject_vocab, matcher.slot_vocab = subject_vocab, slot_vocab
+        matcher.encoded_students = _students_from(arrays, categories)
+        matcher.encoded_teachers = apply_teacher_delta(teachers, delta, subject_vocab, slot_vocab)
+        matcher.students_df = matcher.processed_students = matcher.encoded_students.frame
+        matcher.teachers_df = matcher.processed_teachers = matcher.encoded_teachers.frame
+        matcher.feedback_model = feedback_model
+        matcher.create_matches(**options)
+        metrics = matcher.calculate_metrics()
+        # Drop references to the mapped arrays before their blocks are closed
+        del matcher, arrays
+        return metrics
+    finally:
+        for block in blocks:
+            block.close()
+
+
+def comparison_table(results: Dict[str, Dict]) -> pd.DataFrame:
+    """
+    Metrics of every scenario side by side.
+
+    Args:
+        results: `calculate_metrics` output by scenario name
+
+    Returns:
+        DataFrame: One row per scenario, one column per (nested) metric,
+        e.g. 'teacher_utilization.utilization_rate' or 'lesson_types.Group'
+    """
+    rows = [pd.json_normalize({key: dict(value) if isinstance(value, dict) else value
+                               for key, value in metrics.items()}) if metrics else pd.DataFrame([{}])
+            for metrics in results.values()]
+    table = pd.concat(rows, ignore_index=True)
+    table.index = pd.Index(list(results), name='scenario')
+    counts = [column for column in table.columns
+              if column.startswith(('lesson_types.', 'time_slot_distribution.'))]
+    table[counts] = table[counts].fillna(0).astype(np.int64)
+    return table
+
+
+def run_scenarios(matcher, scenarios: List[Dict], workers: int = None, include_base: bool = True,
+                  **match_options) -> pd.DataFrame:
+    """
+    Evaluate what-if scenarios against a matcher's preprocessed data.
+
+    Args:
+        matcher: Matcher after `preprocess_data` (its state is not changed)
+        scenarios: Teacher deltas (see `apply_teacher_delta`), each with a
+            'name'
+        workers: Worker processes (None = one per CPU, 1 = run in this process)
+        include_base: Also evaluate the unchanged base, as the first row
+        **match_options: Passed to `create_matches` (e.g. strategy='optimal')
+
+    Returns:
+        DataFrame: Comparison table (see `comparison_table`)
+    """
+    if matcher.encoded_students is None or matcher.processed_teachers is None:
+        raise ValueError("Scenarios need preprocessed data; call preprocess_data first")
+    scenarios = ([{'name': BASE_SCENARIO}] if include_base else []) + list(scenarios)
+    names = [scenario.get('name', f'scenario {number}') for number, scenario in enumerate(scenarios)]
+    if len(set(names)) != len(names):
+        raise ValueError("Scenario names must be unique")
+
+    arrays, categories = _share_students(matcher.encoded_students)
+    teachers = matcher.encoded_teachers
+    n_workers = workers or os.cpu_count() or 1
+    common = (categories, teachers, matcher.subject_vocab, matcher.slot_vocab, matcher.time_grid,
+              matcher.feedback_model)
+
+    if n_workers > 1 and len(scenarios) > 1:
+        with SharedArrays(arrays) as shared:
+            payloads = [(shared.spec, *common, scenario, match_options) for scenario in scenarios]
+            with ProcessPoolExecutor(max_workers=min(n_workers, len(scenarios))) as pool:
+                results = list(pool.map(_run_scenario, payloads))
+    else:
+        # Vocabularies are extended by scenarios, so every in-process run gets its own copy
+        results = [_run_scenario((arrays, categories, teachers, copy.deepcopy(matcher.subject_vocab),
+                                  copy.deepcopy(matcher.slot_vocab), matcher.time_grid, matcher.feedback_model,
+                                  scenario, match_options))
+                   for scenario in scenarios]
+    return comparison_table(dict(zip(names, results)))
+
+
+def main():
+    from student_teacher_matcher import StudentTeacherMatcher
+
+    parser = argparse.ArgumentParser(description="Compare what-if teacher scenarios")
+    parser.add_argument('--students', default='students.csv')
+    parser.add_argument('--teachers', default='teachers.csv')
+    parser.add_argument('--scenarios', required=True, help='JSON list of teacher deltas, each with a name')
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--strategy', default='greedy')
+    parser.add_argument('--output', help='Also write the table to this CSV file')
+    args = parser.parse_args()
+
+    with open(args.scenarios) as f:
+        scenarios = json.load(f)
+    matcher = StudentTeacherMatcher()
+    if not matcher.load_data(args.students, args.teachers):
+        return
+    matcher.preprocess_data()
+    table = run_scenarios(matcher, scenarios, workers=args.workers, strategy=args.strategy)
+
+    columns = ['matched_students', 'matching_rate', 'total_lessons', 'teacher_utilization.utilization_rate',
+               'average_compatibility_score', 'subject_coverage.coverage_rate']
+    with pd.option_context('display.width', 200, 'display.max_columns', None):
+        print(table[[column for column in columns if column in table]])
+    if args.output:
+        table.to_csv(args.output)
+        print(f"📁 Scenario comparison exported to {args.output}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,386 @@
+"""
+Long-running HTTP matching service for the Student-Teacher Matching system.
+
+The service loads and matches the input files once, then keeps the matcher
+warm: teachers, the candidate index, capacity and the live schedule stay in
+memory, and every request works on them through `apply_changes` or plain
+array lookups instead of re-running the whole pipeline. It is a small
+HTTP/1.1 server (keep-alive, JSON bodies) on asyncio streams, so it needs
+nothing beyond the standard library. Requests that touch the matcher run one
+at a time in a worker thread, which keeps the event loop free to accept and
+parse other connections. The matcher is quiet while it serves, so
+requests never print; `--verbose` lets it report every request's progress.
+
+Endpoints:
+    GET  /health                                   Counts of students, teachers and matches
+    POST /match      {"students": [rows]}          Enroll and match a batch of new students
+    POST /changes    {"added"|"removed"|"updated"} Any `apply_changes` call; returns the diff
+    GET  /availability?subject=&time_slot=&limit=  Open seats per teacher and time slot
+    GET  /schedule?student_id=&teacher_id=&offset=&limit=
+    GET  /metrics                                  `calculate_metrics` output
+
+Usage:
+    python -m matching_service --students students.csv --teachers teachers.csv [--port 8000]
+"""
+
+import argparse
+import asyncio
+import json
+import numpy as np
+import pandas as pd
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, urlsplit
+
+from student_teacher_matcher import StudentTeacherMatcher
+
+DEFAULT_HOST = '127.0.0.1'
+DEFAULT_PORT = 8000
+
+# Schedule entries returned per page unless the request asks for fewer
+DEFAULT_PAGE_SIZE = 100
+
+# Largest request body accepted, in bytes
+MAX_BODY_BYTES = 64 * 2 ** 20
+
+# Columns every student row sent to /match needs
+STUDENT_COLUMNS = ('student_id', 'name', 'subjects', 'preferred_time_slots')
+
+REASONS = {200: 'OK', 400: 'Bad Request', 404: 'Not Found', 405: 'Method Not Allowed',
+           409: 'Conflict', 413: 'Payload Too Large', 500: 'Internal Server Error'}
+
+
+class ServiceError(Exception):
+    """Request error reported to the client with an HTTP status."""
+
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+
+
+def _error_response(error: Exception) -> Tuple[int, Dict]:
+    """(HTTP status, JSON payload) reporting an exception raised while serving a request."""
+    if isinstance(error, ServiceError):
+        return error.status, {'error': str(error)}
+    if isinstance(error, (ValueError, KeyError, TypeError)):
+        return 400, {'error': f"{type(error).__name__}: {error}"}
+    return 500, {'error': f"{type(error).__name__}: {error}"}
+
+
+def _json_default(value):
+    """JSON value of numpy scalars."""
+    if isinstance(value, np.generic):
+        return value.item()
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
+
+
+def _id_param(value: str, ids: pd.Series):
+    """A query string id converted to the dtype of an id column."""
+    if ids.dtype.kind in 'iu':
+        try:
+            return int(value)
+        except ValueError:
+            raise ServiceError(400, f"Unknown id: {value}")
+    return value
+
+
+def _int_param(query: Dict, name: str, default: int) -> int:
+    try:
+        return int(query.get(name, default))
+    except ValueError:
+        raise ServiceError(400, f"'{name}' must be an integer")
+
+
+class MatchingService:
+    """
+    Warm `StudentTeacherMatcher` behind JSON request handlers.
+
+    Handlers take the parsed query string and JSON body and return a JSON
+    payload; they are not thread-safe and are serialized by `handle`.
+    """
+
+    def __init__(self, matcher: StudentTeacherMatcher, verbose: bool = False):
+        """
+        Args:
+            matcher: Matcher with single-session matches created (a live schedule)
+            verbose: Let the matcher print its progress while serving requests
+        """
+        if matcher.live_schedule is None:
+            raise ValueError("The service needs a live schedule: create single-session matches first")
+        self.matcher = matcher
+        matcher.verbose = verbose
+        self.routes = {
+            ('GET', '/health'): self.health,
+            ('POST', '/match'): self.match,
+            ('POST', '/changes'): self.changes,
+            ('GET', '/availability'): self.availability,
+            ('GET', '/schedule'): self.schedule,
+            ('GET', '/metrics'): self.metrics,
+        }
+        self._lock = asyncio.Lock()
+        self._student_index: Optional[Tuple[pd.DataFrame, pd.Index]] = None
+        # /match bodies waiting for the matcher, with the futures of their responses
+        self._pending: List[Tuple[object, asyncio.Future]] = []
+
+    @classmethod
+    def from_files(cls, students_file: str, teachers_file: str, strategy: str = 'greedy', verbose: bool = False,
+                   **matcher_options):
+        """Load, preprocess and match the input files once, then wrap the warm matcher (see `__init__`)."""
+        matcher = StudentTeacherMatcher(**matcher_options)
+        if not matcher.load_data(students_file, teachers_file):
+            raise ValueError(f"Could not load {students_file} and {teachers_file}")
+        matcher.preprocess_data()
+        matcher.create_matches(strategy)
+        return cls(matcher, verbose)
+
+    def _student_rows(self, student_ids) -> np.ndarray:
+        """Row positions of student ids (-1 when unknown), with the id index kept until the students change."""
+        students = self.matcher.processed_students
+        if self._student_index is None or self._student_index[0] is not students:
+            self._student_index = (students, pd.Index(students['student_id']))
+        return self._student_index[1].get_indexer(pd.Index(student_ids))
+
+    def health(self, query: Dict, body) -> Dict:
+        matcher = self.matcher
+        return {'status': 'ok', 'students': len(matcher.processed_students),
+                'teachers': len(matcher.processed_teachers), 'matches': len(matcher.schedule)}
+
+    def match(self, query: Dict, body) -> Dict:
+        """Enroll `body['students']` and seat them in open seats; everyone else keeps their seat."""
+        status, payload = self.match_batches([body])[0]
+        if status != 200:
+            raise ServiceError(status, payload['error'])
+        return payload
+
+    def _new_students(self, body, claimed: set) -> pd.DataFrame:
+        """The student rows of a /match body, checked against enrolled and `claimed` ids."""
+        students = (body or {}).get('students') if isinstance(body, dict) or body is None else None
+        if not isinstance(students, list) or not students or not all(isinstance(row, dict) for row in students):
+            raise ServiceError(400, "Body must be an object holding a non-empty 'students' list of objects")
+        rows = pd.DataFrame(students)
+        missing = [column for column in STUDENT_COLUMNS if column not in rows]
+        if missing:
+            raise ServiceError(400, f"Students need {', '.join(missing)}")
+        if rows['student_id'].isna().any() or rows['student_id'].duplicated().any():
+            raise ServiceError(400, "Every student needs a unique 'student_id'")
+        enrolled = rows['student_id'][(self._student_rows(rows['student_id']) >= 0)
+                                      | rows['student_id'].isin(claimed)]
+        if len(enrolled):
+            raise ServiceError(409, f"Students already enrolled: {enrolled.tolist()[:10]}")
+        return rows
+
+    def match_batches(self, bodies: List) -> List[Tuple[int, Dict]]:
+        """
+        Serve several /match bodies with a single `apply_changes` call.
+
+        Returns:
+            list: (HTTP status, JSON payload) of every body; a body that fails
+            validation gets its error without affecting the others, and an
+            error while matching is reported to every body of the batch
+        """
+        results: List[Optional[Tuple[int, Dict]]] = [None] * len(bodies)
+        batches, claimed = [], set()
+        for number, body in enumerate(bodies):
+            try:
+                rows = self._new_students(body, claimed)
+            except Exception as error:
+                results[number] = _error_response(error)
+                continue
+            claimed.update(rows['student_id'].tolist())
+            batches.append((number, rows))
+
+        if batches:
+            try:
+                diff = self.matcher.apply_changes(added={'students': pd.concat([rows for _, rows in batches],
+                                                                               ignore_index=True)})
+            except Exception as error:
+                for number, _ in batches:
+                    results[number] = _error_response(error)
+                return results
+            seated = {entry['student_id']: entry for entry in diff['added']}
+            for number, rows in batches:
+                student_ids = rows['student_id'].tolist()
+                results[number] = (200, {'matched': [seated[student] for student in student_ids if student in seated],
+                                         'unmatched': [student for student in student_ids if student not in seated]})
+        return results
+
+    def changes(self, query: Dict, body) -> Dict:
+        """Apply added/removed/updated students and teachers; returns the schedule diff."""
+        body = body or {}
+        if not isinstance(body, dict):
+            raise ServiceError(400, "Body must be an object")
+        unknown = set(body) - {'added', 'removed', 'updated'}
+        if unknown:
+            raise ServiceError(400, f"Unknown change keys: {sorted(unknown)}")
+        return self.matcher.apply_changes(added=body.get('added'), removed=body.get('removed'),
+                                          updated=body.get('updated'))
+
+    def availability(self, query: Dict, body) -> Dict:
+        """Open seats per (teacher, time slot), optionally for one subject and/or time slot."""
+        matcher, live = self.matcher, self.matcher.live_schedule
+        remaining = live.capacity.remaining
+        teachers = np.ones(len(remaining), dtype=bool)
+        slots = np.ones(remaining.shape[1], dtype=bool)
+
+        subject = query.get('subject')
+        if subject is not None:
+            code = matcher.subject_vocab.index.get(subject.strip().title())
+            subjects = live.engine.teacher_subjects
+            if code is None or code // 64 >= subjects.shape[1]:
+                return {'total_open_seats': 0, 'seats': []}
+            teachers &= ((subjects[:, code // 64] >> np.uint64(code % 64)) & np.uint64(1)) == 1
+        time_slot = query.get('time_slot')
+        if time_slot is not None:
+            code = matcher.slot_vocab.index.get(time_slot.strip())
+            slots[:] = False
+            if code is not None and code < len(slots):
+                slots[code] = True
+
+        open_seats = np.where(teachers[:, None] & slots[None, :], remaining, 0)
+        teacher_rows, slot_codes = np.nonzero(open_seats > 0)
+        limit = _int_param(query, 'limit', DEFAULT_PAGE_SIZE)
+        teacher_ids = matcher.processed_teachers['teacher_id'].to_numpy()[teacher_rows[:limit]].tolist()
+        return {
+            'total_open_seats': int(open_seats.sum()),
+            'seats': [{'teacher_id': teacher_id, 'time_slot': live.engine.slots[slot], 'open_seats': seats}
+                      for teacher_id, slot, seats in zip(teacher_ids, slot_codes[:limit].tolist(),
+                                                         open_seats[teacher_rows[:limit], slot_codes[:limit]].tolist())]
+        }
+
+    def schedule(self, query: Dict, body) -> Dict:
+        """Schedule entries of one student, one teacher, or a page of the whole schedule."""
+        matcher, live = self.matcher, self.matcher.live_schedule
+        if 'student_id' in query:
+            rows = self._student_rows([_id_param(query['student_id'], matcher.processed_students['student_id'])])
+            positions = live.entry[rows[rows >= 0]]
+        elif 'teacher_id' in query:
+            teacher_ids = matcher.processed_teachers['teacher_id']
+            teachers = np.flatnonzero(teacher_ids.to_numpy() == _id_param(query['teacher_id'], teacher_ids))
+            positions = live.entry[np.isin(live.teacher, teachers)]
+        else:
+            positions = np.arange(len(matcher.schedule))
+        positions = np.sort(positions[positions >= 0])
+
+        offset = _int_param(query, 'offset', 0)
+        limit = _int_param(query, 'limit', DEFAULT_PAGE_SIZE)
+        return {'total': int(len(positions)),
+                'entries': [matcher.schedule[position] for position in positions[offset:offset + limit].tolist()]}
+
+    def metrics(self, query: Dict, body) -> Dict:
+        return self.matcher.calculate_metrics()
+
+    async def _match(self, body) -> Tuple[int, Dict]:
+        """
+        Queue a /match body; whichever waiting request gets the matcher first
+        serves every queued body in one batch, so concurrent enrollments share
+        one `apply_changes` call.
+        """
+        future = asyncio.get_running_loop().create_future()
+        self._pending.append((body, future))
+        async with self._lock:
+            if not future.done():
+                pending, self._pending = self._pending, []
+                try:
+                    results = await asyncio.get_running_loop().run_in_executor(
+                        None, self.match_batches, [body for body, _ in pending])
+                except Exception as error:
+                    # Every queued request gets an answer, even when the batch itself fails
+                    for _, waiting in pending:
+                        if not waiting.done():
+                            waiting.set_exception(error)
+                except BaseException:
+                    for _, waiting in pending:
+                        waiting.cancel()
+                    raise
+                else:
+                    for (_, waiting), result in zip(pending, results):
+                        if not waiting.done():
+                            waiting.set_result(result)
+        return future.result()
+
+    async def handle(self, method: str, target: str, body: bytes) -> Tuple[int, Dict]:
+        """Route one request; returns (HTTP status, JSON payload)."""
+        url = urlsplit(target)
+        handler = self.routes.get((method, url.path))
+        if handler is None:
+            allowed = [m for m, path in self.routes if path == url.path]
+            return (405, {'error': f"Use {', '.join(allowed)}"}) if allowed else (404, {'error': 'Not found'})
+        try:
+            query = {name: values[-1] for name, values in parse_qs(url.query).items()}
+            payload = json.loads(body) if body else None
+            if handler == self.match:
+                return await self._match(payload)
+            async with self._lock:
+                result = await asyncio.get_running_loop().run_in_executor(None, handler, query, payload)
+            return 200, result
+        except Exception as error:
+            return _error_response(error)
+
+    async def _connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        """Serve HTTP/1.1 requests on one connection until it closes."""
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line.strip():
+                    break
+                method, target, version = request_line.decode('latin-1').split()
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b'\r\n', b'\n', b''):
+                        break
+                    name, _, value = line.decode('latin-1').partition(':')
+                    headers[name.strip().lower()] = value.strip()
+
+                length = int(headers.get('content-length', 0))
+                if length > MAX_BODY_BYTES:
+                    status, payload = 413, {'error': f'Body larger than {MAX_BODY_BYTES} bytes'}
+                    keep_alive = False
+                else:
+                    body = await reader.readexactly(length) if length else b''
+                    status, payload = await self.handle(method.upper(), target, body)
+                    connection = headers.get('connection', '').lower()
+                    keep_alive = connection == 'keep-alive' or (version == 'HTTP/1.1' and connection != 'close')
+
+                data = json.dumps(payload, default=_json_default).encode()
+                writer.write((f'HTTP/1.1 {status} {REASONS.get(status, "")}\r\n'
+                              f'Content-Type: application/json\r\nContent-Length: {len(data)}\r\n'
+                              f'Connection: {"keep-alive" if keep_alive else "close"}\r\n\r\n').encode() + data)
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+    async def serve(self, host: str = DEFAULT_HOST, port: int = DEFAULT_PORT):
+        """Serve until cancelled; port 0 picks a free port (printed at startup)."""
+        server = await asyncio.start_server(self._connection, host, port)
+        host, port = server.sockets[0].getsockname()[:2]
+        print(f"🚀 Matching service listening on http://{host}:{port}", flush=True)
+        async with server:
+            await server.serve_forever()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve student-teacher matching over HTTP")
+    parser.add_argument('--students', default='students.csv', help='Students CSV file')
+    parser.add_argument('--teachers', default='teachers.csv', help='Teachers CSV file')
+    parser.add_argument('--host', default=DEFAULT_HOST)
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT)
+    parser.add_argument('--strategy', choices=['greedy', 'optimal'], default='greedy')
+    parser.add_argument('--time-grid', action='store_true', help='Weekly 30-minute block availability')
+    parser.add_argument('--cache-dir', help='On-disk preprocessing cache')
+    parser.add_argument('--verbose', action='store_true', help="Print the matcher's progress for every request")
+    args = parser.parse_args()
+
+    service = MatchingService.from_files(args.students, args.teachers, args.strategy, args.verbose,
+                                         time_grid=args.time_grid, cache_dir=args.cache_dir)
+    try:
+        asyncio.run(service.serve(args.host, args.port))
+    except KeyboardInterrupt:
+        print("\n👋 Matching service stopped")
+
+
+if __name__ == '__main__':
+    main()
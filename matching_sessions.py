@@ -0,0 +1,94 @@
+"""
+Multi-session assignment for the Student-Teacher Matching system.
+
+Each student can be booked up to `max_sessions` lessons a week, one subject
+per lesson, never two lessons in the same time slot. Sessions are assigned
+in rounds: every round gives each student at most one more lesson, matching
+the subjects it has not covered yet against its free time slots with the
+greedy top-k assignment of `matching_engine`. Students that are done simply
+have empty masks, so a round costs about as much as single-session matching
+and the whole run stays linear in the number of sessions.
+"""
+
+import numpy as np
+from typing import List
+
+from matching_engine import DEFAULT_TOP_K, CapacityTable, CompatibilityEngine, assign_top_k
+from matching_stats import DISABLED, MatchingStats
+from matching_vocabulary import popcount, unpack_bits
+
+
+def _code_masks(codes: np.ndarray, words: int) -> np.ndarray:
+    """Packed masks with the single bit `codes[i]` set in row i."""
+    masks = np.zeros((len(codes), words), dtype=np.uint64)
+    masks[np.arange(len(codes)), codes // 64] = np.left_shift(np.uint64(1), (codes % 64).astype(np.uint64))
+    return masks
+
+
+def assign_sessions(engine: CompatibilityEngine, capacity: CapacityTable, max_sessions: int,
+                    top_k: int = DEFAULT_TOP_K, stats: MatchingStats = DISABLED):
+    """
+    Book up to `max_sessions` single-subject lessons per student.
+
+    A lesson's subject is the one of the student's uncovered subjects taught
+    by its teacher that the fewest teachers offer, keeping commonly taught
+    subjects available for later rounds.
+
+    Args:
+        engine: Engine over the students and teachers to match
+        capacity: Capacity table over the engine's teachers, updated in place
+        max_sessions: Lessons per student at most
+        top_k: Candidates buffered per student and round (see `assign_top_k`)
+        stats: Receives stage times and candidate/assignment counters
+
+    Returns:
+        tuple: (student_idx, teacher_idx, slot_idx, scores, lesson_types,
+        subject_masks) of the booked lessons in round order; scores are the
+        students' overall compatibility with the teacher, subject masks hold
+        the lesson's single subject
+    """
+    n_subjects = len(engine.subject_vocab)
+    words = engine.student_subjects.shape[1]
+    supply = unpack_bits(engine.teacher_subjects, n_subjects).sum(axis=0)
+    covered = np.zeros_like(engine.student_subjects)
+    busy = np.zeros_like(engine.student_slots)
+    booked = np.zeros(len(engine.student_subjects), dtype=np.int64)
+
+    rounds = []
+    for _ in range(max_sessions):
+        if not (capacity.remaining > 0).any():
+            break
+        with stats.stage('session_round'):
+            uncovered = engine.student_subjects & ~covered
+            free = engine.student_slots & ~busy
+            round_engine = CompatibilityEngine(uncovered, free, engine.teacher_subjects, engine.teacher_slots,
+                                               engine.index.teacher_ids, engine.subject_vocab, engine.slot_vocab,
+                                               index=engine.index, score_adjustment=engine.score_adjustment)
+            student_idx, teacher_idx, slot_idx, _, lesson_types = assign_top_k(round_engine, capacity, top_k, stats)
+            if len(student_idx) == 0:
+                break
+
+            # Rarest subject shared with the teacher, lowest code on ties
+            shared = unpack_bits(uncovered[student_idx] & engine.teacher_subjects[teacher_idx], n_subjects)
+            subjects = np.where(shared, supply, np.iinfo(np.int64).max).argmin(axis=1)
+            subject_masks = _code_masks(subjects, words)
+
+            covered[student_idx] |= subject_masks
+            busy[student_idx] |= _code_masks(slot_idx, busy.shape[1])
+            booked[student_idx] += 1
+            rounds.append((student_idx, teacher_idx, slot_idx, lesson_types, subject_masks))
+
+    stats.count('sessions_assigned', int(booked.sum()))
+    if not rounds:
+        empty = np.array([], dtype=np.int64)
+        return empty, empty, empty, np.array([], dtype=float), [], np.zeros((0, words), dtype=np.uint64)
+
+    student_idx, teacher_idx, slot_idx = (np.concatenate(parts) for parts in list(zip(*rounds))[:3])
+    lesson_types: List[str] = [lesson_type for part in rounds for lesson_type in part[3]]
+    subject_masks = np.vstack([part[4] for part in rounds])
+
+    inter = popcount(engine.student_subjects[student_idx] & engine.teacher_subjects[teacher_idx])
+    union = (popcount(engine.student_subjects[student_idx]) + engine.teacher_subject_counts[teacher_idx]
+             - inter)
+    scores = engine.adjust_scores(teacher_idx, slot_idx, inter / union)
+    return student_idx, teacher_idx, slot_idx, scores, lesson_types, subject_masks
@@ -0,0 +1,185 @@
+"""
+Sharded, multi-process matching for the Student-Teacher Matching system.
+
+A student and a teacher can only be matched if they share a (subject, time
+slot) pair, so the bipartite candidate graph falls apart into connected
+components that never compete for the same seats. Each component (optionally
+further split by a region/school column) is solved independently in a
+process pool and the results are merged back into the exact order a single
+pass would have produced.
+"""
+
+import os
+import numpy as np
+import pandas as pd
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Optional, Sequence, Tuple
+
+from matching_engine import CapacityTable, CompatibilityEngine, match_students
+from matching_vocabulary import mask_positions
+
+
+class _UnionFind:
+    """Disjoint sets over integer keys."""
+
+    def __init__(self):
+        self.parent = {}
+
+    def find(self, key: int) -> int:
+        parent = self.parent.setdefault(key, key)
+        if parent != key:
+            parent = self.parent[key] = self.find(parent)
+        return parent
+
+    def union(self, a: int, b: int):
+        root_a, root_b = self.find(a), self.find(b)
+        if root_a != root_b:
+            self.parent[max(root_a, root_b)] = min(root_a, root_b)
+
+
+def component_labels(subject_masks: Sequence[np.ndarray], slot_masks: Sequence[np.ndarray],
+                     n_slots: int) -> List[np.ndarray]:
+    """
+    Label rows by connected component of the (subject, time slot) graph.
+
+    Every row links all of its (subject, slot) keys together; rows of any
+    table whose keys end up linked share a component.
+
+    Args:
+        subject_masks: Packed subject masks, one array per table (e.g. students, teachers)
+        slot_masks: Packed time slot masks aligned with `subject_masks`
+        n_slots: Number of time slot codes
+
+    Returns:
+        list: Component label of every row, one array per table (-1 for rows
+        without any subject or slot)
+    """
+    sets = _UnionFind()
+    profile_keys = []
+    for subjects, slots in zip(subject_masks, slot_masks):
+        profiles, inverse = np.unique(np.hstack([subjects, slots]), axis=0, return_inverse=True)
+        n_words = subjects.shape[1]
+        first_keys = []
+        for profile in profiles:
+            slot_codes = mask_positions(profile[n_words:])
+            keys = [subject * n_slots + slot for subject in mask_positions(profile[:n_words])
+                    for slot in slot_codes]
+            for key in keys[1:]:
+                sets.union(keys[0], key)
+            first_keys.append(keys[0] if keys else None)
+        profile_keys.append((first_keys, inverse.reshape(-1)))
+
+    labels = []
+    for first_keys, inverse in profile_keys:
+        roots = np.array([-1 if key is None else sets.find(key) for key in first_keys], dtype=np.int64)
+        labels.append(roots[inverse] if len(inverse) else np.array([], dtype=np.int64))
+    return labels
+
+
+def plan_shards(student_labels: np.ndarray, teacher_labels: np.ndarray,
+                n_tasks: int) -> List[Tuple[np.ndarray, np.ndarray]]:
+    """
+    Pack shards into at most `n_tasks` balanced tasks (largest first).
+
+    Args:
+        student_labels: Shard label of every student row (-1 = unmatchable)
+        teacher_labels: Shard label of every teacher row (-1 = unmatchable)
+        n_tasks: Maximum number of tasks
+
+    Returns:
+        list: (student rows, teacher rows) of every non-empty task
+    """
+    shards = np.intersect1d(student_labels[student_labels >= 0], teacher_labels[teacher_labels >= 0])
+    if len(shards) == 0:
+        return []
+
+    sizes = (np.bincount(np.searchsorted(shards, student_labels[np.isin(student_labels, shards)]),
+                         minlength=len(shards))
+             + np.bincount(np.searchsorted(shards, teacher_labels[np.isin(teacher_labels, shards)]),
+                           minlength=len(shards)))
+
+    loads = np.zeros(min(n_tasks, len(shards)), dtype=np.int64)
+    task_of_shard = np.empty(len(shards), dtype=np.int64)
+    for shard in np.argsort(-sizes, kind='stable'):
+        task = int(np.argmin(loads))
+        task_of_shard[shard] = task
+        loads[task] += sizes[shard]
+
+    tasks = []
+    for task in range(len(loads)):
+        members = shards[task_of_shard == task]
+        tasks.append((np.nonzero(np.isin(student_labels, members))[0],
+                      np.nonzero(np.isin(teacher_labels, members))[0]))
+    return tasks
+
+
+def _solve_task(payload: tuple):
+    """Match one task's students against its teachers (runs in a worker process)."""
+    (student_subjects, student_slots, teacher_subjects, teacher_slots, teacher_ids,
+     max_students_per_slot, subject_vocab, slot_vocab, strategy, score_adjustment) = payload
+    engine = CompatibilityEngine(student_subjects, student_slots, teacher_subjects, teacher_slots,
+                                 teacher_ids, subject_vocab, slot_vocab, score_adjustment=score_adjustment)
+    capacity = CapacityTable(max_students_per_slot, engine.teacher_slots, len(engine.slots))
+    return match_students(engine, capacity, strategy)
+
+
+def match_sharded(engine: CompatibilityEngine, max_students_per_slot: np.ndarray, strategy: str = 'greedy',
+                  workers: Optional[int] = None, student_groups: Optional[np.ndarray] = None,
+                  teacher_groups: Optional[np.ndarray] = None):
+    """
+    Match independent shards in a process pool and merge them deterministically.
+
+    Args:
+        engine: Engine over all students and teachers
+        max_students_per_slot: Capacity of every teacher row
+        strategy: 'greedy' or 'optimal'
+        workers: Worker processes (None = one per CPU, 1 = run in this process)
+        student_groups, teacher_groups: Optional partition codes (e.g. region);
+            students are only matched with teachers of the same code
+
+    Returns:
+        tuple: (student_idx, teacher_idx, slot_idx, scores, lesson_types) of the
+        accepted matches, in the order a single unsharded pass produces them
+    """
+    student_labels, teacher_labels = component_labels(
+        [engine.student_subjects, engine.teacher_subjects], [engine.student_slots, engine.teacher_slots],
+        len(engine.slots))
+
+    if student_groups is not None:
+        # Split components further by the partition column
+        labels = np.concatenate([student_labels, teacher_labels])
+        group_codes, _ = pd.factorize(pd.Series(np.concatenate([student_groups, teacher_groups])))
+        _, relabeled = np.unique(group_codes * (labels.max() + 2) + labels + 1, return_inverse=True)
+        relabeled = np.where(labels < 0, -1, relabeled.reshape(-1))
+        student_labels, teacher_labels = relabeled[:len(student_labels)], relabeled[len(student_labels):]
+
+    n_workers = workers or os.cpu_count() or 1
+    tasks = plan_shards(student_labels, teacher_labels, max(1, n_workers) * 4)
+    capacity = np.asarray(max_students_per_slot)
+    teacher_ids = np.asarray(engine.index.teacher_ids)
+    adjustment = engine.score_adjustment
+    payloads = [(engine.student_subjects[students], engine.student_slots[students],
+                 engine.teacher_subjects[teachers], engine.teacher_slots[teachers], teacher_ids[teachers],
+                 capacity[teachers], engine.subject_vocab, engine.slot_vocab, strategy,
+                 adjustment[teachers] if adjustment is not None else None)
+                for students, teachers in tasks]
+
+    if n_workers > 1 and len(payloads) > 1:
+        with ProcessPoolExecutor(max_workers=n_workers) as pool:
+            results = list(pool.map(_solve_task, payloads))
+    else:
+        results = [_solve_task(payload) for payload in payloads]
+
+    # Map task-local rows back to global rows
+    parts = [(students[s], teachers[t], slot, score, np.array(lesson_types, dtype=object))
+             for (students, teachers), (s, t, slot, score, lesson_types) in zip(tasks, results)]
+    if not parts:
+        empty = np.array([], dtype=np.int64)
+        return empty, empty, empty, np.array([], dtype=float), []
+
+    student_idx, teacher_idx, slot_idx, scores, lesson_types = (np.concatenate(arrays) for arrays in zip(*parts))
+
+    # Same order as a single pass: score descending, then student, teacher, slot
+    order = np.lexsort((slot_idx, teacher_idx, student_idx, -scores))
+    return (student_idx[order], teacher_idx[order], slot_idx[order], scores[order],
+            lesson_types[order].tolist())
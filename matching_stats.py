@@ -0,0 +1,165 @@
+"""
+Opt-in per-stage instrumentation for the Student-Teacher Matching system.
+
+A `MatchingStats` records wall and CPU time per named stage, counters such as
+candidates generated or students assigned, and optionally a cProfile summary
+and the peak traced memory of every stage. Stages nest (e.g.
+'create_matches.candidates'), and repeated calls of a stage are aggregated.
+When disabled, `stage` hands out one shared no-op context manager and
+`count` returns immediately, so instrumented code pays almost nothing.
+cProfile, pstats and tracemalloc are only imported once a stage is profiled
+or traced.
+"""
+
+import contextlib
+import functools
+import json
+import time
+from collections import defaultdict
+from typing import Dict, List
+
+# Functions listed per profiled stage in `to_dict`
+PROFILE_TOP = 20
+
+_NO_STAGE = contextlib.nullcontext()
+
+
+class MatchingStats:
+    """Stage timers, counters and optional profiles, exportable as JSON."""
+
+    def __init__(self, enabled: bool = False, profile: bool = False, trace_memory: bool = False):
+        """
+        Args:
+            enabled: Record anything at all
+            profile: Run cProfile over every top-level stage
+            trace_memory: Record each stage's peak memory with tracemalloc
+        """
+        self.enabled = enabled
+        self.profile = enabled and profile
+        self.trace_memory = enabled and trace_memory
+        self.reset()
+
+    def reset(self):
+        """Drop everything recorded so far."""
+        self.stages: Dict[str, Dict[str, float]] = {}
+        self.counters: Dict[str, int] = defaultdict(int)
+        self._profiles: Dict[str, 'pstats.Stats'] = {}
+        self._stack: List[dict] = []
+
+    def count(self, name: str, value: int = 1):
+        """Add `value` to a counter."""
+        if self.enabled:
+            self.counters[name] += int(value)
+
+    def stage(self, name: str):
+        """Context manager timing one stage, nested under the stage currently open."""
+        if not self.enabled:
+            return _NO_STAGE
+        return self._stage(name)
+
+    @contextlib.contextmanager
+    def _stage(self, name: str):
+        path = '.'.join([frame['name'] for frame in self._stack] + [name])
+        frame = {'name': name, 'peak': 0}
+        outermost = not self._stack
+        self._stack.append(frame)
+
+        profiler = None
+        if self.profile and outermost:
+            import cProfile
+            profiler = cProfile.Profile()
+        if self.trace_memory:
+            import tracemalloc
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+                frame['owns_tracing'] = True
+            frame['start_memory'], outer_peak = tracemalloc.get_traced_memory()
+            if len(self._stack) > 1:
+                parent = self._stack[-2]
+                parent['peak'] = max(parent['peak'], outer_peak)
+            if hasattr(tracemalloc, 'reset_peak'):  # Python 3.9+; otherwise peaks span earlier stages
+                tracemalloc.reset_peak()
+
+        wall, cpu = time.perf_counter(), time.process_time()
+        if profiler:
+            profiler.enable()
+        try:
+            yield
+        finally:
+            if profiler:
+                profiler.disable()
+            wall, cpu = time.perf_counter() - wall, time.process_time() - cpu
+            self._stack.pop()
+
+            record = self.stages.setdefault(path, {'calls': 0, 'wall_seconds': 0.0, 'cpu_seconds': 0.0})
+            record['calls'] += 1
+            record['wall_seconds'] += wall
+            record['cpu_seconds'] += cpu
+
+            if self.trace_memory:
+                peak = max(frame['peak'], tracemalloc.get_traced_memory()[1])
+                record['peak_bytes'] = max(record.get('peak_bytes', 0), peak - frame['start_memory'])
+                if self._stack:
+                    self._stack[-1]['peak'] = max(self._stack[-1]['peak'], peak)
+                if frame.get('owns_tracing'):
+                    tracemalloc.stop()
+
+            if profiler:
+                if path in self._profiles:
+                    self._profiles[path].add(profiler)
+                else:
+                    import pstats
+                    self._profiles[path] = pstats.Stats(profiler)
+
+    def profile_summary(self, path: str, top: int = PROFILE_TOP) -> List[Dict]:
+        """Most expensive functions (by cumulative time) of a profiled stage."""
+        stats = self._profiles[path].stats
+        rows = sorted(stats.items(), key=lambda item: item[1][3], reverse=True)[:top]
+        return [
+            {'function': f'{filename}:{line}({function})', 'calls': calls, 'total_seconds': round(total, 6),
+             'cumulative_seconds': round(cumulative, 6)}
+            for (filename, line, function), (_, calls, total, cumulative, _) in rows
+        ]
+
+    def dump_profile(self, path: str, filename: str):
+        """Write a profiled stage's raw cProfile data for `pstats`/snakeviz."""
+        self._profiles[path].dump_stats(filename)
+
+    def to_dict(self) -> Dict:
+        """Stages, counters and profile summaries as plain data."""
+        result = {'stages': {path: dict(record) for path, record in self.stages.items()},
+                  'counters': dict(self.counters)}
+        if self._profiles:
+            result['profiles'] = {path: self.profile_summary(path) for path in self._profiles}
+        return result
+
+    def to_json(self, filename: str = None) -> str:
+        """
+        Serialize `to_dict` as JSON.
+
+        Args:
+            filename: Optional file to write the JSON to
+
+        Returns:
+            str: The JSON document
+        """
+        document = json.dumps(self.to_dict(), indent=2)
+        if filename:
+            with open(filename, 'w') as f:
+                f.write(document)
+        return document
+
+
+# Shared disabled instance for code paths that are not instrumented
+DISABLED = MatchingStats()
+
+
+def instrumented(name: str):
+    """Decorator timing a method as stage `name` of its object's `stats`."""
+    def decorate(method):
+        @functools.wraps(method)
+        def wrapper(self, *args, **kwargs):
+            with self.stats.stage(name):
+                return method(self, *args, **kwargs)
+        return wrapper
+    return decorate
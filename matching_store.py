@@ -0,0 +1,253 @@
+"""
+SQLite store for the Student-Teacher Matching system.
+
+Students, teachers and the schedule are kept in one SQLite database so that
+several tools can share them without re-parsing CSV exports. Students and
+teachers are stored in the CSV schemas, so `students()` / `teachers()` can
+stand in for `pd.read_csv`; CSVs are bulk-loaded in chunks with
+`executemany`. Schedules are written in a single transaction, and the
+schedule table is indexed on student_id and on (teacher_id, time_slot), so
+lookups such as "who is in Mr. Obi's Morning group" are index seeks instead
+of scans. The database uses write-ahead logging so readers are not blocked
+while a schedule is written.
+
+Usage:
+    python -m matching_store import --db schedule.db --students students.csv --teachers teachers.csv
+    python -m matching_store group --db schedule.db --teacher-id 1 --time-slot Morning
+    python -m matching_store student --db schedule.db --student-id 3
+"""
+
+import argparse
+import sqlite3
+import pandas as pd
+from typing import Dict, Iterable, List, Tuple
+
+from matching_ingest import DEFAULT_CHUNKSIZE, STUDENT_DTYPES, TEACHER_DTYPES, integer_ids
+
+SCHEDULE_COLUMNS = ['student_id', 'teacher_id', 'time_slot', 'lesson_type', 'subjects', 'compatibility_score']
+
+# Per kind: (table, columns in CSV order, id column)
+TABLES = {
+    'students': ('students', list(STUDENT_DTYPES), 'student_id'),
+    'teachers': ('teachers', list(TEACHER_DTYPES), 'teacher_id'),
+}
+
+# Id columns are declared without a type so ids keep whatever type the input has
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS students (
+    student_id NOT NULL PRIMARY KEY, name TEXT, grade INTEGER, subjects TEXT, preferred_time_slots TEXT);
+CREATE TABLE IF NOT EXISTS teachers (
+    teacher_id NOT NULL PRIMARY KEY, name TEXT, subjects TEXT, available_time_slots TEXT,
+    max_students_per_slot REAL);
+CREATE TABLE IF NOT EXISTS schedule (
+    student_id NOT NULL, teacher_id NOT NULL, time_slot TEXT NOT NULL, lesson_type TEXT, subjects TEXT,
+    compatibility_score REAL);
+CREATE INDEX IF NOT EXISTS schedule_student ON schedule (student_id);
+CREATE INDEX IF NOT EXISTS schedule_teacher_slot ON schedule (teacher_id, time_slot);
+"""
+
+
+def _rows(frame: pd.DataFrame, columns: List[str]) -> Iterable[Tuple]:
+    """Rows of `columns` as tuples of Python values, None for missing values and columns."""
+    frame = frame.reindex(columns=columns).astype(object)
+    return frame.where(frame.notna(), None).itertuples(index=False, name=None)
+
+
+class MatchingStore:
+    """SQLite database of students, teachers and the current schedule."""
+
+    def __init__(self, path: str):
+        """
+        Open (and if needed create) the database.
+
+        Args:
+            path: Database file, or ':memory:'
+        """
+        self.path = path
+        self.connection = sqlite3.connect(path, check_same_thread=False)
+        self.connection.execute('PRAGMA journal_mode=WAL')
+        self.connection.execute('PRAGMA synchronous=NORMAL')
+        self.connection.executescript(SCHEMA)
+
+    def close(self):
+        self.connection.close()
+
+    def _insert(self, table: str, columns: List[str], rows: Iterable[Tuple], replace: bool = False):
+        verb = 'INSERT OR REPLACE' if replace else 'INSERT'
+        self.connection.executemany(
+            f"{verb} INTO {table} ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))})", rows)
+
+    def _upsert(self, kind: str, rows) -> int:
+        table, columns, _ = TABLES[kind]
+        frame = rows if isinstance(rows, pd.DataFrame) else pd.DataFrame(list(rows))
+        self._insert(table, columns, _rows(frame, columns), replace=True)
+        return len(frame)
+
+    def _delete(self, kind: str, ids: Iterable) -> int:
+        table, _, id_column = TABLES[kind]
+        ids = [(value.item() if hasattr(value, 'item') else value,) for value in ids]
+        self.connection.executemany(f"DELETE FROM schedule WHERE {id_column} = ?", ids)
+        self.connection.executemany(f"DELETE FROM {table} WHERE {id_column} = ?", ids)
+        return len(ids)
+
+    def _apply_diff(self, diff: Dict[str, List]):
+        removed = diff.get('removed', []) + [change['before'] for change in diff.get('changed', [])]
+        added = diff.get('added', []) + [change['after'] for change in diff.get('changed', [])]
+        self.connection.executemany(
+            "DELETE FROM schedule WHERE student_id = ? AND teacher_id = ? AND time_slot = ?",
+            ((match['student_id'], match['teacher_id'], match['time_slot']) for match in removed))
+        self._insert('schedule', SCHEDULE_COLUMNS,
+                     (tuple(match[column] for column in SCHEDULE_COLUMNS) for match in added))
+
+    def upsert(self, kind: str, rows) -> int:
+        """
+        Insert or replace students or teachers, in one transaction.
+
+        Args:
+            kind: 'students' or 'teachers'
+            rows: Rows in the CSV schema (DataFrame or list of dicts); other
+                columns are ignored
+
+        Returns:
+            int: Rows written
+        """
+        with self.connection:
+            return self._upsert(kind, rows)
+
+    def delete(self, kind: str, ids: Iterable) -> int:
+        """Delete students or teachers by id, together with their schedule entries."""
+        with self.connection:
+            return self._delete(kind, ids)
+
+    def load_csv(self, kind: str, path: str, chunksize: int = DEFAULT_CHUNKSIZE) -> int:
+        """
+        Bulk-load a students or teachers CSV, replacing rows with the same id.
+
+        The file is read in chunks with the ingest dtypes and every chunk is
+        written with one `executemany`, all in a single transaction.
+
+        Returns:
+            int: Rows loaded
+        """
+        table, columns, id_column = TABLES[kind]
+        dtypes = STUDENT_DTYPES if kind == 'students' else TEACHER_DTYPES
+        loaded = 0
+        with self.connection:
+            for chunk in pd.read_csv(path, usecols=lambda column: column in dtypes, dtype=dtypes,
+                                     chunksize=chunksize):
+                chunk[id_column] = integer_ids(chunk[id_column])
+                self._insert(table, columns, _rows(chunk, columns), replace=True)
+                loaded += len(chunk)
+        return loaded
+
+    def _frame(self, kind: str) -> pd.DataFrame:
+        table, columns, _ = TABLES[kind]
+        return pd.read_sql_query(f"SELECT {', '.join(columns)} FROM {table} ORDER BY rowid", self.connection)
+
+    def students(self) -> pd.DataFrame:
+        """All students in the students CSV schema."""
+        return self._frame('students')
+
+    def teachers(self) -> pd.DataFrame:
+        """All teachers in the teachers CSV schema."""
+        return self._frame('teachers')
+
+    def save_schedule(self, schedule: List[Dict]) -> int:
+        """Replace the stored schedule with `schedule` in one transaction; returns rows written."""
+        with self.connection:
+            self.connection.execute("DELETE FROM schedule")
+            self._insert('schedule', SCHEDULE_COLUMNS,
+                         (tuple(match[column] for column in SCHEDULE_COLUMNS) for match in schedule))
+        return len(schedule)
+
+    def apply_changes(self, diff: Dict[str, List], added: Dict = None, removed: Dict = None,
+                      updated: Dict = None):
+        """
+        Mirror an `apply_changes` call in one transaction.
+
+        Args:
+            diff: Schedule diff it returned
+            added, removed, updated: Its arguments ({'students': ..., 'teachers': ...})
+        """
+        with self.connection:
+            for kind in ('students', 'teachers'):
+                if (removed or {}).get(kind) is not None:
+                    self._delete(kind, removed[kind])
+                for rows in ((updated or {}).get(kind), (added or {}).get(kind)):
+                    if rows is not None and len(rows):
+                        self._upsert(kind, rows)
+            self._apply_diff(diff)
+
+    def _matches(self, where: str = '', parameters: Tuple = ()) -> List[Dict]:
+        cursor = self.connection.execute(
+            f"SELECT {', '.join(SCHEDULE_COLUMNS)} FROM schedule {where} ORDER BY rowid", parameters)
+        return [dict(zip(SCHEDULE_COLUMNS, row)) for row in cursor]
+
+    def schedule(self) -> List[Dict]:
+        """The stored schedule as match dictionaries, in the order it was written."""
+        return self._matches()
+
+    def student_schedule(self, student_id) -> List[Dict]:
+        """Schedule entries of one student."""
+        return self._matches("WHERE student_id = ?", (student_id,))
+
+    def teacher_schedule(self, teacher_id, time_slot: str = None) -> List[Dict]:
+        """Schedule entries of one teacher, optionally in one time slot."""
+        if time_slot is None:
+            return self._matches("WHERE teacher_id = ?", (teacher_id,))
+        return self._matches("WHERE teacher_id = ? AND time_slot = ?", (teacher_id, time_slot))
+
+    def group(self, teacher_id, time_slot: str) -> List[Dict]:
+        """
+        Students in a teacher's group in one time slot, e.g. Mr. Obi's Morning group.
+
+        Returns:
+            list: {'student_id', 'name', 'grade', 'subjects', 'compatibility_score'}
+            of every student in the group
+        """
+        cursor = self.connection.execute(
+            "SELECT s.student_id, st.name, st.grade, s.subjects, s.compatibility_score "
+            "FROM schedule s LEFT JOIN students st ON st.student_id = s.student_id "
+            "WHERE s.teacher_id = ? AND s.time_slot = ? ORDER BY s.rowid", (teacher_id, time_slot))
+        columns = ['student_id', 'name', 'grade', 'subjects', 'compatibility_score']
+        return [dict(zip(columns, row)) for row in cursor]
+
+
+def _print_rows(rows: List[Dict]):
+    if not rows:
+        print("(no rows)")
+    for row in rows:
+        print(', '.join(f"{key}={value}" for key, value in row.items()))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load and query the SQLite matching store")
+    commands = parser.add_subparsers(dest='command', required=True)
+    load = commands.add_parser('import', help='Bulk-load students and teachers CSVs')
+    load.add_argument('--students')
+    load.add_argument('--teachers')
+    group = commands.add_parser('group', help="Students in a teacher's time slot")
+    group.add_argument('--teacher-id', type=int, required=True)
+    group.add_argument('--time-slot', required=True)
+    student = commands.add_parser('student', help="A student's schedule entries")
+    student.add_argument('--student-id', type=int, required=True)
+    for command in (load, group, student):
+        command.add_argument('--db', default='schedule.db', help='Database file')
+    args = parser.parse_args()
+
+    store = MatchingStore(args.db)
+    try:
+        if args.command == 'import':
+            for kind in ('students', 'teachers'):
+                if getattr(args, kind):
+                    print(f"✅ Loaded {store.load_csv(kind, getattr(args, kind))} {kind} into {args.db}")
+        elif args.command == 'group':
+            _print_rows(store.group(args.teacher_id, args.time_slot))
+        else:
+            _print_rows(store.student_schedule(args.student_id))
+    finally:
+        store.close()
+
+
+if __name__ == '__main__':
+    main()
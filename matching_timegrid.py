@@ -0,0 +1,101 @@
+"""
+Weekly time grid availability for the Student-Teacher Matching system.
+
+Instead of the three coarse slots, a week is split into day-of-week x
+30-minute blocks ('Mon 09:00' ... 'Sun 23:30'), one time slot code per
+block. Availability cells list intervals such as 'Mon 09:00-12:00' or
+'Mon-Fri 16:00-18:30' (comma- or semicolon-separated); each interval is
+turned into a packed bitmask with two prefix-table lookups, so encoding,
+overlap checks and capacity all stay vectorized bitmask operations. The
+legacy 'Morning', 'Afternoon' and 'Evening' labels are still accepted and
+stand for their hours on every day.
+
+Every block is a lesson slot of its own: a match is a 30-minute lesson in
+one block, and `max_students_per_slot` caps the students per block, not per
+availability interval. A teacher with capacity 2 who is available
+'Mon 09:00-11:00' therefore offers four lessons and can take up to 8
+students. A legacy label stands for many blocks (Morning is 8 blocks on 7
+days), so the same teacher offers far more seats on the grid than with the
+three coarse slots.
+"""
+
+import numpy as np
+import pandas as pd
+
+from matching_vocabulary import Vocabulary, mask_words
+
+DAYS = ['Mon', 'Tue', 'Wed', 'Thu', 'Fri', 'Sat', 'Sun']
+BLOCK_MINUTES = 30
+BLOCKS_PER_DAY = 24 * 60 // BLOCK_MINUTES
+
+# Slot tokens in code order: day-major, then time of day
+GRID_SLOTS = [f'{day} {block * BLOCK_MINUTES // 60:02d}:{block * BLOCK_MINUTES % 60:02d}'
+              for day in DAYS for block in range(BLOCKS_PER_DAY)]
+
+# Hours the legacy slot labels stand for on the grid
+LEGACY_HOURS = {
+    'Morning': '08:00-12:00',
+    'Afternoon': '12:00-17:00',
+    'Evening': '17:00-21:00',
+}
+
+_DAY_CODES = {day: code for code, day in enumerate(DAYS)}
+_DAY = '|'.join(DAYS)
+_INTERVAL = (rf'^(?P<first>{_DAY})(?:\s*-\s*(?P<last>{_DAY}))?\s+'
+             r'(?P<start>\d{1,2}):(?P<start_minute>\d{2})(?:\s*-\s*(?P<end>\d{1,2}):(?P<end_minute>\d{2}))?$')
+
+
+def _prefix_masks(n_codes: int) -> np.ndarray:
+    """Row b holds the packed mask of codes [0, b), for b = 0..n_codes."""
+    bits = np.arange(n_codes + 1)[:, None] > np.arange(mask_words(n_codes) * 64)[None, :]
+    return np.packbits(bits, axis=1, bitorder='little').view('<u8').astype(np.uint64)
+
+
+class TimeGridVocabulary(Vocabulary):
+    """
+    Fixed vocabulary of weekly 30-minute blocks that encodes availability intervals.
+
+    Codes are `day * BLOCKS_PER_DAY + block`, so they never change and masks
+    from different files line up without interning anything.
+    """
+
+    # A CandidateIndex key covers one day of blocks
+    codes_per_bucket = BLOCKS_PER_DAY
+
+    def __init__(self):
+        super().__init__(initial=GRID_SLOTS, allowed=GRID_SLOTS)
+        self._prefix = _prefix_masks(len(GRID_SLOTS))
+
+    def encode(self, values: pd.Series) -> np.ndarray:
+        """Encode a column of availability strings; intervals may also be separated by ';'."""
+        return super().encode(values.astype('string').str.replace(';', ',', regex=False))
+
+    def _pack(self, n_rows: int, rows: np.ndarray, tokens: np.ndarray) -> np.ndarray:
+        """Set the blocks of every interval token in the row it belongs to."""
+        tokens = pd.Series(tokens, dtype=object).replace(
+            {label: f'{DAYS[0]}-{DAYS[-1]} {hours}' for label, hours in LEGACY_HOURS.items()})
+        parts = tokens.str.extract(_INTERVAL)
+        keep = parts['first'].notna().to_numpy()
+        rows, parts = rows[keep], parts[keep]
+
+        first = parts['first'].map(_DAY_CODES).to_numpy(dtype=np.int64)
+        last = parts['last'].map(_DAY_CODES).fillna(parts['first'].map(_DAY_CODES)).to_numpy(dtype=np.int64)
+        start = (parts['start'].astype(int) * 60 + parts['start_minute'].astype(int)).to_numpy() // BLOCK_MINUTES
+        # A bare 'Mon 09:00' is one block; interval ends round up to the next block
+        end_minutes = (parts['end'].astype(float) * 60 + parts['end_minute'].astype(float)).to_numpy()
+        end = np.where(np.isnan(end_minutes), start + 1, np.ceil(end_minutes / BLOCK_MINUTES)).astype(np.int64)
+        start, end = np.minimum(start, BLOCKS_PER_DAY), np.minimum(end, BLOCKS_PER_DAY)
+
+        # One interval per covered day; day ranges may wrap around the week ('Sat-Mon')
+        n_days = (last - first) % len(DAYS) + 1
+        day_offset = np.arange(n_days.sum()) - np.repeat(np.cumsum(n_days) - n_days, n_days)
+        days = (np.repeat(first, n_days) + day_offset) % len(DAYS)
+        rows, start, end = np.repeat(rows, n_days), np.repeat(start, n_days), np.repeat(end, n_days)
+        valid = start < end
+        lower = days[valid] * BLOCKS_PER_DAY + start[valid]
+        upper = days[valid] * BLOCKS_PER_DAY + end[valid]
+
+        masks = np.zeros((n_rows, self.words), dtype=np.uint64)
+        np.bitwise_or.at(masks, rows[valid], self._prefix[upper] & ~self._prefix[lower])
+        return masks
+
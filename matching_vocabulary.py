@@ -0,0 +1,192 @@
+"""
+Interned subject and time slot vocabularies for the Student-Teacher Matching system.
+
+Every distinct subject or time slot is interned once to a small integer code.
+Rows of tokens are stored as packed uint64 bitmasks with one bit per code, so
+intersections and unions are bitwise operations, and strings are only
+produced again when results are displayed or exported.
+"""
+
+import numpy as np
+import pandas as pd
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+# Canonical order of the time slots kept by preprocessing
+TIME_SLOTS = ['Morning', 'Afternoon', 'Evening']
+
+_BYTE_POPCOUNT = np.array([bin(i).count('1') for i in range(256)], dtype=np.uint8)
+
+
+def mask_words(n_tokens: int) -> int:
+    """Number of uint64 words needed to hold `n_tokens` bits."""
+    return max(1, (n_tokens + 63) // 64)
+
+
+def pad_words(masks: np.ndarray, words: int) -> np.ndarray:
+    """Widen packed bitmasks to `words` uint64 words."""
+    if masks.shape[1] >= words:
+        return masks
+    return np.hstack([masks, np.zeros((len(masks), words - masks.shape[1]), dtype=np.uint64)])
+
+
+def popcount(masks: np.ndarray) -> np.ndarray:
+    """Count set bits over the last (word) axis of a uint64 mask array."""
+    masks = np.ascontiguousarray(masks, dtype=np.uint64)
+    as_bytes = masks.view(np.uint8).reshape(masks.shape[:-1] + (masks.shape[-1] * 8,))
+    return _BYTE_POPCOUNT[as_bytes].sum(axis=-1, dtype=np.int64)
+
+
+def unpack_bits(masks: np.ndarray, n_codes: int) -> np.ndarray:
+    """Boolean array with one trailing column per code of packed uint64 bitmasks."""
+    as_bytes = np.ascontiguousarray(masks, dtype='<u8').view(np.uint8)
+    return np.unpackbits(as_bytes, axis=-1, bitorder='little')[..., :n_codes].astype(bool)
+
+
+def pack_bits(bits: np.ndarray, words: int) -> np.ndarray:
+    """Packed uint64 bitmasks of `words` words from a boolean array with one trailing column per code."""
+    packed = np.packbits(bits, axis=-1, bitorder='little')
+    as_bytes = np.zeros(bits.shape[:-1] + (words * 8,), dtype=np.uint8)
+    as_bytes[..., :packed.shape[-1]] = packed
+    return as_bytes.view('<u8').astype(np.uint64)
+
+
+def mask_positions(mask: np.ndarray) -> List[int]:
+    """Bit positions set in a single packed bitmask row."""
+    return np.flatnonzero(unpack_bits(mask, mask.shape[-1] * 64)).tolist()
+
+
+def split_tokens(values: pd.Series) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Split comma-separated cells into standardized (stripped, title-cased) tokens.
+
+    Args:
+        values: Column of comma-separated strings
+
+    Returns:
+        tuple: (row position of every token, token strings)
+    """
+    exploded = values.reset_index(drop=True).astype('string').str.split(',').explode()
+    exploded = exploded.dropna().str.strip().str.title()
+    exploded = exploded[exploded != '']
+    return exploded.index.to_numpy(dtype=np.int64), exploded.to_numpy(dtype=object)
+
+
+class Vocabulary:
+    """
+    Interned tokens with integer codes and packed bitmask rows.
+
+    New tokens get the next code in first-seen order, unless `allowed` is
+    given, in which case every other token is dropped. Codes never change
+    once assigned, so masks encoded earlier stay valid as the vocabulary
+    grows; they only need widening with `pad_words`.
+    """
+
+    # Consecutive codes sharing one CandidateIndex key (see TimeGridVocabulary)
+    codes_per_bucket = 1
+
+    def __init__(self, initial: Sequence[str] = (), allowed: Optional[Sequence[str]] = None):
+        """
+        Args:
+            initial: Tokens that receive the first codes
+            allowed: If given, the only tokens that are interned
+        """
+        self.index: Dict[str, int] = {}
+        self.allowed = set(allowed) if allowed is not None else None
+        self._decoded: Dict[bytes, Tuple[str, ...]] = {}
+        for token in initial:
+            self.intern(token)
+
+    def __len__(self) -> int:
+        return len(self.index)
+
+    def __contains__(self, token: str) -> bool:
+        return token in self.index
+
+    @property
+    def tokens(self) -> List[str]:
+        """Tokens in code order."""
+        return list(self.index)
+
+    @property
+    def words(self) -> int:
+        """uint64 words per packed mask row."""
+        return mask_words(len(self.index))
+
+    def intern(self, token: str) -> Optional[int]:
+        """Code of `token`, assigning a new one if needed (None if not allowed)."""
+        code = self.index.get(token)
+        if code is None and (self.allowed is None or token in self.allowed):
+            code = self.index[token] = len(self.index)
+        return code
+
+    def encode(self, values: pd.Series) -> np.ndarray:
+        """
+        Encode a column of comma-separated strings as packed bitmasks.
+
+        Args:
+            values: Column of comma-separated strings
+
+        Returns:
+            np.ndarray: uint64 array of shape (rows, words)
+        """
+        rows, tokens = split_tokens(values)
+        return self._pack(len(values), rows, tokens)
+
+    def encode_lists(self, token_lists: Iterable[Sequence[str]]) -> np.ndarray:
+        """Encode already split token lists as packed bitmasks."""
+        token_lists = list(token_lists)
+        rows = np.repeat(np.arange(len(token_lists)), [len(tokens) for tokens in token_lists])
+        tokens = np.array([token for tokens in token_lists for token in tokens], dtype=object)
+        return self._pack(len(token_lists), rows, tokens)
+
+    def _pack(self, n_rows: int, rows: np.ndarray, tokens: np.ndarray) -> np.ndarray:
+        """Intern `tokens` and set their bits in the rows they belong to."""
+        for token in pd.unique(tokens):
+            self.intern(token)
+
+        codes = pd.Series(tokens, dtype=object).map(self.index)
+        keep = codes.notna().to_numpy()
+        rows, codes = rows[keep], codes[keep].to_numpy(dtype=np.int64)
+
+        masks = np.zeros((n_rows, self.words), dtype=np.uint64)
+        bits = np.left_shift(np.uint64(1), (codes % 64).astype(np.uint64))
+        np.bitwise_or.at(masks, (rows, codes // 64), bits)
+        return masks
+
+    def decode(self, mask: np.ndarray) -> List[str]:
+        """Tokens set in a single packed bitmask row, in code order."""
+        key = np.ascontiguousarray(mask, dtype=np.uint64).tobytes()
+        tokens = self._decoded.get(key)
+        if tokens is None:
+            tokens = self._decoded[key] = tuple(self.tokens[code] for code in mask_positions(mask)
+                                                if code < len(self.index))
+        return list(tokens)
+
+    def format(self, mask: np.ndarray, separator: str = ', ') -> str:
+        """Decode a packed bitmask row into a display string such as 'Math, English'."""
+        return separator.join(self.decode(mask))
+
+
+def sorted_vocabulary(vocab: Vocabulary, *masks: np.ndarray) -> Tuple[Vocabulary, List[np.ndarray]]:
+    """
+    Recode a vocabulary so that codes follow sorted token order.
+
+    First-seen codes depend on the order of the input rows; sorted codes
+    make everything decided by code order (display order, lowest-code tie
+    breaks) the same for any order of equivalent rows. Only vocabularies
+    without a fixed token set are recoded.
+
+    Args:
+        vocab: Vocabulary the masks were encoded with
+        *masks: Packed bitmask arrays to recode
+
+    Returns:
+        tuple: (vocabulary with sorted codes, recoded masks)
+    """
+    tokens = vocab.tokens
+    order = sorted(range(len(tokens)), key=tokens.__getitem__)
+    if vocab.allowed is not None or type(vocab) is not Vocabulary or order == list(range(len(tokens))):
+        return vocab, list(masks)
+    recoded = Vocabulary(initial=[tokens[code] for code in order])
+    return recoded, [pack_bits(unpack_bits(pad_words(array, vocab.words), len(tokens))[:, order], recoded.words)
+                     for array in masks]
@@ -9,15 +9,27 @@ Author: AI Assistant
 Date: September 2025
 """
 
+import os
 import pandas as pd
 import numpy as np
-import json
 from datetime import datetime
-from collections import defaultdict, Counter
-import matplotlib.pyplot as plt
-import seaborn as sns
+from collections import defaultdict
 from typing import List, Dict, Tuple, Set
 import warnings
+from matching_export import (DEFAULT_BATCH_SIZE, EXPORT_FORMATS, schedule_batches, write_arrow, write_csv,
+                             write_json, write_ndjson, write_parquet)
+from matching_engine import CandidateIndex, CapacityTable, CompatibilityEngine, match_students
+from matching_feedback import FeedbackModel
+from matching_fingerprint import fingerprints
+from matching_groups import pack_groups
+from matching_incremental import LiveSchedule
+from matching_metrics import ScheduleMetrics, group_means, total_subjects
+from matching_sessions import assign_sessions
+from matching_stats import MatchingStats, instrumented
+from matching_timegrid import TimeGridVocabulary
+from matching_ingest import (DEFAULT_CHUNKSIZE, EncodedTable, canonical_tables, encode_frame, infer_ids,
+                             iter_encoded_chunks, read_encoded, sort_rows)
+from matching_vocabulary import TIME_SLOTS, Vocabulary, pad_words
 warnings.filterwarnings('ignore')
 
 class StudentTeacherMatcher:
@@ -28,36 +40,210 @@ class StudentTeacherMatcher:
     schedule generation, and performance evaluation.
     """
     
-    def __init__(self):
-        """Initialize the matcher with empty data structures."""
+    def __init__(self, cache_dir: str = None, cache_max_bytes: int = None,
+                 instrument: bool = False, profile: bool = False, trace_memory: bool = False,
+                 time_grid: bool = False, store: str = None, feedback_log: str = None,
+                 seed=None, verbose: bool = True):
+        """
+        Initialize the matcher with empty data structures.
+        
+        Args:
+            cache_dir: Optional directory for an on-disk cache of preprocessed
+                data and candidates, keyed by the input file contents
+            cache_max_bytes: Byte budget of the cache directory (LRU eviction);
+                None for the cache's default of 1 GiB
+            instrument: Record per-stage wall/CPU times and counters in `stats`
+            profile: With `instrument`, also run cProfile over every stage
+            trace_memory: With `instrument`, also record per-stage peak memory (tracemalloc)
+            time_grid: Read availability as weekly 30-minute blocks from
+                intervals such as 'Mon 09:00-12:00' instead of the three
+                Morning/Afternoon/Evening slots (which then stand for their
+                hours on every day); every block is a lesson slot, so
+                max_students_per_slot caps students per 30-minute block
+            store: Optional SQLite database file; students and teachers can
+                then be read with `load_store`, and every schedule created or
+                changed is written to it in one transaction
+            feedback_log: Optional directory of an append-only feedback log;
+                every batch `learn_feedback` folds in is appended to it, and
+                trends and feedback-aware scoring use its running aggregates
+                over all ratings ever logged
+            seed: Seed or `np.random.Generator` of the matcher's random
+                draws (simulated feedback); None draws fresh entropy
+            verbose: Print progress and error messages of the pipeline steps;
+                reports such as `print_metrics_report` always print
+        """
         self.students_df = None
         self.teachers_df = None
         self.processed_students = None
         self.processed_teachers = None
+        # Bumped on every schedule change; `metrics` were taken at `metrics_version`
+        self.schedule_version = 0
+        self.metrics_version = -1
         self.schedule = []
         self.metrics = {}
         self.feedback_data = []
+        
+        # Ratings folded into per-teacher and per-(teacher, slot) score adjustments (see learn_feedback)
+        self.feedback_model = None
+        self.feedback_log = None
+        if feedback_log:
+            from matching_feedback_log import FeedbackLog
+            self.feedback_log = FeedbackLog(feedback_log)
+        
+        # Source of every random draw, so seeded runs repeat exactly
+        self.rng = np.random.default_rng(seed)
+        
+        # Interned subjects/time slots and the packed masks of every processed row
+        self.time_grid = time_grid
+        self.subject_vocab = None
+        self.slot_vocab = None
+        self.encoded_students = None
+        self.encoded_teachers = None
+        self.schedule_subject_masks = None
+        
+        # Running lesson counts behind calculate_metrics, kept in step with the schedule
+        self.schedule_metrics = None
+        
+        # Engine, capacity and seats kept live for apply_changes
+        self.live_schedule = None
+        
+        # On-disk cache and the key of the loaded files (None once the data diverges from them)
+        # Entries also depend on how this class reads and preprocesses the data
+        cache_code = (type(self).load_data, type(self).preprocess_data, type(self)._set_canonical_tables)
+        self.cache = None
+        if cache_dir:
+            from matching_cache import MatchingCache
+            self.cache = MatchingCache(cache_dir, cache_max_bytes, cache_code)
+        self.cache_key = None
+        self._cache_source = None
+        
+        # Shared SQLite store of students, teachers and the schedule
+        self.store = None
+        if store:
+            from matching_store import MatchingStore
+            self.store = MatchingStore(store)
+        
+        # Per-stage timers and counters; a no-op unless instrumented
+        self.stats = MatchingStats(instrument, profile, trace_memory)
+        self.verbose = verbose
     
-    def load_data(self, students_file: str, teachers_file: str) -> bool:
+    def _report(self, message: str):
+        """Print a progress or error message unless the matcher is quiet."""
+        if self.verbose:
+            print(message)
+    
+    @property
+    def schedule(self) -> List[Dict]:
+        """Match dictionaries of the current schedule."""
+        return self._schedule
+    
+    @schedule.setter
+    def schedule(self, matches: List[Dict]):
+        # A replaced schedule invalidates everything counted from the old one
+        self._schedule = matches
+        self.schedule_subject_masks = None
+        self.schedule_metrics = None
+        self.schedule_version += 1
+    
+    @instrumented('load_data')
+    def load_data(self, students_file: str, teachers_file: str, chunksize: int = None) -> bool:
         """
         Load student and teacher data from CSV files.
         
         Args:
             students_file: Path to students CSV file
             teachers_file: Path to teachers CSV file
+            chunksize: If set, read both files in chunks of this many rows with
+                explicit dtypes, encoding subjects and time slots per chunk into
+                packed bitmasks instead of keeping the raw string columns
             
         Returns:
             bool: True if data loaded successfully, False otherwise
         """
         try:
-            self.students_df = pd.read_csv(students_file)
-            self.teachers_df = pd.read_csv(teachers_file)
-            print(f"✅ Loaded {len(self.students_df)} students and {len(self.teachers_df)} teachers")
+            self.cache_key = None
+            if self.cache:
+                mode = ('chunked' if chunksize else 'full') + ('-grid' if self.time_grid else '')
+                self.cache_key = self.cache.key(students_file, teachers_file, mode)
+                if self._load_cached_tables():
+                    self.stats.count('cache_hits')
+                    self._report(f"✅ Loaded {len(self.students_df)} students and {len(self.teachers_df)} "
+                                 f"teachers from cache")
+                    return True
+            
+            if chunksize:
+                self._reset_vocabularies()
+                self._set_canonical_tables(
+                    read_encoded(students_file, 'students', self.subject_vocab, self.slot_vocab, chunksize),
+                    read_encoded(teachers_file, 'teachers', self.subject_vocab, self.slot_vocab, chunksize))
+                self.students_df = self.encoded_students.frame
+                self.teachers_df = self.encoded_teachers.frame
+            else:
+                self.encoded_students = self.encoded_teachers = None
+                self.students_df = pd.read_csv(students_file)
+                self.teachers_df = pd.read_csv(teachers_file)
+            self._cache_source = (self.students_df, self.teachers_df)
+            self.stats.count('students_loaded', len(self.students_df))
+            self.stats.count('teachers_loaded', len(self.teachers_df))
+            self._report(f"✅ Loaded {len(self.students_df)} students and {len(self.teachers_df)} teachers")
             return True
         except Exception as e:
-            print(f"❌ Error loading data: {e}")
+            self._report(f"❌ Error loading data: {e}")
             return False
     
+    def load_store(self) -> bool:
+        """
+        Load student and teacher data from the SQLite store instead of CSV files.
+        
+        Returns:
+            bool: True if data loaded successfully, False otherwise
+        """
+        if self.store is None:
+            self._report("❌ No store configured. Pass store=... to StudentTeacherMatcher.")
+            return False
+        self.cache_key = None
+        self.encoded_students = self.encoded_teachers = None
+        self.students_df = self.store.students()
+        self.teachers_df = self.store.teachers()
+        self._cache_source = (self.students_df, self.teachers_df)
+        self.stats.count('students_loaded', len(self.students_df))
+        self.stats.count('teachers_loaded', len(self.teachers_df))
+        self._report(f"✅ Loaded {len(self.students_df)} students and {len(self.teachers_df)} teachers "
+                     f"from {self.store.path}")
+        return True
+    
+    def _reset_vocabularies(self, subjects: List[str] = (), time_slots: List[str] = TIME_SLOTS):
+        """Start fresh subject and time slot vocabularies, optionally with known codes."""
+        self.subject_vocab = Vocabulary(initial=subjects)
+        if self.time_grid:
+            self.slot_vocab = TimeGridVocabulary()
+        else:
+            self.slot_vocab = Vocabulary(initial=time_slots, allowed=TIME_SLOTS)
+    
+    def _set_canonical_tables(self, students: EncodedTable, teachers: EncodedTable):
+        """Keep freshly encoded tables in canonical form (`canonical_tables`), so ties never depend on input order."""
+        self.subject_vocab, tables = canonical_tables(self.subject_vocab, students=students, teachers=teachers)
+        self.encoded_students, self.encoded_teachers = tables['students'], tables['teachers']
+    
+    def _load_cached_tables(self) -> bool:
+        """Restore encoded students/teachers and vocabularies from the cache entry of `cache_key`."""
+        cached = self.cache.load_tables(self.cache_key)
+        if cached is None:
+            return False
+        self.encoded_students, self.encoded_teachers, subjects, time_slots = cached
+        self._reset_vocabularies(subjects, time_slots)
+        self.students_df = self.encoded_students.frame
+        self.teachers_df = self.encoded_teachers.frame
+        self._cache_source = (self.students_df, self.teachers_df)
+        return True
+    
+    def _cache_valid(self) -> bool:
+        """Whether the current data still is what `cache_key` was computed from."""
+        if self.cache_key is None or self._cache_source is None:
+            return False
+        students_df, teachers_df = self._cache_source
+        return self.students_df is students_df and self.teachers_df is teachers_df
+    
     def display_data_info(self):
         """Display information about the loaded data."""
         print("\n" + "="*50)
@@ -74,6 +260,7 @@ class StudentTeacherMatcher:
         print(f"\nShape: {self.teachers_df.shape}")
         print(f"Missing values:\n{self.teachers_df.isnull().sum()}")
     
+    @instrumented('preprocess_data')
     def preprocess_data(self):
         """
         Clean and standardize the data for processing.
@@ -81,42 +268,27 @@ class StudentTeacherMatcher:
         Returns:
             tuple: (processed_students_df, processed_teachers_df)
         """
-        def standardize_time_slots(time_str):
-            """Standardize time slot strings."""
-            if pd.isna(time_str):
-                return []
-            slots = [slot.strip().title() for slot in str(time_str).split(',')]
-            return [slot for slot in slots if slot in ['Morning', 'Afternoon', 'Evening']]
-        
-        def standardize_subjects(subject_str):
-            """Standardize subject strings."""
-            if pd.isna(subject_str):
-                return []
-            subjects = [subj.strip().title() for subj in str(subject_str).split(',')]
-            return subjects
-        
-        # Process students data
-        students_processed = self.students_df.copy()
-        students_processed['time_slots'] = students_processed['preferred_time_slots'].apply(standardize_time_slots)
-        students_processed['subject_list'] = students_processed['subjects'].apply(standardize_subjects)
-        
-        # Process teachers data
-        teachers_processed = self.teachers_df.copy()
-        teachers_processed['time_slots'] = teachers_processed['available_time_slots'].apply(standardize_time_slots)
-        teachers_processed['subject_list'] = teachers_processed['subjects'].apply(standardize_subjects)
+        if self.encoded_students is None or self.students_df is not self.encoded_students.frame:
+            # Intern subjects and time slots; rows keep packed masks instead of string lists
+            self._reset_vocabularies()
+            students = encode_frame(self.students_df, 'students', self.subject_vocab, self.slot_vocab)
+            teachers = encode_frame(self.teachers_df, 'teachers', self.subject_vocab, self.slot_vocab)
+            
+            self._set_canonical_tables(students, teachers)
         
-        # Handle missing values
-        students_processed = students_processed.dropna(subset=['student_id', 'name'])
-        teachers_processed = teachers_processed.dropna(subset=['teacher_id', 'name'])
-        teachers_processed['max_students_per_slot'] = teachers_processed['max_students_per_slot'].fillna(2)
+        if not self._cache_valid():
+            self.cache_key = None
+        elif self.cache:
+            self.cache.store_tables(self.cache_key, self.encoded_students, self.encoded_teachers,
+                                    self.subject_vocab.tokens, self.slot_vocab.tokens)
         
-        self.processed_students = students_processed
-        self.processed_teachers = teachers_processed
+        self.processed_students = self.encoded_students.frame
+        self.processed_teachers = self.encoded_teachers.frame
         
-        print("✅ Data preprocessing completed!")
-        print(f"Processed {len(self.processed_students)} students and {len(self.processed_teachers)} teachers")
+        self._report("✅ Data preprocessing completed!")
+        self._report(f"Processed {len(self.processed_students)} students and {len(self.processed_teachers)} teachers")
         
-        return students_processed, teachers_processed
+        return self.processed_students, self.processed_teachers
     
     def calculate_subject_compatibility(self, student_subjects: List[str], teacher_subjects: List[str]) -> float:
         """
@@ -141,205 +313,564 @@ class StudentTeacherMatcher:
         return len(intersection) / len(union) if union else 0.0
     
     def find_common_time_slots(self, student_slots: List[str], teacher_slots: List[str]) -> List[str]:
-        """Find common available time slots between student and teacher."""
-        return list(set(student_slots).intersection(set(teacher_slots)))
+        """
+        Find common available time slots between student and teacher.
+        
+        On a time grid, intervals such as 'Mon 09:00-12:00' are encoded as
+        block masks and intersected, and the common blocks are returned.
+        """
+        if not self.time_grid:
+            return list(set(student_slots).intersection(set(teacher_slots)))
+        slot_vocab = self.slot_vocab or TimeGridVocabulary()
+        student_mask, teacher_mask = slot_vocab.encode_lists([student_slots, teacher_slots])
+        return slot_vocab.decode(student_mask & teacher_mask)
     
-    def create_matches(self):
+    @instrumented('create_matches')
+    def create_matches(self, strategy: str = "greedy", workers: int = 1, shard_column: str = None,
+                       max_sessions: int = 1, group_packing: bool = False):
         """
         Create student-teacher matches based on subjects and availability.
         
+        Args:
+            strategy: 'greedy' takes candidates in descending score order;
+                'optimal' solves a min-cost flow over teacher-slot capacity that
+                maximizes matched students first, then total compatibility
+            workers: Worker processes; above 1 the population is split into
+                independent shards (connected components of the subject/slot
+                graph) that are solved in parallel and merged deterministically
+            shard_column: Optional column present in both inputs (e.g. region
+                or school); students are then only matched with teachers that
+                have the same value, and each value is solved as its own shard
+            max_sessions: Lessons per student; above 1 every lesson covers one
+                subject, students are never booked twice in a time slot and
+                each gets up to this many lessons (greedy, single process only)
+            group_packing: Regroup each teacher's students among its time
+                slots by shared subject and grade, filling groups before
+                opening new ones; lesson types then follow group sizes
+                (single-session only)
+        
         Returns:
             list: List of match dictionaries
         """
-        matches = []
-        teacher_capacity = {}
+        if strategy not in ('greedy', 'optimal'):
+            raise ValueError(f"Unknown matching strategy: {strategy}")
+        if max_sessions > 1 and (strategy != 'greedy' or workers > 1 or shard_column):
+            raise ValueError("Multi-session matching supports the greedy strategy in a single process only")
+        if max_sessions > 1 and group_packing:
+            raise ValueError("Group packing supports single-session matching only")
+        
+        # Score all student-teacher pairs at once with the bitmask engine
+        with self.stats.stage('engine'):
+            engine = self._build_engine()
+            
+            # Initialize teacher capacity tracking
+            capacity = CapacityTable(self.processed_teachers['max_students_per_slot'],
+                                     engine.teacher_slots, len(engine.slots))
+        
+        if workers > 1 or shard_column:
+            if shard_column and (shard_column not in self.processed_students
+                                 or shard_column not in self.processed_teachers):
+                raise ValueError(f"Shard column '{shard_column}' must exist in both students and teachers")
+            from matching_shards import match_sharded
+            with self.stats.stage('sharded'):
+                accepted = match_sharded(
+                    engine, self.processed_teachers['max_students_per_slot'].to_numpy(), strategy, workers,
+                    self.processed_students[shard_column].to_numpy() if shard_column else None,
+                    self.processed_teachers[shard_column].to_numpy() if shard_column else None)
+            self.stats.count('students_assigned', len(accepted[0]))
+        elif max_sessions > 1:
+            accepted = assign_sessions(engine, capacity, max_sessions, stats=self.stats)
+            self.stats.count('students_assigned', len(np.unique(accepted[0])))
+        else:
+            accepted = match_students(engine, capacity, strategy, self._cached_candidates(engine), self.stats)
+        
+        if group_packing:
+            with self.stats.stage('pack_groups'):
+                slot_idx, lesson_types = pack_groups(engine, capacity.max_capacity, self._student_grades(),
+                                                     *accepted[:3])
+            accepted = (*accepted[:2], slot_idx, accepted[3], lesson_types)
+        
+        with self.stats.stage('build_matches'):
+            matches, subject_masks = self._build_matches(engine, self.processed_students['student_id'].tolist(),
+                                                         *accepted)
+        
+        self.schedule = matches
+        self.schedule_subject_masks = subject_masks
+        self.schedule_metrics = ScheduleMetrics()
+        self._count_lessons(engine, self.processed_students['student_id'], *accepted[:5], subject_masks)
+        # Live seats hold one lesson per student, so multi-session schedules are not kept live
+        self.live_schedule = (LiveSchedule(engine, capacity, *accepted[:4], lesson_types_by_size=group_packing)
+                              if max_sessions <= 1 else None)
+        if self.store:
+            with self.stats.stage('store_schedule'):
+                self.store.save_schedule(matches)
+        self._report(f"✅ Created {len(matches)} student-teacher matches")
+        return matches
+    
+    def _cached_candidates(self, engine: CompatibilityEngine):
+        """Scored candidates of `engine` from the cache, computing and storing them on a miss."""
+        if not self._cache_valid():
+            return None
+        # The cache holds plain subject scores; feedback adjustments change between runs
+        candidates = self.cache.load_candidates(self.cache_key)
+        if candidates is None:
+            with self.stats.stage('candidates'):
+                candidates = engine.candidate_pairs(adjusted=False)
+            self.cache.store_candidates(self.cache_key, candidates)
+        else:
+            self.stats.count('cache_hits')
+        student_idx, teacher_idx, slot_idx, scores = candidates
+        return student_idx, teacher_idx, slot_idx, engine.adjust_scores(teacher_idx, slot_idx, scores)
+    
+    def _student_grades(self) -> np.ndarray:
+        """Grade of every processed student row as floats (NaN when missing)."""
+        if 'grade' not in self.processed_students:
+            return np.full(len(self.processed_students), np.nan)
+        return pd.to_numeric(self.processed_students['grade'], errors='coerce').to_numpy(dtype=float, na_value=np.nan)
+    
+    def _build_engine(self) -> CompatibilityEngine:
+        """Compatibility engine over the processed students and teachers."""
+        return CompatibilityEngine(self.encoded_students.subjects, self.encoded_students.slots,
+                                   self.encoded_teachers.subjects, self.encoded_teachers.slots,
+                                   self.processed_teachers['teacher_id'], self.subject_vocab, self.slot_vocab,
+                                   score_adjustment=self._score_adjustment(self.processed_teachers['teacher_id']))
+    
+    def _score_adjustment(self, teacher_ids: pd.Series) -> np.ndarray:
+        """Feedback adjustment of every (teacher row, slot code), or None without feedback."""
+        if self.feedback_model is None or not self.feedback_model.total_ratings:
+            return None
+        with self.stats.stage('feedback_adjustment'):
+            return self.feedback_model.adjustments(teacher_ids, self.slot_vocab.tokens)
+    
+    def _build_matches(self, engine: CompatibilityEngine, student_ids: List, student_idx: np.ndarray,
+                       teacher_idx: np.ndarray, slot_idx: np.ndarray, scores: np.ndarray,
+                       lesson_types: List[str], subject_masks: np.ndarray = None) -> Tuple[List[Dict], np.ndarray]:
+        """
+        Turn accepted candidates into schedule entries.
         
-        # Initialize teacher capacity tracking
-        for _, teacher in self.processed_teachers.iterrows():
-            teacher_id = teacher['teacher_id']
-            teacher_capacity[teacher_id] = {}
-            for time_slot in teacher['time_slots']:
-                teacher_capacity[teacher_id][time_slot] = teacher['max_students_per_slot']
+        Args:
+            engine: Engine the candidates came from
+            student_ids: `student_id` of every student row of the engine
+            student_idx, teacher_idx, slot_idx, scores: Accepted candidate arrays
+            lesson_types: Lesson type of every accepted candidate
+            subject_masks: Packed subjects taught in every match; defaults to
+                all subjects the student and teacher share
+            
+        Returns:
+            tuple: (list of match dictionaries, packed subject mask of every match)
+        """
+        teacher_ids = self.processed_teachers['teacher_id'].tolist()
+        if subject_masks is None:
+            subject_masks = engine.student_subjects[student_idx] & engine.teacher_subjects[teacher_idx]
+        
+        # Subject names are only decoded here, for the final matches
+        matches = [
+            {
+                'student_id': student_ids[s],
+                'teacher_id': teacher_ids[t],
+                'time_slot': engine.slots[slot],
+                'lesson_type': lesson_type,
+                'subjects': engine.subject_vocab.format(mask),
+                'compatibility_score': round(score, 3)
+            }
+            for s, t, slot, score, lesson_type, mask in zip(student_idx.tolist(), teacher_idx.tolist(),
+                                                             slot_idx.tolist(), scores.tolist(),
+                                                             lesson_types, subject_masks)
+        ]
+        return matches, subject_masks
+    
+    def _count_lessons(self, engine: CompatibilityEngine, student_ids: pd.Series, student_idx: np.ndarray,
+                       teacher_idx: np.ndarray, slot_idx: np.ndarray, scores: np.ndarray,
+                       lesson_types: List[str], subject_masks: np.ndarray):
+        """Add accepted candidates, as built by `_build_matches`, to the schedule metrics."""
+        self.schedule_metrics.add(student_ids.to_numpy()[student_idx],
+                                  self.processed_teachers['teacher_id'].to_numpy()[teacher_idx],
+                                  np.asarray(engine.slots, dtype=object)[slot_idx], lesson_types, scores,
+                                  subject_masks)
+    
+    @instrumented('apply_changes')
+    def apply_changes(self, added: Dict = None, removed: Dict = None, updated: Dict = None) -> Dict[str, List]:
+        """
+        Apply enrollment and availability changes without re-matching everyone.
         
-        # Create potential matches with scores
-        potential_matches = []
+        Only affected assignments are repaired: students whose seat goes away
+        are displaced, and together with new or updated students and the
+        unmatched students that fit a freed or new seat they are re-assigned
+        greedily. Everyone else keeps their seat. Requires `create_matches`.
         
-        for _, student in self.processed_students.iterrows():
-            student_id = student['student_id']
-            student_subjects = student['subject_list']
-            student_time_slots = student['time_slots']
+        Args:
+            added: {'students': rows, 'teachers': rows} of new rows in the CSV
+                schemas (DataFrame or list of dicts)
+            removed: {'students': ids, 'teachers': ids} to drop
+            updated: {'students': rows, 'teachers': rows} of full replacement
+                rows, matched on student_id / teacher_id
             
-            for _, teacher in self.processed_teachers.iterrows():
-                teacher_id = teacher['teacher_id']
-                teacher_subjects = teacher['subject_list']
-                teacher_time_slots = teacher['time_slots']
-                
-                # Calculate compatibility and find common slots
-                subject_score = self.calculate_subject_compatibility(student_subjects, teacher_subjects)
-                common_slots = self.find_common_time_slots(student_time_slots, teacher_time_slots)
-                
-                if subject_score > 0 and common_slots:
-                    for time_slot in common_slots:
-                        potential_matches.append({
-                            'student_id': student_id,
-                            'teacher_id': teacher_id,
-                            'time_slot': time_slot,
-                            'subject_score': subject_score,
-                            'common_subjects': list(set(student_subjects).intersection(set(teacher_subjects)))
-                        })
-        
-        # Sort by compatibility score (descending)
-        potential_matches.sort(key=lambda x: x['subject_score'], reverse=True)
-        
-        # Assign matches respecting capacity constraints
-        assigned_students = set()
-        
-        for match in potential_matches:
-            student_id = match['student_id']
-            teacher_id = match['teacher_id']
-            time_slot = match['time_slot']
+        Returns:
+            dict: Schedule diff with 'added' and 'removed' matches and 'changed'
+            {'before': ..., 'after': ...} pairs
+        """
+        live = self.live_schedule
+        if live is None:
+            self._report("❌ No live schedule. Please create single-session matches first.")
+            return {}
+        added, removed, updated = added or {}, removed or {}, updated or {}
+        engine = live.engine
+        if self.feedback_model is not None:
+            # Pick up feedback learned since the schedule was created
+            engine.score_adjustment = self._score_adjustment(self.processed_teachers['teacher_id'])
+        
+        removed_students = self._rows_for(self.processed_students, 'student_id', removed.get('students'))
+        removed_teachers = self._rows_for(self.processed_teachers, 'teacher_id', removed.get('teachers'))
+        
+        # Seats that changed, students that need a (new) seat, students whose entry may change
+        affected = live.unassign(removed_students)
+        pending = set(live.remove_teachers(removed_teachers).tolist())
+        touched = set(removed_students.tolist()) | pending
+        
+        teachers = self._encode_rows(updated.get('teachers'), 'teachers')
+        if teachers is not None:
+            rows, teachers = self._known_rows(self.processed_teachers, teachers, 'teacher_id', removed_teachers)
+            for row, subjects, slots, max_students in zip(
+                    rows.tolist(), teachers.subjects, teachers.slots, teachers.frame['max_students_per_slot']):
+                touched.update(live.occupants((row, slot) for slot in range(live.n_slots)).tolist())
+                displaced, seats = live.set_teacher(row, subjects, slots, max_students)
+                pending.update(displaced.tolist())
+                affected |= seats
+            self._update_rows(self.processed_teachers, rows, teachers.frame)
+        
+        students = self._encode_rows(updated.get('students'), 'students')
+        if students is not None:
+            rows, students = self._known_rows(self.processed_students, students, 'student_id', removed_students)
+            affected |= live.unassign(rows)
+            for row, subjects, slots in zip(rows.tolist(), students.subjects, students.slots):
+                live.set_student(row, subjects, slots)
+            pending.update(rows.tolist())
+            self._update_rows(self.processed_students, rows, students.frame)
+        
+        teachers = self._encode_rows(added.get('teachers'), 'teachers')
+        if teachers is not None:
+            rows = live.add_teachers(teachers.frame['teacher_id'], teachers.subjects, teachers.slots,
+                                     teachers.frame['max_students_per_slot'])
+            affected |= {(row, slot) for row in rows.tolist() for slot in range(live.n_slots)}
+            self.processed_teachers = pd.concat([self.processed_teachers, teachers.frame], ignore_index=True)
+        
+        students = self._encode_rows(added.get('students'), 'students')
+        if students is not None:
+            pending.update(live.add_students(students.subjects, students.slots).tolist())
+            self.processed_students = pd.concat([self.processed_students, students.frame], ignore_index=True)
+        
+        # Freed and new seats also go to unmatched students that can use them
+        gone = np.zeros(len(live.teacher), dtype=bool)
+        gone[removed_students] = True
+        pending = [student for student in pending if not gone[student]]
+        taken, placed = live.place(pending, affected, gone)
+        affected |= taken
+        touched.update(pending)
+        touched.update(placed.tolist())
+        touched.update(live.occupants(affected).tolist())
+        diff = self._schedule_diff(np.array(sorted(touched), dtype=np.int64), gone)
+        
+        keep_teachers = np.ones(len(engine.teacher_subjects), dtype=bool)
+        keep_teachers[removed_teachers] = False
+        if gone.any() or not keep_teachers.all():
+            live.compact(~gone, keep_teachers)
+            self.processed_students = self.processed_students[~gone].reset_index(drop=True)
+            self.processed_teachers = self.processed_teachers[keep_teachers].reset_index(drop=True)
+        
+        self.encoded_students = EncodedTable(self.processed_students, engine.student_subjects, engine.student_slots)
+        self.encoded_teachers = EncodedTable(self.processed_teachers, engine.teacher_subjects, engine.teacher_slots)
+        self.students_df, self.teachers_df = self.processed_students, self.processed_teachers
+        
+        if self.store:
+            self.store.apply_changes(diff, added, removed, updated)
+        
+        self._report(f"🔄 Applied changes: {len(diff['added'])} added, {len(diff['removed'])} removed, "
+                     f"{len(diff['changed'])} changed matches")
+        return diff
+    
+    @staticmethod
+    def _rows_for(frame: pd.DataFrame, id_column: str, ids) -> np.ndarray:
+        """Row positions of `ids` in a processed frame, skipping ids that are not present."""
+        if ids is None or len(ids) == 0:
+            return np.array([], dtype=np.int64)
+        positions = pd.Index(frame[id_column]).get_indexer_for(list(ids))
+        return positions[positions >= 0]
+    
+    @staticmethod
+    def _known_rows(frame: pd.DataFrame, table: EncodedTable, id_column: str,
+                    removed: np.ndarray) -> Tuple[np.ndarray, EncodedTable]:
+        """Row positions of the ids in `table`, and `table` limited to the ids present in `frame` and not `removed`."""
+        positions = pd.Index(frame[id_column]).get_indexer(table.frame[id_column])
+        known = (positions >= 0) & ~np.isin(positions, removed)
+        return positions[known], EncodedTable(table.frame[known].reset_index(drop=True),
+                                              table.subjects[known], table.slots[known])
+    
+    def _encode_rows(self, rows, kind: str):
+        """Encode change rows (DataFrame or list of dicts) with the live vocabularies, in id order."""
+        if rows is None or len(rows) == 0:
+            return None
+        df = rows if isinstance(rows, pd.DataFrame) else pd.DataFrame(list(rows))
+        return sort_rows(encode_frame(df, kind, self.subject_vocab, self.slot_vocab), kind)
+    
+    @staticmethod
+    def _update_rows(frame: pd.DataFrame, rows: np.ndarray, values: pd.DataFrame):
+        """Overwrite the scalar columns of `rows` in a processed frame."""
+        for column in values.columns.intersection(frame.columns):
+            frame.loc[rows, column] = values[column].to_numpy()
+    
+    def _schedule_diff(self, students: np.ndarray, gone: np.ndarray) -> Dict[str, List]:
+        """
+        Bring the schedule entries of `students` in line with their live seats.
+        
+        Args:
+            students: Student rows whose entries may have changed
+            gone: Boolean mask of removed student rows
             
-            # Skip if student already assigned
-            if student_id in assigned_students:
-                continue
+        Returns:
+            dict: Schedule diff (see `apply_changes`)
+        """
+        live = self.live_schedule
+        engine = live.engine
+        diff = {'added': [], 'removed': [], 'changed': []}
+        
+        assigned = students[(live.teacher[students] >= 0) & ~gone[students]]
+        student_ids = self.processed_students['student_id'].to_numpy()[assigned].tolist()
+        teacher_ids = self.processed_teachers['teacher_id'].to_numpy()[live.teacher[assigned]].tolist()
+        subject_masks = engine.student_subjects[assigned] & engine.teacher_subjects[live.teacher[assigned]]
+        current = {
+            student: {
+                'student_id': student_id,
+                'teacher_id': teacher_id,
+                'time_slot': engine.slots[slot],
+                'lesson_type': lesson_type,
+                'subjects': engine.subject_vocab.format(mask),
+                'compatibility_score': round(score, 3)
+            }
+            for student, student_id, teacher_id, slot, score, lesson_type, mask in zip(
+                assigned.tolist(), student_ids, teacher_ids, live.slot[assigned].tolist(),
+                live.score[assigned].tolist(), live.lesson_types(assigned), subject_masks)
+        }
+        
+        masks = pad_words(self.schedule_subject_masks, engine.subject_vocab.words)
+        new_entries, new_masks, dropped = [], [], []
+        # Entries leaving and entering the schedule, for the metrics
+        outgoing, outgoing_masks, incoming, incoming_masks = [], [], [], []
+        for student in students.tolist():
+            position = live.entry[student]
+            before = self.schedule[position] if position >= 0 else None
+            after = current.get(student)
+            if before is None and after is not None:
+                diff['added'].append(after)
+                live.entry[student] = len(self.schedule) + len(new_entries)
+                new_entries.append(after)
+                new_masks.append(engine.common_subjects(student, live.teacher[student]))
+                incoming.append(after)
+                incoming_masks.append(new_masks[-1])
+            elif before is not None and after is None:
+                diff['removed'].append(before)
+                dropped.append(position)
+                live.entry[student] = -1
+                outgoing.append(before)
+                outgoing_masks.append(masks[position].copy())
+            elif before is not None and before != after:
+                diff['changed'].append({'before': before, 'after': after})
+                outgoing.append(before)
+                outgoing_masks.append(masks[position].copy())
+                self.schedule[position] = after
+                masks[position] = engine.common_subjects(student, live.teacher[student])
+                incoming.append(after)
+                incoming_masks.append(masks[position].copy())
+        
+        if self.schedule_metrics is not None:
+            self.schedule_metrics.update_matches(outgoing, np.array(outgoing_masks, dtype=np.uint64), sign=-1)
+            self.schedule_metrics.update_matches(incoming, np.array(incoming_masks, dtype=np.uint64))
+        self.schedule.extend(new_entries)
+        if new_masks:
+            masks = np.vstack([masks, np.array(new_masks)])
+        if dropped:
+            keep = np.ones(len(self.schedule), dtype=bool)
+            keep[dropped] = False
+            # In place, so the running metrics updated above are kept
+            self.schedule[:] = [match for match, kept in zip(self.schedule, keep.tolist()) if kept]
+            masks = masks[keep]
+            position = np.cumsum(keep) - 1
+            live.entry = np.where(live.entry >= 0, position[live.entry], -1)
+        self.schedule_subject_masks = masks
+        self.schedule_version += 1
+        return diff
+    
+    def what_if(self, scenarios: List[Dict], workers: int = None, **match_options) -> pd.DataFrame:
+        """
+        Compare what-if teacher scenarios against the preprocessed data.
+        
+        Every scenario is matched from scratch in a worker process; the
+        matcher's own schedule and data are left untouched.
+        
+        Args:
+            scenarios: Teacher deltas, each with a 'name' and any of
+                'added', 'removed' and 'updated' as in `apply_changes`
+                (updated rows may give only the columns that change)
+            workers: Worker processes (None = one per CPU)
+            **match_options: Passed to `create_matches`
             
-            # Check teacher capacity
-            if teacher_capacity[teacher_id][time_slot] > 0:
-                # Determine lesson type
-                current_capacity = teacher_capacity[teacher_id][time_slot]
-                max_capacity = self.processed_teachers[
-                    self.processed_teachers['teacher_id'] == teacher_id
-                ]['max_students_per_slot'].iloc[0]
-                
-                lesson_type = "1:1" if max_capacity == 1 or current_capacity == max_capacity else "Group"
-                
-                # Create final match
-                final_match = {
-                    'student_id': student_id,
-                    'teacher_id': teacher_id,
-                    'time_slot': time_slot,
-                    'lesson_type': lesson_type,
-                    'subjects': ', '.join(match['common_subjects']),
-                    'compatibility_score': round(match['subject_score'], 3)
-                }
-                
-                matches.append(final_match)
-                assigned_students.add(student_id)
-                teacher_capacity[teacher_id][time_slot] -= 1
+        Returns:
+            DataFrame: One row of metrics per scenario, the unchanged base first
+        """
+        from matching_scenarios import run_scenarios
+        with self.stats.stage('what_if'):
+            table = run_scenarios(self, scenarios, workers=workers, **match_options)
+        self._report(f"🔮 Evaluated {len(table) - 1} scenarios against the base")
+        return table
+    
+    def stream_matches(self, students_file: str, teachers_file: str, chunksize: int = DEFAULT_CHUNKSIZE):
+        """
+        Match students chunk by chunk as they are read from `students_file`.
         
-        self.schedule = matches
-        print(f"✅ Created {len(matches)} student-teacher matches")
-        return matches
+        Teachers are loaded in full first; students are then encoded and matched
+        one chunk at a time, so raw rows never accumulate in memory. Capacity
+        carries over between chunks: earlier chunks (in file order) get first
+        pick, and within a chunk candidates are taken in descending score
+        order, ties broken by student id.
+        
+        Args:
+            students_file: Path to students CSV file
+            teachers_file: Path to teachers CSV file
+            chunksize: Students read and matched per chunk
+            
+        Yields:
+            list: Match dictionaries created for each chunk
+        """
+        self._reset_vocabularies()
+        self.subject_vocab, tables = canonical_tables(self.subject_vocab, teachers=read_encoded(
+            teachers_file, 'teachers', self.subject_vocab, self.slot_vocab, chunksize))
+        self.encoded_teachers = tables['teachers']
+        self.teachers_df = self.processed_teachers = self.encoded_teachers.frame
+        self.schedule = []
+        self.schedule_metrics = ScheduleMetrics()
+        self.live_schedule = None
+        
+        teachers = self.encoded_teachers
+        index = CandidateIndex(teachers.frame['teacher_id'], teachers.subjects, teachers.slots,
+                               self.slot_vocab.codes_per_bucket)
+        capacity = CapacityTable(teachers.frame['max_students_per_slot'], teachers.slots,
+                                 len(self.slot_vocab.tokens))
+        score_adjustment = self._score_adjustment(teachers.frame['teacher_id'])
+        
+        chunks, mask_chunks = [], []
+        for chunk in iter_encoded_chunks(students_file, 'students', self.subject_vocab,
+                                         self.slot_vocab, chunksize):
+            chunk = sort_rows(infer_ids(chunk, 'students'), 'students')
+            with self.stats.stage('stream_matches'):
+                engine = CompatibilityEngine(chunk.subjects, chunk.slots, teachers.subjects, teachers.slots,
+                                             teachers.frame['teacher_id'], self.subject_vocab,
+                                             self.slot_vocab, index=index, score_adjustment=score_adjustment)
+                accepted = match_students(engine, capacity, stats=self.stats)
+                matches, subject_masks = self._build_matches(engine, chunk.frame['student_id'].tolist(), *accepted)
+                self._count_lessons(engine, chunk.frame['student_id'], *accepted, subject_masks)
+            self.schedule.extend(matches)
+            self.schedule_version += 1
+            mask_chunks.append(subject_masks)
+            chunks.append(chunk)
+            yield matches
+        
+        if chunks:
+            self.schedule_subject_masks = np.vstack([pad_words(masks, self.subject_vocab.words)
+                                                     for masks in mask_chunks])
+            self.encoded_students = EncodedTable.concat(chunks)
+            self.students_df = self.processed_students = self.encoded_students.frame
+        if self.store:
+            self.store.save_schedule(self.schedule)
+        self._report(f"✅ Created {len(self.schedule)} student-teacher matches from streamed chunks")
     
+    @instrumented('generate_schedule_dataframe')
     def generate_schedule_dataframe(self) -> pd.DataFrame:
         """Generate a detailed schedule DataFrame with student and teacher names."""
         if not self.schedule:
             return pd.DataFrame()
         
-        schedule_df = pd.DataFrame(self.schedule)
-        
-        # Add names
-        student_names = self.processed_students.set_index('student_id')['name'].to_dict()
-        teacher_names = self.processed_teachers.set_index('teacher_id')['name'].to_dict()
-        
-        schedule_df['student_name'] = schedule_df['student_id'].map(student_names)
-        schedule_df['teacher_name'] = schedule_df['teacher_id'].map(teacher_names)
-        
-        # Reorder columns
-        column_order = ['student_id', 'student_name', 'teacher_id', 'teacher_name', 
-                       'time_slot', 'lesson_type', 'subjects', 'compatibility_score']
-        
-        return schedule_df[column_order]
+        return pd.concat(schedule_batches(self.schedule, self.processed_students, self.processed_teachers),
+                         ignore_index=True)
     
-    def export_schedule(self, format_type: str = 'csv', filename: str = None) -> str:
+    @instrumented('export_schedule')
+    def export_schedule(self, format_type: str = 'csv', filename: str = None,
+                        batch_size: int = DEFAULT_BATCH_SIZE) -> str:
         """
-        Export the schedule to CSV or JSON format.
+        Export the schedule, writing it in batches of rows.
         
         Args:
-            format_type: 'csv' or 'json'
-            filename: Optional custom filename
+            format_type: 'csv', 'json', 'ndjson' (one match per line), 'parquet'
+                or 'arrow' (Arrow IPC stream); the last two need pyarrow
+            filename: Optional custom filename; CSV, JSON and NDJSON files ending
+                in '.gz' are gzip-compressed
+            batch_size: Schedule rows held in memory at a time
             
         Returns:
             str: Generated filename
         """
         if not self.schedule:
-            print("❌ No schedule to export. Please create matches first.")
+            self._report("❌ No schedule to export. Please create matches first.")
             return ""
         
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        format_type = format_type.lower()
+        if format_type not in EXPORT_FORMATS:
+            raise ValueError(f"Unknown export format: {format_type}")
         
-        if format_type.lower() == 'csv':
-            filename = filename or f'schedule_{timestamp}.csv'
-            schedule_df = self.generate_schedule_dataframe()
-            schedule_df.to_csv(filename, index=False)
-            print(f"📁 Schedule exported to {filename}")
-            
-        elif format_type.lower() == 'json':
-            filename = filename or f'schedule_{timestamp}.json'
-            with open(filename, 'w') as f:
-                json.dump(self.schedule, f, indent=2)
-            print(f"📁 Schedule exported to {filename}")
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        filename = filename or f'schedule_{timestamp}.{format_type}'
+        batches = schedule_batches(self.schedule, self.processed_students, self.processed_teachers, batch_size)
+        
+        if format_type == 'csv':
+            write_csv(batches, filename)
+        elif format_type == 'json':
+            write_json(self.schedule, filename)
+        elif format_type == 'ndjson':
+            write_ndjson(batches, filename)
+        elif format_type == 'parquet':
+            write_parquet(batches, filename)
+        else:
+            write_arrow(batches, filename)
+        self._report(f"📁 Schedule exported to {filename}")
         
         return filename
     
+    def fingerprints(self) -> Dict[str, str]:
+        """
+        Content fingerprints of the preprocessed input and of the schedule.
+        
+        Both ignore row, column and cell token order, so equivalent inputs
+        give equal fingerprints (and, matched the same way, equal schedules).
+        
+        Returns:
+            dict: {'input': hex digest, 'schedule': hex digest}; None where
+            there is no preprocessed data or no schedule yet
+        """
+        with self.stats.stage('fingerprints'):
+            return fingerprints(self)
+    
+    @instrumented('calculate_metrics')
     def calculate_metrics(self) -> Dict:
         """Calculate comprehensive performance metrics for the matching system."""
         if not self.schedule:
             return {}
         
-        total_students = len(self.processed_students)
-        matched_students = len(set(match['student_id'] for match in self.schedule))
-        total_teachers = len(self.processed_teachers)
-        
-        # Basic metrics
-        metrics = {
-            'total_students': total_students,
-            'matched_students': matched_students,
-            'unmatched_students': total_students - matched_students,
-            'matching_rate': round((matched_students / total_students) * 100, 2),
-            'total_lessons': len(self.schedule),
-            'lesson_types': Counter(match['lesson_type'] for match in self.schedule)
-        }
-        
-        # Teacher utilization
-        teacher_usage = Counter(match['teacher_id'] for match in self.schedule)
-        utilized_teachers = len(teacher_usage)
-        
-        metrics['teacher_utilization'] = {
-            'total_teachers': total_teachers,
-            'utilized_teachers': utilized_teachers,
-            'utilization_rate': round((utilized_teachers / total_teachers) * 100, 2)
-        }
-        
-        # Time slot distribution
-        time_slot_distribution = Counter(match['time_slot'] for match in self.schedule)
-        metrics['time_slot_distribution'] = dict(time_slot_distribution)
-        
-        # Compatibility scores
-        compatibility_scores = [match['compatibility_score'] for match in self.schedule]
-        metrics['average_compatibility_score'] = round(np.mean(compatibility_scores), 3)
-        metrics['min_compatibility_score'] = round(min(compatibility_scores), 3)
-        metrics['max_compatibility_score'] = round(max(compatibility_scores), 3)
+        # Recount when the schedule was replaced (or edited in place) rather than built or repaired by the matcher
+        if self.schedule_metrics is None or self.schedule_metrics.total_lessons != len(self.schedule):
+            self.schedule_metrics = ScheduleMetrics()
+            self.schedule_metrics.update_matches(self.schedule, self._schedule_masks())
         
-        # Subject coverage
-        all_subjects = set()
-        for _, student in self.processed_students.iterrows():
-            all_subjects.update(student['subject_list'])
-        
-        covered_subjects = set()
-        for match in self.schedule:
-            if match['subjects']:
-                covered_subjects.update(match['subjects'].split(', '))
-        
-        metrics['subject_coverage'] = {
-            'total_subjects': len(all_subjects),
-            'covered_subjects': len(covered_subjects),
-            'coverage_rate': round((len(covered_subjects) / len(all_subjects)) * 100, 2) if all_subjects else 0
-        }
+        metrics = self.schedule_metrics.summary(len(self.processed_students), len(self.processed_teachers),
+                                                total_subjects(self.encoded_students.subjects))
         
         self.metrics = metrics
+        self.metrics_version = self.schedule_version
         return metrics
     
+    def _schedule_masks(self) -> np.ndarray:
+        """Packed subjects of every schedule entry, re-encoded from the entries if no masks are aligned."""
+        if self.schedule_subject_masks is not None and len(self.schedule_subject_masks) == len(self.schedule):
+            return self.schedule_subject_masks
+        return self.subject_vocab.encode(pd.Series([match['subjects'] for match in self.schedule], dtype=object))
+    
     def print_metrics_report(self):
         """Print a detailed metrics report."""
         if not self.metrics:
@@ -378,122 +909,55 @@ class StudentTeacherMatcher:
         print(f"   • Covered Subjects: {self.metrics['subject_coverage']['covered_subjects']}")
         print(f"   • Coverage Rate: {self.metrics['subject_coverage']['coverage_rate']}%")
     
-    def create_visualizations(self):
-        """Create comprehensive visualizations for the matching results."""
-        if not self.schedule or not self.metrics:
-            print("❌ No data available for visualization")
-            return
-        
-        # Set up the plotting style
-        plt.style.use('default')
-        sns.set_palette("husl")
-        
-        fig, axes = plt.subplots(2, 2, figsize=(15, 12))
-        fig.suptitle('Student-Teacher Matching Analysis', fontsize=16, fontweight='bold')
-        
-        # 1. Matching Rate Pie Chart
-        ax1 = axes[0, 0]
-        labels = ['Matched', 'Unmatched']
-        sizes = [self.metrics['matched_students'], self.metrics['unmatched_students']]
-        colors = ['#2ecc71', '#e74c3c']
-        ax1.pie(sizes, labels=labels, colors=colors, autopct='%1.1f%%', startangle=90)
-        ax1.set_title('Student Matching Rate')
-        
-        # 2. Time Slot Distribution
-        ax2 = axes[0, 1]
-        time_slots = list(self.metrics['time_slot_distribution'].keys())
-        counts = list(self.metrics['time_slot_distribution'].values())
-        bars = ax2.bar(time_slots, counts, color=['#3498db', '#f39c12', '#9b59b6'])
-        ax2.set_title('Lessons by Time Slot')
-        ax2.set_ylabel('Number of Lessons')
-        
-        # Add value labels on bars
-        for bar in bars:
-            height = bar.get_height()
-            ax2.text(bar.get_x() + bar.get_width()/2., height,
-                    f'{int(height)}', ha='center', va='bottom')
-        
-        # 3. Lesson Type Distribution
-        ax3 = axes[1, 0]
-        lesson_types = list(self.metrics['lesson_types'].keys())
-        lesson_counts = list(self.metrics['lesson_types'].values())
-        colors = ['#1abc9c', '#e67e22']
-        ax3.pie(lesson_counts, labels=lesson_types, colors=colors, autopct='%1.1f%%', startangle=90)
-        ax3.set_title('Lesson Type Distribution')
-        
-        # 4. Compatibility Score Distribution
-        ax4 = axes[1, 1]
-        scores = [match['compatibility_score'] for match in self.schedule]
-        ax4.hist(scores, bins=10, color='#34495e', alpha=0.7, edgecolor='black')
-        ax4.set_title('Compatibility Score Distribution')
-        ax4.set_xlabel('Compatibility Score')
-        ax4.set_ylabel('Number of Matches')
-        ax4.axvline(self.metrics['average_compatibility_score'], color='red', 
-                    linestyle='--', label=f'Mean: {self.metrics["average_compatibility_score"]}')
-        ax4.legend()
-        
-        plt.tight_layout()
-        plt.savefig('matching_analysis.png', dpi=300, bbox_inches='tight')
-        print("📊 Saved matching_analysis.png")
-        plt.show()
-        
-        # Create teacher utilization chart
-        self._create_teacher_utilization_chart()
-    
-    def _create_teacher_utilization_chart(self):
+    def create_visualizations(self, output_dir: str = '.', headless: bool = None, workers: int = None,
+                              force: bool = False) -> List[str]:
+        """
+        Create comprehensive visualizations for the matching results.
+
+        Args:
+            output_dir: Directory the PNG files are written to
+            headless: Render without showing windows (Agg backend, charts drawn
+                in parallel and skipped when unchanged); defaults to whether
+                no display is available
+            workers: Processes drawing charts in parallel when headless;
+                defaults to the number of CPUs
+            force: Redraw headless charts even if their data is unchanged
+
+        Returns:
+            list: Paths of the chart files
+        """
+        # Plotting libraries are only imported when charts are requested
+        from matching_plots import create_visualizations
+        return create_visualizations(self, output_dir=output_dir, headless=headless, workers=workers, force=force)
+    
+    def _create_teacher_utilization_chart(self, output_dir: str = '.', headless: bool = None) -> List[str]:
         """Create a detailed chart showing teacher utilization."""
-        teacher_usage = Counter(match['teacher_id'] for match in self.schedule)
-        teacher_names = self.processed_teachers.set_index('teacher_id')['name'].to_dict()
-        
-        # Create data for all teachers
-        all_teachers = []
-        usage_counts = []
-        
-        for _, teacher in self.processed_teachers.iterrows():
-            teacher_id = teacher['teacher_id']
-            all_teachers.append(teacher_names[teacher_id])
-            usage_counts.append(teacher_usage.get(teacher_id, 0))
-        
-        plt.figure(figsize=(12, 6))
-        bars = plt.bar(all_teachers, usage_counts, 
-                       color=['#2ecc71' if count > 0 else '#e74c3c' for count in usage_counts])
-        plt.title('Teacher Utilization - Number of Students Assigned', fontsize=14, fontweight='bold')
-        plt.xlabel('Teachers')
-        plt.ylabel('Number of Students')
-        plt.xticks(rotation=45, ha='right')
-        
-        # Add value labels on bars
-        for bar in bars:
-            height = bar.get_height()
-            if height > 0:
-                plt.text(bar.get_x() + bar.get_width()/2., height,
-                        f'{int(height)}', ha='center', va='bottom')
-        
-        plt.tight_layout()
-        plt.savefig('teacher_utilization.png', dpi=300, bbox_inches='tight')
-        print("📊 Saved teacher_utilization.png")
-        plt.show()
-    
-    def simulate_feedback(self, positive_rate: float = 0.8):
+        from matching_plots import create_teacher_utilization_chart
+        return create_teacher_utilization_chart(self, output_dir=output_dir, headless=headless)
+    
+    def simulate_feedback(self, positive_rate: float = 0.8, rng: np.random.Generator = None):
         """
         Simulate feedback for the matching system.
         
         Args:
             positive_rate: Expected rate of positive feedback
+            rng: Random generator of the rating noise; defaults to the
+                matcher's (see `seed`)
             
         Returns:
             list: Feedback data
         """
         if not self.schedule:
-            print("❌ No matches to provide feedback for")
+            self._report("❌ No matches to provide feedback for")
             return []
         
         feedback_data = []
+        rng = self.rng if rng is None else rng
         
         for match in self.schedule:
             # Base satisfaction on compatibility score with some randomness
             base_satisfaction = match['compatibility_score']
-            random_factor = np.random.normal(0, 0.1)
+            random_factor = rng.normal(0, 0.1)
             final_satisfaction = max(0, min(1, base_satisfaction + random_factor))
             
             # Convert to 1-5 rating scale
@@ -516,43 +980,81 @@ class StudentTeacherMatcher:
         avg_rating = np.mean([f['rating'] for f in feedback_data])
         positive_feedback_rate = sum(f['feedback_positive'] for f in feedback_data) / len(feedback_data)
         
-        print(f"\n🔄 FEEDBACK SIMULATION RESULTS:")
-        print(f"   • Average Rating: {avg_rating:.2f}/5.0")
-        print(f"   • Positive Feedback Rate: {positive_feedback_rate:.1%}")
+        self._report(f"\n🔄 FEEDBACK SIMULATION RESULTS:")
+        self._report(f"   • Average Rating: {avg_rating:.2f}/5.0")
+        self._report(f"   • Positive Feedback Rate: {positive_feedback_rate:.1%}")
         
         return feedback_data
     
+    def learn_feedback(self, feedback: List[Dict] = None, term: str = '') -> FeedbackModel:
+        """
+        Fold a batch of ratings into the feedback scoring model.
+        
+        Later matching (create_matches, stream_matches, apply_changes) adds
+        the model's per-teacher and per-(teacher, time slot) adjustments to
+        the Jaccard scores, so well-rated teachers and slots are preferred.
+        Batches accumulate: pass each new batch once. With a feedback log
+        this is where batches are appended to it, and the model is the log's
+        aggregates over every rating logged so far.
+        
+        Args:
+            feedback: Ratings with teacher_id, time_slot and rating; defaults
+                to the latest `simulate_feedback` batch
+            term: Label of the term the ratings belong to, stored with them
+                in the feedback log (see `FeedbackLog.read`)
+            
+        Returns:
+            FeedbackModel: The updated model
+        """
+        with self.stats.stage('learn_feedback'):
+            feedback = self.feedback_data if feedback is None else feedback
+            if self.feedback_log is not None:
+                self.feedback_log.append(feedback, term)
+                self.feedback_model = self.feedback_log.model
+            else:
+                if self.feedback_model is None:
+                    self.feedback_model = FeedbackModel()
+                self.feedback_model.update(feedback)
+        self._report(f"🧠 Feedback model updated ({self.feedback_model.total_ratings} ratings in total)")
+        return self.feedback_model
+    
     def analyze_feedback_trends(self):
-        """Analyze feedback trends to improve future matching."""
-        if not self.feedback_data:
-            print("❌ No feedback data available")
-            return None
+        """
+        Analyze feedback trends to improve future matching.
         
-        feedback_df = pd.DataFrame(self.feedback_data)
+        With a feedback log the trends cover every rating logged and are read
+        off its running aggregates; otherwise they cover the latest batch.
         
-        # Analyze by teacher
-        teacher_feedback = feedback_df.groupby('teacher_id').agg({
-            'rating': ['mean', 'count'],
-            'satisfaction_score': 'mean'
-        }).round(2)
+        Returns:
+            DataFrame: Per-teacher trends (teacher_id, ratings, avg_rating)
+        """
+        if self.feedback_log is not None and len(self.feedback_log):
+            teacher_ids, num_students, avg_ratings = self.feedback_log.teacher_trends()
+            time_slots, _, slot_ratings = self.feedback_log.slot_trends()
+            rated = 'ratings'
+        elif self.feedback_data:
+            feedback_df = pd.DataFrame(self.feedback_data)
+            # Per-teacher and per-slot aggregates in one factorize/bincount pass each
+            teacher_ids, num_students, (avg_ratings,) = group_means(feedback_df['teacher_id'], feedback_df['rating'])
+            time_slots, _, (slot_ratings,) = group_means(feedback_df['time_slot'], feedback_df['rating'])
+            rated = 'students'
+        else:
+            print("❌ No feedback data available")
+            return None
         
         print("\n📈 TEACHER PERFORMANCE ANALYSIS:")
         teacher_names = self.processed_teachers.set_index('teacher_id')['name'].to_dict()
         
-        for teacher_id in teacher_feedback.index:
-            avg_rating = teacher_feedback.loc[teacher_id, ('rating', 'mean')]
-            num_students = teacher_feedback.loc[teacher_id, ('rating', 'count')]
+        for teacher_id, avg_rating, count in zip(teacher_ids.tolist(), np.round(avg_ratings, 2), num_students):
             teacher_name = teacher_names.get(teacher_id, f'Teacher {teacher_id}')
-            print(f"   • {teacher_name}: {avg_rating}/5.0 (from {num_students} students)")
+            print(f"   • {teacher_name}: {avg_rating}/5.0 (from {count} {rated})")
         
         # Analyze by time slot
-        timeslot_feedback = feedback_df.groupby('time_slot')['rating'].mean().round(2)
-        
         print("\n⏰ TIME SLOT SATISFACTION:")
-        for time_slot, avg_rating in timeslot_feedback.items():
+        for time_slot, avg_rating in zip(time_slots.tolist(), np.round(slot_ratings, 2)):
             print(f"   • {time_slot}: {avg_rating}/5.0")
         
-        return feedback_df
+        return pd.DataFrame({'teacher_id': teacher_ids, 'ratings': num_students, 'avg_rating': avg_ratings})
     
     def generate_summary_report(self):
         """Generate a comprehensive summary report."""
@@ -571,6 +1073,10 @@ class StudentTeacherMatcher:
             avg_rating = np.mean([f['rating'] for f in self.feedback_data])
             print(f"   ✓ Average satisfaction rating: {avg_rating:.2f}/5.0")
         
+        for name, digest in self.fingerprints().items():
+            if digest:
+                print(f"   ✓ {name.title()} fingerprint: {digest[:16]}")
+        
         print(f"\n📊 KEY INSIGHTS:")
         
         # Most popular time slot
@@ -610,8 +1116,8 @@ def main():
     print("🎓 Student-Teacher Matching Automation System")
     print("=" * 50)
     
-    # Initialize the system
-    matcher = StudentTeacherMatcher()
+    # Initialize the system; with MATCHING_CACHE_DIR set, unchanged input files are served from that cache
+    matcher = StudentTeacherMatcher(cache_dir=os.environ.get('MATCHING_CACHE_DIR'))
     
     # Load data
     if not matcher.load_data('students.csv', 'teachers.csv'):
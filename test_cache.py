@@ -0,0 +1,58 @@
+"""
+Tests for the on-disk preprocessing cache.
+
+Run with `python -m pytest`.
+"""
+
+import contextlib
+import io
+import os
+
+import pandas as pd
+import pytest
+
+pytest.importorskip('pyarrow')
+
+from matching_cache import code_version  # noqa: E402
+from student_teacher_matcher import StudentTeacherMatcher  # noqa: E402
+
+
+def run(cache_dir: str, paths):
+    matcher = StudentTeacherMatcher(cache_dir=cache_dir)
+    with contextlib.redirect_stdout(io.StringIO()) as output:
+        assert matcher.load_data(*paths)
+        matcher.preprocess_data()
+        matcher.create_matches()
+    return matcher, 'from cache' in output.getvalue()
+
+
+@pytest.mark.parametrize('string_ids', [False, True])
+def test_cached_tables_round_trip(tmp_path, string_ids):
+    students, teachers = pd.read_csv('students.csv'), pd.read_csv('teachers.csv')
+    if string_ids:
+        students['student_id'] = 'S' + students['student_id'].astype(str)
+        teachers['teacher_id'] = 'T' + teachers['teacher_id'].astype(str)
+    paths = str(tmp_path / 'students.csv'), str(tmp_path / 'teachers.csv')
+    students.to_csv(paths[0], index=False)
+    teachers.to_csv(paths[1], index=False)
+    cache_dir = str(tmp_path / 'cache')
+
+    fresh, hit = run(cache_dir, paths)
+    assert not hit
+    cached, hit = run(cache_dir, paths)
+    assert hit
+    [entry] = os.listdir(cache_dir)
+    assert not [name for name in os.listdir(os.path.join(cache_dir, entry)) if name.endswith('.pkl')]
+    for kind in ('processed_students', 'processed_teachers'):
+        pd.testing.assert_frame_equal(getattr(cached, kind), getattr(fresh, kind))
+    assert cached.schedule == fresh.schedule
+    assert cached.fingerprints() == fresh.fingerprints()
+
+
+def test_code_version_covers_preprocessing_methods():
+    class Patched(StudentTeacherMatcher):
+        def preprocess_data(self):
+            return super().preprocess_data()
+
+    assert code_version() != code_version(StudentTeacherMatcher.preprocess_data)
+    assert code_version(StudentTeacherMatcher.preprocess_data) != code_version(Patched.preprocess_data)
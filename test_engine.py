@@ -0,0 +1,103 @@
+"""
+Tests for the compatibility engine and the optimal assignment strategy.
+
+Run with `python -m pytest`.
+"""
+
+import itertools
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from matching_engine import (SCORE_SCALE, CapacityTable, CompatibilityEngine, assign_greedy, assign_top_k,
+                             match_students)
+from matching_vocabulary import TIME_SLOTS, Vocabulary
+
+SUBJECTS = ['Math', 'Science', 'English']
+
+
+def random_engine(rng: np.random.Generator, n_students: int, n_teachers: int, adjusted: bool):
+    """Engine and capacity table over a small random population."""
+    def cells(options, size):
+        return pd.Series([','.join(rng.choice(options, rng.integers(1, 3), replace=False)) for _ in range(size)])
+
+    subject_vocab = Vocabulary(SUBJECTS)
+    slot_vocab = Vocabulary(TIME_SLOTS, allowed=TIME_SLOTS)
+    adjustment = rng.uniform(-0.2, 0.2, (n_teachers, len(TIME_SLOTS))) if adjusted else None
+    engine = CompatibilityEngine(subject_vocab.encode(cells(SUBJECTS, n_students)),
+                                 slot_vocab.encode(cells(TIME_SLOTS, n_students)),
+                                 subject_vocab.encode(cells(SUBJECTS, n_teachers)),
+                                 slot_vocab.encode(cells(TIME_SLOTS, n_teachers)),
+                                 list(range(1, n_teachers + 1)), subject_vocab, slot_vocab,
+                                 score_adjustment=adjustment)
+    capacity = CapacityTable(rng.integers(1, 3, n_teachers), engine.teacher_slots, len(TIME_SLOTS))
+    return engine, capacity
+
+
+def brute_force(engine: CompatibilityEngine, capacity: CapacityTable):
+    """Best (matched students, total scaled score) over every feasible assignment."""
+    student_idx, teacher_idx, slot_idx, scores = engine.candidate_pairs()
+    options = [[None] + np.flatnonzero(student_idx == student).tolist()
+               for student in range(len(engine.student_subjects))]
+    best = (0, 0)
+    for choice in itertools.product(*options):
+        picked = [candidate for candidate in choice if candidate is not None]
+        used = np.zeros_like(capacity.remaining)
+        np.add.at(used, (teacher_idx[picked], slot_idx[picked]), 1)
+        if (used <= capacity.remaining).all():
+            total = int(np.rint(scores[picked] * SCORE_SCALE).sum())
+            best = max(best, (len(picked), total))
+    return best
+
+
+@pytest.mark.parametrize('adjusted', [False, True])
+@pytest.mark.parametrize('seed', range(12))
+def test_optimal_matches_brute_force(seed, adjusted):
+    engine, capacity = random_engine(np.random.default_rng(seed), 5, 3, adjusted)
+    expected = brute_force(engine, capacity)
+    _, _, _, scores, _ = match_students(engine, capacity, 'optimal')
+    assert (len(scores), int(np.rint(scores * SCORE_SCALE).sum())) == expected
+
+
+@pytest.mark.parametrize('seed', range(12))
+def test_optimal_not_worse_than_greedy(seed):
+    rng = np.random.default_rng(seed)
+    engine, capacity = random_engine(rng, 8, 4, adjusted=True)
+    greedy_capacity = CapacityTable(capacity.max_capacity.max(axis=1), engine.teacher_slots, len(TIME_SLOTS))
+    _, _, _, optimal, _ = match_students(engine, capacity, 'optimal')
+    _, _, _, greedy, _ = match_students(engine, greedy_capacity, 'greedy')
+    assert (len(optimal), optimal.sum()) >= (len(greedy), greedy.sum() - 1e-9)
+
+
+@pytest.mark.parametrize('top_k', [1, 2, 1000])
+@pytest.mark.parametrize('adjusted', [False, True])
+@pytest.mark.parametrize('seed', range(4))
+def test_top_k_assigns_exactly_like_greedy(seed, adjusted, top_k):
+    # Three subjects give many tied scores, and 80 students contend for at most 20 seats per slot
+    engine, capacity = random_engine(np.random.default_rng(seed), 80, 10, adjusted)
+    greedy_capacity = CapacityTable(capacity.max_capacity.max(axis=1), engine.teacher_slots, len(TIME_SLOTS))
+    student_idx, teacher_idx, slot_idx, scores = engine.candidate_pairs()
+    accepted, _ = assign_greedy(student_idx, teacher_idx, slot_idx, scores, greedy_capacity)
+
+    top_students, top_teachers, top_slots, _, _ = assign_top_k(engine, capacity, top_k)
+    assert list(zip(top_students.tolist(), top_teachers.tolist(), top_slots.tolist())) == list(
+        zip(student_idx[accepted].tolist(), teacher_idx[accepted].tolist(), slot_idx[accepted].tolist()))
+    assert (capacity.remaining == 0).any() and np.array_equal(capacity.remaining, greedy_capacity.remaining)
+
+
+def test_teachers_with_different_adjustments_are_not_merged():
+    subject_vocab = Vocabulary(['Math'])
+    slot_vocab = Vocabulary(TIME_SLOTS, allowed=TIME_SLOTS)
+    math, morning = subject_vocab.encode(pd.Series(['Math'])), slot_vocab.encode(pd.Series(['Morning']))
+    adjustment = np.array([[-0.128, 0, 0], [0.1, 0, 0], [0.1, 0, 0]])
+    engine = CompatibilityEngine(np.repeat(math, 2, axis=0), np.repeat(morning, 2, axis=0),
+                                 np.repeat(math, 3, axis=0), np.repeat(morning, 3, axis=0),
+                                 [1, 2, 3], subject_vocab, slot_vocab, score_adjustment=adjustment)
+    profiles = engine.teacher_profiles()
+    assert profiles[0] != profiles[1] and profiles[1] == profiles[2]
+
+    capacity = CapacityTable([1, 1, 1], engine.teacher_slots, len(TIME_SLOTS))
+    _, teacher_idx, _, scores, _ = match_students(engine, capacity, 'optimal')
+    assert sorted(teacher_idx.tolist()) == [1, 2]
+    assert scores.sum() == pytest.approx(2.0)
@@ -0,0 +1,96 @@
+"""
+Tests for schedule exports: every format reads back as the schedule, with
+integer and with string ids.
+
+Run with `python -m pytest`.
+"""
+
+import contextlib
+import gzip
+import io
+import json
+import sys
+
+import pandas as pd
+import pytest
+
+from matching_export import SCHEDULE_COLUMNS
+from student_teacher_matcher import StudentTeacherMatcher
+
+
+@pytest.fixture(scope='module', params=[False, True], ids=['int_ids', 'string_ids'])
+def matcher(request, tmp_path_factory):
+    students, teachers = pd.read_csv('students.csv'), pd.read_csv('teachers.csv')
+    if request.param:
+        students['student_id'] = 'S' + students['student_id'].astype(str)
+        teachers['teacher_id'] = 'T' + teachers['teacher_id'].astype(str)
+    directory = tmp_path_factory.mktemp('inputs')
+    students.to_csv(directory / 'students.csv', index=False)
+    teachers.to_csv(directory / 'teachers.csv', index=False)
+
+    matcher = StudentTeacherMatcher()
+    with contextlib.redirect_stdout(io.StringIO()):
+        assert matcher.load_data(str(directory / 'students.csv'), str(directory / 'teachers.csv'))
+        matcher.preprocess_data()
+        matcher.create_matches()
+    assert matcher.schedule
+    return matcher
+
+
+def read_back(format_type: str, filename: str) -> pd.DataFrame:
+    if format_type == 'csv':
+        return pd.read_csv(filename)
+    if format_type == 'json':
+        with (gzip.open if filename.endswith('.gz') else open)(filename, 'rt') as f:
+            return pd.DataFrame(json.load(f))
+    if format_type == 'ndjson':
+        return pd.read_json(filename, lines=True)
+    if format_type == 'parquet':
+        return pd.read_parquet(filename)
+    import pyarrow as pa
+    with pa.ipc.open_stream(filename) as reader:
+        return reader.read_all().to_pandas()
+
+
+def normalized(frame: pd.DataFrame) -> pd.DataFrame:
+    """Plain Python values per column, so dictionary and string dtypes compare equal."""
+    return pd.DataFrame({column: [value.item() if hasattr(value, 'item') else value for value in frame[column]]
+                         for column in frame.columns})
+
+
+@pytest.mark.parametrize('format_type, suffix', [
+    ('csv', 'csv'), ('csv', 'csv.gz'), ('json', 'json'), ('json', 'json.gz'),
+    ('ndjson', 'ndjson'), ('ndjson', 'ndjson.gz'), ('parquet', 'parquet'), ('arrow', 'arrow'),
+])
+def test_export_round_trip(matcher, tmp_path, format_type, suffix):
+    if format_type in ('parquet', 'arrow'):
+        pytest.importorskip('pyarrow')
+    filename = str(tmp_path / f'schedule.{suffix}')
+    with contextlib.redirect_stdout(io.StringIO()):
+        assert matcher.export_schedule(format_type, filename, batch_size=3) == filename
+
+    frame = read_back(format_type, filename)
+    expected = (pd.DataFrame(matcher.schedule) if format_type == 'json'
+                else matcher.generate_schedule_dataframe()[SCHEDULE_COLUMNS])
+    assert list(frame.columns) == list(expected.columns)
+    pd.testing.assert_frame_equal(normalized(frame), normalized(expected), check_dtype=False)
+
+
+def test_columnar_id_types_follow_the_data(matcher, tmp_path):
+    pa = pytest.importorskip('pyarrow')
+    import pyarrow.parquet as pq
+    filename = str(tmp_path / 'schedule.parquet')
+    with contextlib.redirect_stdout(io.StringIO()):
+        matcher.export_schedule('parquet', filename, batch_size=3)
+    schema = pq.read_schema(filename)
+    string_ids = isinstance(matcher.schedule[0]['student_id'], str)
+    for name in ('student_id', 'teacher_id'):
+        assert schema.field(name).type == (pa.string() if string_ids else pa.int64())
+
+
+@pytest.mark.parametrize('format_type', ['parquet', 'arrow'])
+def test_columnar_exports_explain_missing_pyarrow(matcher, tmp_path, monkeypatch, format_type):
+    for module in ('pyarrow', 'pyarrow.parquet'):
+        monkeypatch.setitem(sys.modules, module, None)
+    with contextlib.redirect_stdout(io.StringIO()), pytest.raises(ImportError, match='need pyarrow'):
+        matcher.export_schedule(format_type, str(tmp_path / f'schedule.{format_type}'))
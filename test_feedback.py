@@ -0,0 +1,147 @@
+"""
+Tests for the feedback model and the append-only feedback log.
+
+Run with `python -m pytest`.
+"""
+
+import contextlib
+import io
+import json
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from matching_feedback import FeedbackModel
+from matching_feedback_log import FeedbackLog
+from student_teacher_matcher import StudentTeacherMatcher
+
+
+def ratings(n: int, seed: int, student_ids=None) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({'student_id': np.arange(n) if student_ids is None else student_ids,
+                         'teacher_id': rng.integers(1, 5, n),
+                         'time_slot': rng.choice(['Morning', 'Afternoon', 'Evening'], n),
+                         'rating': rng.integers(1, 6, n),
+                         'satisfaction_score': rng.random(n).round(3)})
+
+
+def model_state(model: FeedbackModel):
+    values, arrays = model.state()
+    return values, {name: array.tolist() for name, array in arrays.items()}
+
+
+def test_reopened_log_reads_back_every_batch(tmp_path):
+    log = FeedbackLog(str(tmp_path))
+    batches = [ratings(20, 0), ratings(15, 1)]
+    log.append(batches[0], term='spring')
+    log.append(batches[1], term='fall')
+
+    reopened = FeedbackLog(str(tmp_path))
+    assert len(reopened) == 35 and reopened.terms == ['spring', 'fall']
+    assert model_state(reopened.model) == model_state(log.model)
+    frame = reopened.read()
+    expected = pd.concat(batches, ignore_index=True)
+    for column in ('student_id', 'teacher_id', 'time_slot', 'rating'):
+        assert frame[column].tolist() == expected[column].tolist()
+    assert frame['term'].tolist() == ['spring'] * 20 + ['fall'] * 15
+
+
+def test_uncommitted_append_is_cut_off_on_reopen(tmp_path):
+    log = FeedbackLog(str(tmp_path))
+    log.append(ratings(10, 0))
+    committed = log.read()
+    # An append that died after writing columns but before replacing meta.json
+    with open(os.path.join(str(tmp_path), 'rating.bin'), 'ab') as f:
+        np.full(7, 3, dtype=np.int8).tofile(f)
+
+    reopened = FeedbackLog(str(tmp_path))
+    assert len(reopened) == 10
+    assert os.path.getsize(os.path.join(str(tmp_path), 'rating.bin')) == 10
+    assert reopened.read().equals(committed)
+    reopened.append(ratings(5, 1))
+    assert FeedbackLog(str(tmp_path)).read()['rating'].tolist()[:10] == committed['rating'].tolist()
+
+
+def test_string_student_ids_are_stored_as_codes(tmp_path):
+    log = FeedbackLog(str(tmp_path))
+    log.append(ratings(6, 0, student_ids=[f'S{i % 4}' for i in range(6)]))
+    log.append(ratings(3, 1, student_ids=['S9', None, 'S0']))
+    students = FeedbackLog(str(tmp_path)).read()['student_id']
+    assert students.isna().tolist() == [False] * 7 + [True, False]
+    assert students.dropna().tolist() == ['S0', 'S1', 'S2', 'S3', 'S0', 'S1', 'S9', 'S0']
+
+
+@pytest.mark.parametrize('bad', [
+    {'rating': 7},
+    {'rating': 'great'},
+    {'teacher_id': None},
+    {'satisfaction_score': 'high'},
+    {'student_id': 'S1'},
+])
+def test_bad_batch_leaves_log_and_model_unchanged(tmp_path, bad):
+    log = FeedbackLog(str(tmp_path))
+    log.append(ratings(10, 0))
+    before, sizes = model_state(log.model), sorted(entry.stat().st_size for entry in os.scandir(str(tmp_path)))
+    batch = ratings(5, 1).astype(object)
+    for column, value in bad.items():
+        batch.loc[2, column] = value
+
+    with pytest.raises(ValueError):
+        log.append(batch)
+    assert model_state(log.model) == before
+    assert sorted(entry.stat().st_size for entry in os.scandir(str(tmp_path))) == sizes
+    with open(os.path.join(str(tmp_path), 'meta.json')) as f:
+        assert json.load(f)['rows'] == 10
+
+
+def test_failed_write_is_rolled_back(tmp_path, monkeypatch):
+    log = FeedbackLog(str(tmp_path))
+    log.append(ratings(10, 0, student_ids=[f'S{i}' for i in range(10)]))
+    before, committed = model_state(log.model), log.read()
+
+    def fail(path, write):
+        raise OSError('disk full')
+    monkeypatch.setattr('matching_feedback_log._replace_file', fail)
+    with pytest.raises(OSError):
+        log.append(ratings(5, 1, student_ids=[f'X{i}' for i in range(5)]))
+    monkeypatch.undo()
+
+    assert model_state(log.model) == before and len(log) == 10
+    log.append(ratings(5, 2, student_ids=[f'Y{i}' for i in range(5)]))
+    frame = FeedbackLog(str(tmp_path)).read()
+    assert frame.iloc[:10].equals(committed)
+    assert frame['student_id'].iloc[10:].tolist() == [f'Y{i}' for i in range(5)]
+
+
+def test_simulated_batch_is_logged_once(tmp_path):
+    matcher = StudentTeacherMatcher(feedback_log=str(tmp_path), seed=0)
+    with contextlib.redirect_stdout(io.StringIO()):
+        assert matcher.load_data('students.csv', 'teachers.csv')
+        matcher.preprocess_data()
+        matcher.create_matches()
+        feedback = matcher.simulate_feedback()
+        assert len(matcher.feedback_log) == 0
+        model = matcher.learn_feedback()
+    assert len(matcher.feedback_log) == len(feedback) == model.total_ratings
+
+
+def test_learn_feedback_logs_terms_and_trends_have_one_layout(tmp_path):
+    logged = StudentTeacherMatcher(feedback_log=str(tmp_path), seed=0)
+    plain = StudentTeacherMatcher(seed=0)
+    with contextlib.redirect_stdout(io.StringIO()):
+        for matcher in (logged, plain):
+            assert matcher.load_data('students.csv', 'teachers.csv')
+            matcher.preprocess_data()
+            matcher.create_matches()
+        logged.learn_feedback(ratings(12, 0), term='spring')
+        logged.learn_feedback(ratings(8, 1), term='fall')
+        plain.feedback_data = ratings(8, 1).to_dict('records')
+        plain.learn_feedback()
+        trends = logged.analyze_feedback_trends(), plain.analyze_feedback_trends()
+
+    assert logged.feedback_log.terms == ['spring', 'fall']
+    assert logged.feedback_log.read()['term'].tolist() == ['spring'] * 12 + ['fall'] * 8
+    assert [list(frame.columns) for frame in trends] == [['teacher_id', 'ratings', 'avg_rating']] * 2
+    assert trends[0]['ratings'].sum() == 20 and trends[1]['ratings'].sum() == 8
@@ -0,0 +1,80 @@
+"""
+Tests for canonical preprocessing and content fingerprints: equivalent
+inputs in any row and token order give the same schedule on every path.
+
+Run with `python -m pytest`.
+"""
+
+import contextlib
+import io
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from student_teacher_matcher import StudentTeacherMatcher
+
+LIST_COLUMNS = ('subjects', 'preferred_time_slots', 'available_time_slots')
+
+
+def shuffled(frame: pd.DataFrame, seed: int) -> pd.DataFrame:
+    """An equivalent frame: rows, columns and comma-separated tokens in random order."""
+    rng = np.random.default_rng(seed)
+    frame = frame.iloc[rng.permutation(len(frame))].reset_index(drop=True)
+    frame = frame[list(rng.permutation(frame.columns))]
+    for column in LIST_COLUMNS:
+        if column in frame:
+            frame[column] = [','.join(rng.permutation(cell.split(','))) for cell in frame[column]]
+    return frame
+
+
+def write_shuffled(directory, seed: int):
+    paths = str(directory / f'students_{seed}.csv'), str(directory / f'teachers_{seed}.csv')
+    shuffled(pd.read_csv('students.csv'), seed).to_csv(paths[0], index=False)
+    shuffled(pd.read_csv('teachers.csv'), seed + 100).to_csv(paths[1], index=False)
+    return paths
+
+
+def run(paths, how: str):
+    """Schedule and fingerprints of matching `paths` through one ingest path."""
+    matcher = StudentTeacherMatcher(seed=0)
+    with contextlib.redirect_stdout(io.StringIO()):
+        if how == 'stream':
+            # One chunk: the order chunks arrive in decides who gets first pick
+            for _ in matcher.stream_matches(*paths, chunksize=10 ** 6):
+                pass
+        else:
+            assert matcher.load_data(*paths, chunksize=None if how == 'full' else int(how))
+            matcher.preprocess_data()
+            matcher.create_matches()
+    return pd.DataFrame(matcher.schedule), matcher.fingerprints()
+
+
+@pytest.mark.parametrize('how', ['full', '3', '500', 'stream'])
+def test_shuffled_inputs_give_the_same_schedule(tmp_path, how):
+    schedule, digests = run(('students.csv', 'teachers.csv'), how)
+    for seed in range(3):
+        shuffled_schedule, shuffled_digests = run(write_shuffled(tmp_path, seed), how)
+        assert shuffled_schedule.equals(schedule)
+        assert shuffled_digests == digests
+
+
+def test_chunked_reads_match_the_full_read(tmp_path):
+    paths = write_shuffled(tmp_path, 7)
+    schedule, digests = run(paths, 'full')
+    for how in ('3', '500'):
+        chunked_schedule, chunked_digests = run(paths, how)
+        assert chunked_schedule.equals(schedule)
+        assert chunked_digests == digests
+
+
+def test_added_rows_are_processed_in_id_order():
+    matcher = StudentTeacherMatcher(seed=0)
+    with contextlib.redirect_stdout(io.StringIO()):
+        assert matcher.load_data('students.csv', 'teachers.csv')
+        matcher.preprocess_data()
+        matcher.create_matches()
+    rows = pd.read_csv('students.csv').assign(student_id=lambda frame: frame['student_id'] + 1000)
+    encoded = [matcher._encode_rows(frame, 'students') for frame in (rows, shuffled(rows, 3))]
+    assert encoded[0].frame['student_id'].tolist() == encoded[1].frame['student_id'].tolist()
+    assert np.array_equal(encoded[0].subjects, encoded[1].subjects)
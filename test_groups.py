@@ -0,0 +1,59 @@
+"""
+Tests for group packing: it keeps every match and its teacher, respects
+capacity and makes groups more cohesive.
+
+Run with `python -m pytest`.
+"""
+
+import contextlib
+import io
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from matching_groups import group_quality
+from student_teacher_matcher import StudentTeacherMatcher
+
+
+def grouped(students: pd.DataFrame, teachers: pd.DataFrame, group_packing: bool, time_grid: bool = False,
+            strategy: str = 'greedy'):
+    matcher = StudentTeacherMatcher(time_grid=time_grid)
+    matcher.students_df, matcher.teachers_df = students, teachers
+    with contextlib.redirect_stdout(io.StringIO()):
+        matcher.preprocess_data()
+        matcher.create_matches(strategy, group_packing=group_packing)
+    live = matcher.live_schedule
+    matched = np.flatnonzero(live.teacher >= 0)
+    quality = group_quality(live.engine, matcher._student_grades(), matched, live.teacher[matched],
+                            live.slot[matched])
+    return matcher, quality
+
+
+def test_packing_regroups_students_placed_too_early():
+    # Grade 1 and 10 students take the only slots open to their neighbours first
+    students = pd.DataFrame({'student_id': [1, 2, 3, 4], 'name': ['A', 'B', 'C', 'D'], 'grade': [1, 2, 9, 10],
+                             'subjects': 'Math', 'preferred_time_slots': ['Morning,Afternoon', 'Afternoon',
+                                                                          'Morning,Afternoon', 'Morning']})
+    teachers = pd.DataFrame({'teacher_id': [1], 'name': ['T1'], 'subjects': ['Math'],
+                             'available_time_slots': ['Morning,Afternoon'], 'max_students_per_slot': [2]})
+    packed, quality = grouped(students, teachers, group_packing=True, strategy='optimal')
+
+    slots = {match['student_id']: match['time_slot'] for match in packed.schedule}
+    assert slots == {1: 'Afternoon', 2: 'Afternoon', 3: 'Morning', 4: 'Morning'}
+    assert quality['mean_grade_spread'] == 1.0 and quality['lessons'] == 2
+
+
+@pytest.mark.parametrize('time_grid', [False, True])
+def test_packing_is_more_cohesive_on_synthetic_data(time_grid):
+    from benchmarks.synthetic import generate_data
+    students, teachers = generate_data(2000, 100, 42, time_grid=time_grid)
+    plain, before = grouped(students, teachers, False, time_grid)
+    packed, after = grouped(students, teachers, True, time_grid)
+
+    assert np.array_equal(packed.live_schedule.teacher, plain.live_schedule.teacher)
+    assert (packed.live_schedule.capacity.remaining >= 0).all()
+    assert after['lessons'] <= before['lessons']
+    # Most of the spread is forced by which slots students can use at all
+    assert after['mean_grade_spread'] < (0.6 if time_grid else 0.95) * before['mean_grade_spread']
+    assert after['shared_focus_rate'] >= before['shared_focus_rate']
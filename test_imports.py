@@ -0,0 +1,19 @@
+"""
+Tests that importing the matcher leaves on-demand modules unloaded.
+
+Run with `python -m pytest`.
+"""
+
+import os
+import subprocess
+import sys
+
+from benchmarks.bench_import import FORBIDDEN
+
+
+def test_matcher_import_skips_on_demand_modules():
+    root = os.path.dirname(os.path.abspath(__file__))
+    result = subprocess.run([sys.executable, '-c', 'import sys, student_teacher_matcher; print(*sys.modules)'],
+                            cwd=root, capture_output=True, text=True, check=True)
+    loaded = {name.split('.')[0] for name in result.stdout.split()}
+    assert not loaded & set(FORBIDDEN)
@@ -0,0 +1,103 @@
+"""
+Tests for incremental re-matching: after every round of `apply_changes` the
+live schedule must be one a full re-match could have produced.
+
+Run with `python -m pytest`.
+"""
+
+import contextlib
+import io
+from collections import Counter
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from benchmarks.synthetic import generate_data
+from student_teacher_matcher import StudentTeacherMatcher
+
+
+def cells(value: str) -> set:
+    return {token.strip() for token in value.split(',')}
+
+
+def full_match(students: pd.DataFrame, teachers: pd.DataFrame) -> StudentTeacherMatcher:
+    matcher = StudentTeacherMatcher()
+    matcher.students_df, matcher.teachers_df = students.reset_index(drop=True), teachers.reset_index(drop=True)
+    with contextlib.redirect_stdout(io.StringIO()):
+        matcher.preprocess_data()
+        matcher.create_matches()
+    return matcher
+
+
+def check_invariants(matcher: StudentTeacherMatcher, students: pd.DataFrame, teachers: pd.DataFrame):
+    """The live schedule against the raw rows it must satisfy and a full re-match of them."""
+    students, teachers = students.set_index('student_id'), teachers.set_index('teacher_id')
+    schedule = matcher.schedule
+    assert sorted(matcher.processed_students['student_id']) == sorted(students.index)
+    assert sorted(matcher.processed_teachers['teacher_id']) == sorted(teachers.index)
+
+    # One lesson per student, only with existing rows, within capacity
+    assert len({match['student_id'] for match in schedule}) == len(schedule)
+    seats = Counter((match['teacher_id'], match['time_slot']) for match in schedule)
+    for (teacher_id, _), taken in seats.items():
+        assert taken <= teachers.loc[teacher_id, 'max_students_per_slot']
+
+    # Every lesson is compatible and scored as a full match would score it
+    for match in schedule:
+        student, teacher = students.loc[match['student_id']], teachers.loc[match['teacher_id']]
+        assert match['time_slot'] in cells(student['preferred_time_slots']) & cells(teacher['available_time_slots'])
+        shared = cells(student['subjects']) & cells(teacher['subjects'])
+        assert cells(match['subjects']) == shared
+        expected = matcher.calculate_subject_compatibility(list(cells(student['subjects'])),
+                                                           list(cells(teacher['subjects'])))
+        assert match['compatibility_score'] == pytest.approx(expected, abs=1e-3)
+
+    # Live seats point at their schedule entries
+    live = matcher.live_schedule
+    ids = matcher.processed_students['student_id'].to_numpy()
+    for student in np.flatnonzero(live.teacher >= 0).tolist():
+        assert schedule[live.entry[student]]['student_id'] == ids[student]
+    assert int((live.teacher >= 0).sum()) == len(schedule)
+
+    # Repairs keep nearly as many students matched as starting over, and the metrics match a recount
+    rematched = full_match(students.reset_index(), teachers.reset_index())
+    assert len(schedule) >= 0.95 * len(rematched.schedule)
+    with contextlib.redirect_stdout(io.StringIO()):
+        metrics = matcher.calculate_metrics()
+    assert metrics['total_lessons'] == len(schedule)
+    assert dict(metrics['time_slot_distribution']) == dict(Counter(match['time_slot'] for match in schedule))
+    assert metrics['matched_students'] == len(schedule)
+
+
+@pytest.mark.parametrize('seed', [0, 1])
+def test_apply_changes_keeps_schedule_valid(seed):
+    rng = np.random.default_rng(seed)
+    students, teachers = generate_data(300, 15, seed)
+    extra_students, extra_teachers = generate_data(40, 40, seed + 100)
+    extra_students['student_id'] += 1000
+    extra_teachers['teacher_id'] += 1000
+    matcher = full_match(students, teachers)
+
+    for round_ in range(8):
+        added_students = extra_students.iloc[5 * round_:5 * round_ + 5]
+        added_teacher = extra_teachers.iloc[[round_]]
+        removed_students = rng.choice(students['student_id'], 4, replace=False).tolist()
+        removed_teacher = [int(rng.choice(teachers['teacher_id']))]
+        kept_teachers = teachers[~teachers['teacher_id'].isin(removed_teacher)]
+        updated_teacher = extra_teachers.iloc[[20 + round_]].assign(teacher_id=int(rng.choice(kept_teachers['teacher_id'])))
+        updated_student = extra_students.iloc[[35]].assign(
+            student_id=int(rng.choice(students.loc[~students['student_id'].isin(removed_students), 'student_id'])))
+
+        with contextlib.redirect_stdout(io.StringIO()):
+            matcher.apply_changes(added={'students': added_students, 'teachers': added_teacher},
+                                  removed={'students': removed_students, 'teachers': removed_teacher},
+                                  updated={'students': updated_student, 'teachers': updated_teacher})
+
+        students = pd.concat([students[~students['student_id'].isin(removed_students)], added_students])
+        students = pd.concat([students[students['student_id'] != updated_student['student_id'].iloc[0]],
+                              updated_student])
+        teachers = pd.concat([kept_teachers, added_teacher])
+        teachers = pd.concat([teachers[teachers['teacher_id'] != updated_teacher['teacher_id'].iloc[0]],
+                              updated_teacher])
+        check_invariants(matcher, students, teachers)
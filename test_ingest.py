@@ -0,0 +1,66 @@
+"""
+Tests for chunked CSV ingest and its agreement with full reads.
+
+Run with `python -m pytest`.
+"""
+
+import contextlib
+import io
+
+import pandas as pd
+import pytest
+
+from student_teacher_matcher import StudentTeacherMatcher
+
+
+def write_inputs(directory, string_ids: bool, optional_columns: bool):
+    students, teachers = pd.read_csv('students.csv'), pd.read_csv('teachers.csv')
+    if string_ids:
+        students['student_id'] = 'S' + students['student_id'].astype(str)
+        teachers['teacher_id'] = 'T' + teachers['teacher_id'].astype(str)
+    if not optional_columns:
+        students = students.drop(columns='grade')
+        teachers = teachers.drop(columns='max_students_per_slot')
+    paths = str(directory / 'students.csv'), str(directory / 'teachers.csv')
+    students.to_csv(paths[0], index=False)
+    teachers.to_csv(paths[1], index=False)
+    return paths
+
+
+def matched(paths, chunksize):
+    matcher = StudentTeacherMatcher()
+    with contextlib.redirect_stdout(io.StringIO()):
+        assert matcher.load_data(*paths, chunksize=chunksize)
+        matcher.preprocess_data()
+        matcher.create_matches()
+    return matcher
+
+
+@pytest.mark.parametrize('optional_columns', [True, False])
+@pytest.mark.parametrize('string_ids', [True, False])
+def test_chunked_and_full_reads_accept_the_same_inputs(tmp_path, string_ids, optional_columns):
+    paths = write_inputs(tmp_path, string_ids, optional_columns)
+    full, chunked = matched(paths, None), matched(paths, 3)
+
+    for kind, column in (('processed_students', 'student_id'), ('processed_teachers', 'teacher_id')):
+        ids = getattr(chunked, kind)[column]
+        assert ids.tolist() == getattr(full, kind)[column].tolist()
+        assert (ids.dtype.kind == 'i') != string_ids
+    assert pd.DataFrame(chunked.schedule).equals(pd.DataFrame(full.schedule))
+    assert chunked.fingerprints() == full.fingerprints()
+
+
+def test_chunked_read_reports_missing_required_columns(tmp_path):
+    students, teachers = write_inputs(tmp_path, string_ids=False, optional_columns=True)
+    pd.read_csv(students).drop(columns='subjects').to_csv(students, index=False)
+    matcher = StudentTeacherMatcher()
+    with contextlib.redirect_stdout(io.StringIO()) as output:
+        assert not matcher.load_data(students, teachers, chunksize=3)
+    assert 'subjects' in output.getvalue()
+
+
+def test_missing_capacity_defaults_to_two(tmp_path):
+    paths = write_inputs(tmp_path, string_ids=False, optional_columns=False)
+    for chunksize in (None, 3):
+        capacity = matched(paths, chunksize).processed_teachers['max_students_per_slot']
+        assert (capacity == 2).all()
@@ -0,0 +1,64 @@
+"""
+Tests that schedule metrics and chart data follow every schedule change.
+
+Run with `python -m pytest`.
+"""
+
+import contextlib
+import io
+
+import pytest
+
+from matching_plots import analysis_data, teacher_data
+from student_teacher_matcher import StudentTeacherMatcher
+
+
+@pytest.fixture
+def matcher():
+    matcher = StudentTeacherMatcher(seed=0)
+    with contextlib.redirect_stdout(io.StringIO()):
+        assert matcher.load_data('students.csv', 'teachers.csv')
+        matcher.preprocess_data()
+        matcher.create_matches()
+        matcher.calculate_metrics()
+    return matcher
+
+
+def recounted(matcher) -> dict:
+    """Metrics of a fresh matcher given the same schedule."""
+    fresh = StudentTeacherMatcher()
+    fresh.subject_vocab, fresh.encoded_students = matcher.subject_vocab, matcher.encoded_students
+    fresh.processed_students, fresh.processed_teachers = matcher.processed_students, matcher.processed_teachers
+    fresh.schedule = [dict(match) for match in matcher.schedule]
+    with contextlib.redirect_stdout(io.StringIO()):
+        return fresh.calculate_metrics()
+
+
+def test_replacing_the_schedule_with_as_many_entries_invalidates_metrics(matcher):
+    before = matcher.metrics
+    schedule = [dict(match) for match in matcher.schedule]
+    for match in schedule:
+        match['time_slot'] = 'Evening'
+    version = matcher.schedule_version
+    matcher.schedule = schedule
+    assert matcher.schedule_version > version and matcher.schedule_metrics is None
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        metrics = matcher.calculate_metrics()
+    assert metrics['total_lessons'] == before['total_lessons']
+    assert dict(metrics['time_slot_distribution']) == {'Evening': len(schedule)}
+    assert dict(analysis_data(matcher)['time_slots']) == {'Evening': len(schedule)}
+
+
+def test_chart_data_follows_apply_changes(matcher):
+    with contextlib.redirect_stdout(io.StringIO()):
+        diff = matcher.apply_changes(removed={'teachers': [matcher.schedule[0]['teacher_id']]})
+    assert diff['removed'] or diff['changed']
+    assert matcher.metrics_version != matcher.schedule_version
+
+    data = analysis_data(matcher)
+    expected = recounted(matcher)
+    assert matcher.metrics_version == matcher.schedule_version
+    assert data['matched'] == expected['matched_students']
+    assert data['time_slots'] == dict(expected['time_slot_distribution'])
+    assert sum(teacher_data(matcher)['usage']) == len(matcher.schedule)
@@ -0,0 +1,72 @@
+"""
+Tests for chart rendering: headless charts are written once, skipped while
+their data is unchanged and redrawn when forced or when the schedule changes.
+
+Run with `python -m pytest`.
+"""
+
+import contextlib
+import io
+import json
+import os
+
+import numpy as np
+import pytest
+
+from benchmarks.synthetic import generate_data
+from matching_plots import (ANALYSIS_CHART, HASH_FILE, TOP_TEACHERS, UTILIZATION_CHART, create_visualizations,
+                            teacher_data)
+from student_teacher_matcher import StudentTeacherMatcher
+
+
+@pytest.fixture
+def matcher():
+    students, teachers = generate_data(300, TOP_TEACHERS + 10, 13)
+    matcher = StudentTeacherMatcher()
+    matcher.students_df, matcher.teachers_df = students, teachers
+    with contextlib.redirect_stdout(io.StringIO()):
+        matcher.preprocess_data()
+        matcher.create_matches()
+        matcher.calculate_metrics()
+    return matcher
+
+
+def render(matcher, directory, **options):
+    """Chart paths and modification times after a headless run."""
+    with contextlib.redirect_stdout(io.StringIO()):
+        paths = create_visualizations(matcher, str(directory), headless=True, workers=2, dpi=40, **options)
+    return paths, {os.path.basename(path): os.stat(path).st_mtime_ns for path in paths}
+
+
+def test_headless_charts_are_skipped_until_forced_or_changed(matcher, tmp_path, monkeypatch):
+    monkeypatch.setenv('MPLBACKEND', 'Agg')
+    paths, first = render(matcher, tmp_path)
+    assert sorted(os.path.basename(path) for path in paths) == sorted([ANALYSIS_CHART, UTILIZATION_CHART])
+    with open(tmp_path / HASH_FILE) as f:
+        assert set(json.load(f)) == {ANALYSIS_CHART, UTILIZATION_CHART}
+
+    # Unchanged data draws nothing
+    assert render(matcher, tmp_path)[1] == first
+
+    forced = render(matcher, tmp_path, force=True)[1]
+    assert all(forced[name] > first[name] for name in first)
+
+    # A changed schedule redraws
+    with contextlib.redirect_stdout(io.StringIO()):
+        matcher.apply_changes(removed={'students': [match['student_id'] for match in matcher.schedule[:20]]})
+    changed = render(matcher, tmp_path)[1]
+    assert all(changed[name] > forced[name] for name in forced)
+
+
+def test_teacher_data_keeps_the_busiest_teachers_and_a_histogram(matcher):
+    data = teacher_data(matcher)
+    usage = np.bincount([matcher.processed_teachers['teacher_id'].tolist().index(match['teacher_id'])
+                         for match in matcher.schedule], minlength=len(matcher.processed_teachers))
+
+    assert data['teachers'] == len(matcher.processed_teachers) > TOP_TEACHERS
+    assert len(data['names']) == len(data['usage']) == TOP_TEACHERS
+    assert data['usage'] == sorted(usage.tolist(), reverse=True)[:TOP_TEACHERS]
+    assert data['teachers_by_usage'] == np.bincount(usage).tolist()
+
+    few = teacher_data(matcher, top=len(usage))
+    assert 'teachers_by_usage' not in few and few['usage'] == usage.tolist()
@@ -0,0 +1,91 @@
+"""
+Tests for what-if scenarios: a teacher delta evaluated against shared base
+students gives the metrics of matching the changed data from scratch, and
+leaves the base matcher as it was.
+
+Run with `python -m pytest`.
+"""
+
+import contextlib
+import copy
+import io
+from multiprocessing import shared_memory
+
+import numpy as np
+import pytest
+
+import matching_scenarios
+from benchmarks.synthetic import generate_data
+from student_teacher_matcher import StudentTeacherMatcher
+
+
+def fresh_metrics(students, teachers, **options):
+    matcher = StudentTeacherMatcher()
+    matcher.students_df, matcher.teachers_df = students.copy(), teachers.copy()
+    with contextlib.redirect_stdout(io.StringIO()):
+        matcher.preprocess_data()
+        matcher.create_matches(**options)
+        return matcher.calculate_metrics()
+
+
+def assert_same_metrics(table, name, metrics):
+    row = table.loc[name]
+    for key, value in metrics.items():
+        if isinstance(value, dict):
+            for inner, count in dict(value).items():
+                assert row[f'{key}.{inner}'] == pytest.approx(count), f'{key}.{inner}'
+        else:
+            assert row[key] == pytest.approx(value), key
+
+
+@pytest.fixture(scope='module')
+def base():
+    students, teachers = generate_data(400, 20, 5)
+    matcher = StudentTeacherMatcher()
+    matcher.students_df, matcher.teachers_df = students, teachers
+    with contextlib.redirect_stdout(io.StringIO()):
+        matcher.preprocess_data()
+        matcher.create_matches()
+    return matcher, students, teachers
+
+
+@pytest.mark.parametrize('workers', [1, 2])
+def test_scenarios_match_a_fresh_load_of_the_changed_teachers(base, workers, monkeypatch):
+    matcher, students, teachers = base
+    removed = teachers['teacher_id'].iloc[[0, 4, 9]].tolist()
+    updated = teachers.iloc[[2, 3]][['teacher_id']].assign(max_students_per_slot=[1, 6])
+    scenarios = [{'name': 'fewer', 'removed': {'teachers': removed}},
+                 {'name': 'resized', 'updated': {'teachers': updated}}]
+
+    # Record the shared memory blocks of pooled runs
+    segments = []
+
+    class RecordedArrays(matching_scenarios.SharedArrays):
+        def __init__(self, arrays):
+            super().__init__(arrays)
+            segments.extend(name for name, _, _ in self.spec.values())
+
+    monkeypatch.setattr(matching_scenarios, 'SharedArrays', RecordedArrays)
+    schedule, version = copy.deepcopy(matcher.schedule), matcher.schedule_version
+    subjects, slots = matcher.encoded_students.subjects.copy(), matcher.encoded_teachers.slots.copy()
+    vocab_sizes = len(matcher.subject_vocab), len(matcher.slot_vocab)
+    with contextlib.redirect_stdout(io.StringIO()):
+        table = matcher.what_if(scenarios, workers=workers)
+
+    assert list(table.index) == ['base', 'fewer', 'resized']
+    assert table.loc['fewer', 'total_lessons'] < table.loc['base', 'total_lessons']
+    assert_same_metrics(table, 'base', fresh_metrics(students, teachers))
+    assert_same_metrics(table, 'fewer', fresh_metrics(students, teachers[~teachers['teacher_id'].isin(removed)]))
+    resized = teachers.copy()
+    resized.loc[resized.index[[2, 3]], 'max_students_per_slot'] = [1, 6]
+    assert_same_metrics(table, 'resized', fresh_metrics(students, resized))
+
+    # The base matcher is untouched and no shared memory outlives the call
+    assert matcher.schedule == schedule and matcher.schedule_version == version
+    assert np.array_equal(matcher.encoded_students.subjects, subjects)
+    assert np.array_equal(matcher.encoded_teachers.slots, slots)
+    assert (len(matcher.subject_vocab), len(matcher.slot_vocab)) == vocab_sizes
+    assert bool(segments) == (workers > 1)
+    for name in segments:
+        with pytest.raises(FileNotFoundError):
+            shared_memory.SharedMemory(name=name)
@@ -0,0 +1,80 @@
+"""
+Tests for the HTTP matching service handlers and /match batching.
+
+Run with `python -m pytest`.
+"""
+
+import asyncio
+import contextlib
+import io
+import json
+
+import pytest
+
+from matching_service import MatchingService
+
+
+@pytest.fixture
+def service():
+    with contextlib.redirect_stdout(io.StringIO()):
+        return MatchingService.from_files('students.csv', 'teachers.csv')
+
+
+def new_student(student_id):
+    return {'student_id': student_id, 'name': f'Student {student_id}', 'grade': 7, 'subjects': 'Math',
+            'preferred_time_slots': 'Morning'}
+
+
+async def batched(service, bodies):
+    """Queue /match bodies while another request holds the matcher, then serve them as one batch."""
+    await service._lock.acquire()
+    requests = [asyncio.ensure_future(service.handle('POST', '/match', json.dumps(body).encode()))
+                for body in bodies]
+    await asyncio.sleep(0)
+    service._lock.release()
+    return await asyncio.gather(*requests)
+
+
+def test_bad_body_does_not_fail_its_batch(service):
+    responses = asyncio.run(batched(service, [[1, 2], {'students': [new_student(1001)]}, {'students': 'x'}]))
+    assert [status for status, _ in responses] == [400, 200, 400]
+    payload = responses[1][1]
+    assert [entry['student_id'] for entry in payload['matched']] + payload['unmatched'] == [1001]
+
+
+def test_batch_error_reaches_every_request(service, monkeypatch):
+    def fail(**changes):
+        raise RuntimeError('matcher failed')
+    monkeypatch.setattr(service.matcher, 'apply_changes', fail)
+    responses = asyncio.run(batched(service, [{'students': [new_student(1001)]}, {'students': [new_student(1002)]}]))
+    assert [status for status, _ in responses] == [500, 500]
+    assert all('matcher failed' in payload['error'] for _, payload in responses)
+
+
+def test_duplicate_ids_within_a_batch(service):
+    responses = asyncio.run(batched(service, [{'students': [new_student(1001)]}, {'students': [new_student(1001)]}]))
+    assert [status for status, _ in responses] == [200, 409]
+
+
+def test_requests_after_a_batch_still_served(service):
+    asyncio.run(batched(service, [[1, 2]]))
+    body = json.dumps({'students': [new_student(1003)]}).encode()
+    status, payload = asyncio.run(service.handle('POST', '/match', body))
+    assert status == 200
+    status, payload = asyncio.run(service.handle('GET', '/schedule?student_id=1003', b''))
+    assert status == 200 and payload['total'] == len(payload['entries'])
+
+
+def test_changes_rejects_non_object_body(service):
+    status, _ = asyncio.run(service.handle('POST', '/changes', b'[1, 2]'))
+    assert status == 400
+
+
+def test_requests_print_only_when_verbose(service, capsys):
+    capsys.readouterr()
+    status, _ = asyncio.run(service.handle('POST', '/match', json.dumps({'students': [new_student(1001)]}).encode()))
+    assert status == 200 and capsys.readouterr().out == ''
+
+    service.matcher.verbose = True
+    status, _ = asyncio.run(service.handle('POST', '/match', json.dumps({'students': [new_student(1002)]}).encode()))
+    assert status == 200 and 'Applied changes' in capsys.readouterr().out
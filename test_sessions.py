@@ -0,0 +1,82 @@
+"""
+Tests for multi-session matching: students get up to `max_sessions`
+single-subject lessons, never two at once, within teacher capacity.
+
+Run with `python -m pytest`.
+"""
+
+import contextlib
+import io
+from collections import Counter
+
+import numpy as np
+import pytest
+
+from benchmarks.synthetic import generate_data
+from matching_engine import CapacityTable
+from matching_sessions import assign_sessions
+from student_teacher_matcher import StudentTeacherMatcher
+
+
+def cells(value: str) -> set:
+    return {token.strip() for token in value.split(',')}
+
+
+def matched(students, teachers, **options):
+    matcher = StudentTeacherMatcher()
+    matcher.students_df, matcher.teachers_df = students, teachers
+    with contextlib.redirect_stdout(io.StringIO()):
+        matcher.preprocess_data()
+        matcher.create_matches(**options)
+    return matcher
+
+
+@pytest.mark.parametrize('max_sessions', [2, 3])
+def test_sessions_keep_students_teachers_and_seats_apart(max_sessions):
+    students, teachers = generate_data(200, 60, 7, n_subjects=4)
+    matcher = matched(students, teachers, max_sessions=max_sessions)
+    students, teachers = students.set_index('student_id'), teachers.set_index('teacher_id')
+    schedule = matcher.schedule
+
+    # At most max_sessions lessons per student, never two in one slot, each on another subject
+    lessons = Counter(match['student_id'] for match in schedule)
+    assert max(lessons.values()) <= max_sessions and sum(count > 1 for count in lessons.values()) > 10
+    assert len({(match['student_id'], match['time_slot']) for match in schedule}) == len(schedule)
+    assert len({(match['student_id'], match['subjects']) for match in schedule}) == len(schedule)
+
+    # Seats of every teacher time slot respected
+    seats = Counter((match['teacher_id'], match['time_slot']) for match in schedule)
+    for (teacher_id, _), taken in seats.items():
+        assert taken <= teachers.loc[teacher_id, 'max_students_per_slot']
+
+    for match in schedule:
+        student, teacher = students.loc[match['student_id']], teachers.loc[match['teacher_id']]
+        # One subject per lesson, wanted by the student and taught by the teacher
+        assert ',' not in match['subjects']
+        assert match['subjects'] in cells(student['subjects'])
+        assert match['subjects'] in cells(teacher['subjects'])
+        assert match['time_slot'] in cells(student['preferred_time_slots'])
+        assert match['time_slot'] in cells(teacher['available_time_slots'])
+
+    # More lessons than single-session matching books
+    assert len(schedule) > len(matched(students.reset_index(), teachers.reset_index()).schedule)
+
+
+def test_one_session_reproduces_the_single_session_schedule():
+    students, teachers = generate_data(200, 60, 7, n_subjects=4)
+    single = matched(students, teachers)
+    assert single.schedule == matched(students, teachers, max_sessions=1).schedule
+
+    engine = single._build_engine()
+    capacity = CapacityTable(single.processed_teachers['max_students_per_slot'], engine.teacher_slots,
+                             len(engine.slots))
+    student_idx, teacher_idx, slot_idx, scores, _, _ = assign_sessions(engine, capacity, 1)
+    student_ids = single.processed_students['student_id'].to_numpy()
+    teacher_ids = single.processed_teachers['teacher_id'].to_numpy()
+    sessions = [(student, teacher, engine.slots[slot], round(score, 3))
+                for student, teacher, slot, score in zip(student_ids[student_idx].tolist(),
+                                                         teacher_ids[teacher_idx].tolist(),
+                                                         slot_idx.tolist(), scores.tolist())]
+    assert sessions == [(match['student_id'], match['teacher_id'], match['time_slot'], match['compatibility_score'])
+                        for match in single.schedule]
+    assert (capacity.remaining >= 0).all()
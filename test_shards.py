@@ -0,0 +1,67 @@
+"""
+Tests for sharded matching: merging independently solved shards gives the
+schedule a single pass gives.
+
+Run with `python -m pytest`.
+"""
+
+import contextlib
+import io
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from benchmarks.synthetic import generate_data
+from matching_shards import component_labels
+from student_teacher_matcher import StudentTeacherMatcher
+
+
+def split_population(seed: int):
+    """Synthetic data in which half of the rows teach and learn renamed subjects, so shards exist."""
+    students, teachers = generate_data(600, 40, seed)
+    for frame in (students, teachers):
+        frame['region'] = np.arange(len(frame)) % 2
+        renamed = frame['subjects'].str.split(',').map(lambda subjects: ','.join(s + ' II' for s in subjects))
+        frame['subjects'] = frame['subjects'].where(frame['region'] == 0, renamed)
+    return students, teachers
+
+
+def matched(students: pd.DataFrame, teachers: pd.DataFrame, strategy: str, **options):
+    matcher = StudentTeacherMatcher()
+    matcher.students_df, matcher.teachers_df = students, teachers
+    with contextlib.redirect_stdout(io.StringIO()):
+        matcher.preprocess_data()
+        matcher.create_matches(strategy, **options)
+    return matcher
+
+
+def rows(matcher: StudentTeacherMatcher):
+    return [(match['student_id'], match['teacher_id'], match['time_slot'], match['compatibility_score'],
+             match['lesson_type']) for match in matcher.schedule]
+
+
+@pytest.mark.parametrize('seed', [0, 1])
+def test_greedy_shards_merge_into_the_single_pass(seed):
+    students, teachers = split_population(seed)
+    single = matched(students, teachers, 'greedy')
+    engine = single.live_schedule.engine
+    student_labels, _ = component_labels([engine.student_subjects, engine.teacher_subjects],
+                                         [engine.student_slots, engine.teacher_slots], len(engine.slots))
+    assert len(np.unique(student_labels[student_labels >= 0])) > 1
+
+    assert rows(matched(students, teachers, 'greedy', workers=2)) == rows(single)
+    # Regions follow the subject split, so splitting by them changes nothing either
+    assert rows(matched(students, teachers, 'greedy', workers=2, shard_column='region')) == rows(single)
+
+
+@pytest.mark.parametrize('seed', [0, 1])
+def test_optimal_shards_reach_the_single_pass_optimum(seed):
+    students, teachers = split_population(seed)
+    single = matched(students, teachers, 'optimal')
+    sharded = matched(students, teachers, 'optimal', workers=2)
+
+    assert len(sharded.schedule) == len(single.schedule)
+    total = sum(match['compatibility_score'] for match in single.schedule)
+    assert sum(match['compatibility_score'] for match in sharded.schedule) == pytest.approx(total)
+    assert len({match['student_id'] for match in sharded.schedule}) == len(sharded.schedule)
@@ -0,0 +1,72 @@
+"""
+Tests for stage instrumentation: instrumented matching records stage times
+and counters, profiling and memory tracing are opt-in, and none of it
+changes the schedule.
+
+Run with `python -m pytest`.
+"""
+
+import contextlib
+import io
+import json
+import sys
+import tracemalloc
+
+import pytest
+
+from benchmarks.synthetic import generate_data
+from student_teacher_matcher import StudentTeacherMatcher
+
+
+def matched(**options):
+    students, teachers = generate_data(300, 15, 11)
+    matcher = StudentTeacherMatcher(**options)
+    matcher.students_df, matcher.teachers_df = students, teachers
+    with contextlib.redirect_stdout(io.StringIO()):
+        matcher.preprocess_data()
+        matcher.create_matches()
+    return matcher
+
+
+def test_instrumented_matching_records_stages_and_counts():
+    matcher = matched(instrument=True)
+    stages, counters = matcher.stats.stages, matcher.stats.counters
+
+    for path in ('preprocess_data', 'create_matches', 'create_matches.engine', 'create_matches.candidates',
+                 'create_matches.build_matches'):
+        assert stages[path]['calls'] == 1, path
+        assert stages[path]['wall_seconds'] >= 0 and stages[path]['cpu_seconds'] >= 0
+    assert stages['create_matches']['wall_seconds'] >= stages['create_matches.engine']['wall_seconds']
+    assert counters['students_assigned'] == len(matcher.schedule)
+    assert counters['candidates_generated'] >= len(matcher.schedule)
+
+    # Repeated calls aggregate, and the export is plain JSON
+    with contextlib.redirect_stdout(io.StringIO()):
+        matcher.create_matches()
+    assert stages['create_matches']['calls'] == 2
+    document = json.loads(matcher.stats.to_json())
+    assert set(document) == {'stages', 'counters'} and 'peak_bytes' not in document['stages']['create_matches']
+
+
+def test_stats_are_off_by_default():
+    matcher = matched()
+    assert not matcher.stats.enabled and not matcher.stats.profile and not matcher.stats.trace_memory
+    assert matcher.stats.stages == {} and dict(matcher.stats.counters) == {}
+    # Profiling and tracing without instrument stay off
+    assert not StudentTeacherMatcher(profile=True, trace_memory=True).stats.profile
+
+
+@pytest.mark.parametrize('options', [{'instrument': True}, {'instrument': True, 'profile': True},
+                                     {'instrument': True, 'trace_memory': True}])
+def test_instrumentation_does_not_change_the_schedule(options):
+    plain = matched()
+    instrumented = matched(**options)
+    assert instrumented.schedule == plain.schedule
+
+    document = instrumented.stats.to_dict()
+    assert ('profiles' in document) == options.get('profile', False)
+    if options.get('profile'):
+        assert document['profiles']['create_matches']
+    assert ('peak_bytes' in document['stages']['create_matches']) == options.get('trace_memory', False)
+    assert not tracemalloc.is_tracing()
+    assert sys.getprofile() is None
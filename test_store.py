@@ -0,0 +1,115 @@
+"""
+Tests for the SQLite store: bulk loads, schedule writes and the mirroring
+of incremental changes.
+
+Run with `python -m pytest`.
+"""
+
+import contextlib
+import io
+
+import pandas as pd
+import pytest
+
+from benchmarks.synthetic import generate_data
+from matching_store import MatchingStore
+from student_teacher_matcher import StudentTeacherMatcher
+
+
+def by_student(schedule):
+    return sorted(schedule, key=lambda match: (match['student_id'], match['teacher_id'], match['time_slot']))
+
+
+@pytest.fixture
+def store():
+    store = MatchingStore(':memory:')
+    yield store
+    store.close()
+
+
+@pytest.fixture
+def stored_matcher(tmp_path):
+    students, teachers = generate_data(200, 10, 3)
+    students.to_csv(tmp_path / 'students.csv', index=False)
+    teachers.to_csv(tmp_path / 'teachers.csv', index=False)
+    matcher = StudentTeacherMatcher(store=':memory:')
+    with contextlib.redirect_stdout(io.StringIO()):
+        matcher.store.load_csv('students', str(tmp_path / 'students.csv'))
+        matcher.store.load_csv('teachers', str(tmp_path / 'teachers.csv'))
+        matcher.load_store()
+        matcher.preprocess_data()
+        matcher.create_matches()
+    yield matcher
+    matcher.store.close()
+
+
+def test_load_csv_in_chunks_replaces_rows_with_the_same_id(store, tmp_path):
+    students, _ = generate_data(50, 1, 0)
+    students.to_csv(tmp_path / 'students.csv', index=False)
+    assert store.load_csv('students', str(tmp_path / 'students.csv'), chunksize=7) == 50
+    pd.testing.assert_frame_equal(store.students(), students, check_dtype=False)
+
+    renamed = students.iloc[:5].assign(name='Renamed')
+    renamed.to_csv(tmp_path / 'renamed.csv', index=False)
+    assert store.load_csv('students', str(tmp_path / 'renamed.csv'), chunksize=2) == 5
+    stored = store.students().set_index('student_id')
+    assert len(stored) == 50
+    assert (stored.loc[students['student_id'].iloc[:5], 'name'] == 'Renamed').all()
+    assert (stored.loc[students['student_id'].iloc[5:], 'name'] == students['name'].iloc[5:].values).all()
+
+
+def test_save_schedule_replaces_the_stored_schedule(stored_matcher):
+    store = stored_matcher.store
+    assert store.schedule() == stored_matcher.schedule
+
+    assert store.save_schedule(stored_matcher.schedule[:3]) == 3
+    assert store.schedule() == stored_matcher.schedule[:3]
+
+
+def test_apply_changes_mirrors_the_schedule(stored_matcher):
+    students, teachers = stored_matcher.students_df, stored_matcher.teachers_df
+    extra_students, extra_teachers = generate_data(10, 2, 9)
+    extra_students['student_id'] += 1000
+    extra_teachers['teacher_id'] += 1000
+    with contextlib.redirect_stdout(io.StringIO()):
+        stored_matcher.apply_changes(added={'students': extra_students, 'teachers': extra_teachers},
+                                     removed={'students': students['student_id'].iloc[:5].tolist(),
+                                              'teachers': teachers['teacher_id'].iloc[:1].tolist()},
+                                     updated={'teachers': teachers.iloc[[3]].assign(max_students_per_slot=1)})
+
+    store = stored_matcher.store
+    assert by_student(store.schedule()) == by_student(stored_matcher.schedule)
+    assert set(store.students()['student_id']) == set(stored_matcher.processed_students['student_id'])
+    assert set(store.teachers()['teacher_id']) == set(stored_matcher.processed_teachers['teacher_id'])
+    assert store.teachers().set_index('teacher_id').loc[teachers['teacher_id'].iloc[3], 'max_students_per_slot'] == 1
+
+
+def test_delete_cascades_to_the_schedule(stored_matcher):
+    store = stored_matcher.store
+    match = stored_matcher.schedule[0]
+    taught = [entry for entry in stored_matcher.schedule if entry['teacher_id'] == match['teacher_id']]
+
+    assert store.delete('students', [match['student_id']]) == 1
+    assert store.student_schedule(match['student_id']) == []
+    assert match['student_id'] not in set(store.students()['student_id'])
+
+    store.delete('teachers', [match['teacher_id']])
+    assert store.teacher_schedule(match['teacher_id']) == []
+    assert len(store.schedule()) == len(stored_matcher.schedule) - len(taught)
+
+
+def test_group_and_student_lookups(stored_matcher):
+    store = stored_matcher.store
+    students = stored_matcher.students_df.set_index('student_id')
+    match = stored_matcher.schedule[0]
+
+    assert store.student_schedule(match['student_id']) == [match]
+    group = store.group(match['teacher_id'], match['time_slot'])
+    expected = [entry for entry in stored_matcher.schedule
+                if (entry['teacher_id'], entry['time_slot']) == (match['teacher_id'], match['time_slot'])]
+    assert [row['student_id'] for row in group] == [entry['student_id'] for entry in expected]
+    for row in group:
+        assert (row['name'], row['grade']) == (students.loc[row['student_id'], 'name'],
+                                               students.loc[row['student_id'], 'grade'])
+    assert store.teacher_schedule(match['teacher_id'], match['time_slot']) == expected
+    assert store.group(match['teacher_id'], 'No such slot') == []
@@ -0,0 +1,43 @@
+"""
+Tests for weekly time grid availability and its per-block capacity.
+
+Run with `python -m pytest`.
+"""
+
+import contextlib
+import io
+from collections import Counter
+
+import pandas as pd
+
+from student_teacher_matcher import StudentTeacherMatcher
+
+
+def grid_matcher(students: pd.DataFrame, teachers: pd.DataFrame) -> StudentTeacherMatcher:
+    matcher = StudentTeacherMatcher(time_grid=True)
+    matcher.students_df, matcher.teachers_df = students, teachers
+    with contextlib.redirect_stdout(io.StringIO()):
+        matcher.preprocess_data()
+        matcher.create_matches()
+    return matcher
+
+
+def test_capacity_applies_per_block():
+    students = pd.DataFrame({'student_id': range(1, 11), 'name': [f'S{i}' for i in range(1, 11)], 'grade': 7,
+                             'subjects': 'Math', 'preferred_time_slots': 'Mon 09:00-11:00'})
+    teachers = pd.DataFrame({'teacher_id': [1], 'name': ['T1'], 'subjects': ['Math'],
+                             'available_time_slots': ['Mon 09:00-11:00'], 'max_students_per_slot': [2]})
+    matcher = grid_matcher(students, teachers)
+
+    # Four 30-minute lessons of at most two students each
+    per_block = Counter(match['time_slot'] for match in matcher.schedule)
+    assert per_block == {'Mon 09:00': 2, 'Mon 09:30': 2, 'Mon 10:00': 2, 'Mon 10:30': 2}
+
+
+def test_capacity_follows_the_overlap_with_the_student():
+    students = pd.DataFrame({'student_id': range(1, 6), 'name': [f'S{i}' for i in range(1, 6)], 'grade': 7,
+                             'subjects': 'Math', 'preferred_time_slots': 'Mon 10:30-12:00'})
+    teachers = pd.DataFrame({'teacher_id': [1], 'name': ['T1'], 'subjects': ['Math'],
+                             'available_time_slots': ['Mon 09:00-11:00'], 'max_students_per_slot': [2]})
+    matcher = grid_matcher(students, teachers)
+    assert [match['time_slot'] for match in matcher.schedule] == ['Mon 10:30', 'Mon 10:30']